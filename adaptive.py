@@ -0,0 +1,136 @@
+"""AIMD concurrency controller for bot_no2captcha.py (`--adaptive`).
+
+Admits wallet operations (run_wallets, the Auto All stages) behind a
+limit on how many run at once that follows the API's health, TCP style.
+Every API request (BlockStreetAPI._request) reports its outcome:
+
+- additive increase: a request that succeeds within the latency target
+  while the recent error rate is under its target adds 1/limit, i.e.
+  about +1 per round of healthy requests
+- multiplicative decrease: a timeout / connection failure, 5xx or 429
+  multiplies the limit by AIMD_BACKOFF. Requests that were already in
+  flight at the last decrease do not decrease it again, so one burst of
+  errors counts as one congestion event.
+
+The limit starts at --concurrency and never leaves [AIMD_MIN, ceiling];
+the ceiling is the self-imposed SecurityConfig.MAX_CONCURRENT_REQUESTS.
+A wallet operation has at most one request in flight, so the limit
+bounds requests in flight too. Limit changes are logged and the current
+limit and operations in flight are exported as gauges in metrics.py.
+"""
+import os
+import time
+import asyncio
+from typing import Dict, Optional
+
+from logger import Logger
+from metrics import metrics
+
+AIMD_MIN = int(os.getenv('AIMD_MIN', '1'))
+AIMD_BACKOFF = float(os.getenv('AIMD_BACKOFF', '0.5'))
+AIMD_TARGET_LATENCY = float(os.getenv('AIMD_TARGET_LATENCY', '2.0'))
+AIMD_TARGET_ERROR_RATE = float(os.getenv('AIMD_TARGET_ERROR_RATE', '0.05'))
+
+# Signals reported for a finished request
+OK = 'ok'
+OVERLOAD = 'overload'
+NEUTRAL = 'neutral'
+
+
+def classify(status: Optional[int], outcome: str) -> str:
+    """AIMD signal for one request: no response, 5xx and 429 mean overload; other non-ok outcomes say nothing"""
+    if status is None or status >= 500 or status == 429:
+        return OVERLOAD
+    return OK if outcome == 'ok' else NEUTRAL
+
+
+class AIMDController:
+    """Adaptive limit on wallet operations in flight (one event loop); use as `async with controller:`"""
+
+    # Weight of the newest request in the error rate average
+    ERROR_DECAY = 0.1
+
+    def __init__(self, initial: int, ceiling: int, minimum: int = AIMD_MIN, backoff: float = AIMD_BACKOFF,
+                 target_latency: float = AIMD_TARGET_LATENCY, target_error_rate: float = AIMD_TARGET_ERROR_RATE):
+        self.minimum = max(1, minimum)
+        self.ceiling = max(self.minimum, ceiling)
+        self.limit = float(min(self.ceiling, max(self.minimum, initial)))
+        self.backoff = backoff
+        self.target_latency = target_latency
+        self.target_error_rate = target_error_rate
+        self.in_flight = 0
+        self.error_rate = 0.0
+        self.increases = 0
+        self.decreases = 0
+        self._last_decrease = 0.0
+        self._condition: Optional[asyncio.Condition] = None
+        self._publish()
+
+    @property
+    def current(self) -> int:
+        return int(self.limit)
+
+    async def acquire(self):
+        """Wait until one more wallet operation may run"""
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.current)
+            self.in_flight += 1
+        self._publish()
+
+    async def release(self):
+        self.in_flight -= 1
+        await self._notify()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.release()
+
+    async def observe(self, latency: float, signal: str):
+        """Outcome of one API request that took latency seconds"""
+        started = time.monotonic() - latency
+        self.error_rate += self.ERROR_DECAY * ((signal == OVERLOAD) - self.error_rate)
+        if signal == OVERLOAD:
+            if started >= self._last_decrease:
+                self._decrease(f'overload signal, error rate {self.error_rate:.0%}')
+        elif signal == OK and latency <= self.target_latency and self.error_rate <= self.target_error_rate:
+            if self._increase():
+                # Room for waiting operations
+                await self._notify()
+
+    async def _notify(self):
+        if self._condition is not None:
+            async with self._condition:
+                self._condition.notify_all()
+        self._publish()
+
+    def _increase(self) -> bool:
+        before = self.current
+        self.limit = min(float(self.ceiling), self.limit + 1 / self.limit)
+        if self.current > before:
+            self.increases += 1
+            Logger.info(None, f'Concurrency limit {before} -> {self.current} (API healthy)',
+                        event='aimd', limit=self.current, direction='up')
+            return True
+        return False
+
+    def _decrease(self, reason: str):
+        before = self.current
+        self.limit = max(float(self.minimum), self.limit * self.backoff)
+        self._last_decrease = time.monotonic()
+        if self.current < before:
+            self.decreases += 1
+            Logger.warning(None, f'Concurrency limit {before} -> {self.current} ({reason})',
+                           event='aimd', limit=self.current, direction='down')
+
+    def _publish(self):
+        metrics.set_gauge('concurrency_limit', self.current, 'Adaptive limit on wallet operations in flight')
+        metrics.set_gauge('operations_in_flight', self.in_flight, 'Wallet operations currently in flight')
+
+    def stats(self) -> Dict:
+        return {'limit': self.current, 'increases': self.increases, 'decreases': self.decreases,
+                'error_rate': round(self.error_rate, 3)}
@@ -0,0 +1,110 @@
+"""Per-wallet local balance ledger shared by bot.py and bot_no2captcha.py.
+
+Seeded from the server (bot_no2captcha.py's /my/supply, bot.py's
+/api/me/balance) and then updated optimistically from every successful
+swap, supply, withdraw, borrow and repay, so transaction selection knows
+what the run has already spent and received without asking again. The
+server is asked again (needs_sync) only after RESYNC_EVERY operations or
+after it rejected an operation, i.e. when the local view may have drifted.
+
+Effect of each operation on the tracked balance of a symbol:
+
+    swap      from_symbol -= from_amount, to_symbol += to_amount
+    supply    += amount
+    withdraw  -= amount
+    borrow    += amount
+    repay     -= amount
+"""
+import os
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Union
+
+from models import Position
+from quote_engine import Number, to_decimal
+
+RESYNC_EVERY = int(os.getenv('BALANCE_RESYNC_EVERY', '10'))
+
+OPERATION_SIGNS = {'supply': 1, 'withdraw': -1, 'borrow': 1, 'repay': -1}
+
+# Parsed SupplyPosition / Balance records, a list of {'symbol', 'amount'} rows, or a {symbol: amount} mapping
+Snapshot = Union[Sequence[Position], Sequence[Dict], Mapping[str, Number]]
+
+
+def _amount(value) -> Decimal:
+    try:
+        return to_decimal(value if value is not None else 0)
+    except (InvalidOperation, ValueError):
+        return Decimal(0)
+
+
+class BalanceLedger:
+    """Local view of one wallet's balances, in Decimals"""
+
+    def __init__(self, min_balance: Number = 0, resync_every: int = RESYNC_EVERY):
+        self.min_balance = to_decimal(min_balance)
+        self.resync_every = resync_every
+        self.balances: Dict[str, Decimal] = {}
+        self.synced = False
+        self.stale = False
+        self.ops_since_sync = 0
+        self.syncs = 0
+
+    @property
+    def needs_sync(self) -> bool:
+        if not self.synced or self.stale:
+            return True
+        return bool(self.resync_every) and self.ops_since_sync >= self.resync_every
+
+    def sync(self, snapshot: Snapshot) -> Dict[str, Decimal]:
+        """Replace the local view with the server's; returns server minus local for every symbol that drifted"""
+        if isinstance(snapshot, Mapping):
+            items: Iterable = snapshot.items()
+        elif snapshot and isinstance(snapshot[0], Position):
+            # Parsed records: the amounts are validated Decimals already
+            items = ((row.symbol, row.amount) for row in snapshot)
+        else:
+            items = ((row.get('symbol'), row.get('amount')) for row in snapshot if row)
+        balances = {symbol: _amount(amount) for symbol, amount in items if symbol}
+
+        drift: Dict[str, Decimal] = {}
+        if self.synced:
+            for symbol in {**self.balances, **balances}:
+                delta = balances.get(symbol, Decimal(0)) - self.balances.get(symbol, Decimal(0))
+                if delta:
+                    drift[symbol] = delta
+        self.balances = balances
+        self.synced = True
+        self.stale = False
+        self.ops_since_sync = 0
+        self.syncs += 1
+        return drift
+
+    def mark_stale(self):
+        """The server rejected an operation: resync before choosing the next one"""
+        self.stale = True
+
+    def balance(self, symbol: str) -> Decimal:
+        return self.balances.get(symbol, Decimal(0))
+
+    def can_cover(self, symbol: str, amount: Number) -> bool:
+        """Whether spending amount of symbol keeps it at or above the minimum balance"""
+        return self.balance(symbol) - to_decimal(amount) >= self.min_balance
+
+    def covering(self, amount: Number, symbols: Optional[Iterable[str]] = None) -> List[str]:
+        """Symbols (all held ones by default) that can cover amount, in server order"""
+        amount = to_decimal(amount)
+        return [symbol for symbol in (self.balances if symbols is None else symbols)
+                if self.can_cover(symbol, amount)]
+
+    def held(self) -> List[str]:
+        return [symbol for symbol, amount in self.balances.items() if amount > 0]
+
+    def record_swap(self, from_symbol: str, to_symbol: str, from_amount: Number, to_amount: Number):
+        self.balances[from_symbol] = self.balance(from_symbol) - to_decimal(from_amount)
+        self.balances[to_symbol] = self.balance(to_symbol) + to_decimal(to_amount)
+        self.ops_since_sync += 1
+
+    def record(self, operation: str, symbol: str, amount: Number):
+        """A successful supply, withdraw, borrow or repay"""
+        self.balances[symbol] = self.balance(symbol) + OPERATION_SIGNS[operation] * to_decimal(amount)
+        self.ops_since_sync += 1
@@ -0,0 +1,265 @@
+"""End-to-end throughput benchmark against the offline mock server.
+
+Runs bot_no2captcha.py's process_auto_swap and bot.py's
+BlockStreetAutoBot.swap against mock_server.py with the deliberate sleeps
+scaled down, and reports requests/sec, wallet-runs/sec, p50/p99 request
+latency and peak RSS for every scenario.
+
+    python benchmark.py --wallets 16 --tx 3 --concurrency 1 4 16 --latency-ms 30
+
+Each scenario runs in a fresh child process so imports, connection pools
+and peak RSS do not leak between scenarios.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import argparse
+import resource
+import tempfile
+import itertools
+import contextlib
+import multiprocessing
+from typing import Dict, List
+
+from metrics import percentile
+from mock_server import MockServer, MockConfig, COOKIE_MODES
+from transport import TRANSPORTS, create_transport
+
+BOTS = ('auto_swap', 'bot')
+
+
+def bench_private_key(idx: int) -> str:
+    """Deterministic throwaway private key for wallet idx"""
+    return '0x' + hashlib.sha256(f'blockstreet-bench-{idx}'.encode()).hexdigest()
+
+
+def _instrument(cls, name: str, latencies: List[float]):
+    """Record the wall time of every cls.name call (sync or async)"""
+    original = getattr(cls, name)
+
+    if asyncio.iscoroutinefunction(original):
+        async def timed(self, *args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await original(self, *args, **kwargs)
+            finally:
+                latencies.append(time.perf_counter() - started)
+    else:
+        def timed(self, *args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return original(self, *args, **kwargs)
+            finally:
+                latencies.append(time.perf_counter() - started)
+
+    setattr(cls, name, timed)
+
+
+def _run_auto_swap(scenario: Dict):
+    import bot_no2captcha
+    from wallets import Wallet
+
+    wallets = [Wallet.from_key(bench_private_key(idx), f'W{idx + 1}') for idx in range(scenario['wallets'])]
+
+    ledger = None
+    if scenario.get('ledger_file'):
+        from run_ledger import RunLedger
+        ledger = RunLedger(scenario['ledger_file'])
+        ledger.start_run('auto_swap', {'tx_count': scenario['tx']})
+
+    session_store = None
+    if scenario.get('session_file'):
+        session_store = bot_no2captcha.SessionStore(scenario['session_file'])
+
+    # the mock server speaks plain http, so HTTP/2 has to be h2c with prior knowledge
+    options = {'prior_knowledge': True} if scenario['transport'] == 'http2' else {}
+    transport = create_transport(scenario['transport'], **options)
+    if transport.name != scenario['transport']:
+        raise RuntimeError(f"{scenario['transport']} transport unavailable")
+    bot_no2captcha.BlockStreetAPI.transport = transport
+
+    async def run():
+        if session_store:
+            await bot_no2captcha.preauth_wallets(wallets, [], '', session_store, scenario['concurrency'])
+        token_list = await bot_no2captcha.fetch_token_list(wallets[0], None, '', session_store)
+        await bot_no2captcha.process_auto_swap(
+            wallets, [], token_list, '', scenario['tx'], scenario['concurrency'], session_store, ledger
+        )
+        await transport.aclose()
+
+    asyncio.run(run())
+    if session_store:
+        session_store.flush()
+    if ledger:
+        ledger.finish_run()
+        ledger.close()
+
+
+def _run_bot(scenario: Dict):
+    workdir = tempfile.mkdtemp(prefix='bs-bench-')
+    with open(os.path.join(workdir, 'private_keys.txt'), 'w') as f:
+        f.write('\n'.join(bench_private_key(idx) for idx in range(scenario['wallets'])) + '\n')
+    os.chdir(workdir)
+
+    import bot
+    ledger = None
+    if scenario.get('ledger_file'):
+        from run_ledger import RunLedger
+        ledger = RunLedger(scenario['ledger_file'])
+    bot.BlockStreetAutoBot(ledger).swap()
+    if ledger:
+        ledger.close()
+
+
+def _scenario_child(scenario: Dict, results):
+    """Child process body: configure the bot through env, run it, report numbers"""
+    os.environ['BLOCKSTREET_API_URL'] = scenario['base_url'] + '/api'
+    os.environ['BLOCKSTREET_BASE_URL'] = scenario['base_url']
+    os.environ['DELAY_SCALE'] = str(scenario['delay_scale'])
+    # Retry backoff and breaker cooldown are waits too; scale them like the sleeps
+    os.environ['RETRY_BASE_DELAY'] = str(0.5 * scenario['delay_scale'])
+    os.environ['BREAKER_COOLDOWN'] = str(30 * scenario['delay_scale'])
+
+    latencies: List[float] = []
+    if scenario['bot'] == 'auto_swap':
+        import transport
+        _instrument(transport.HTTP1Transport, 'request', latencies)
+        _instrument(transport.HTTP2Transport, 'request', latencies)
+    else:
+        import requests
+        _instrument(requests.Session, 'request', latencies)
+    runner = _run_auto_swap if scenario['bot'] == 'auto_swap' else _run_bot
+    # Import outside the timed region; module start-up is not request throughput
+    __import__('bot_no2captcha' if scenario['bot'] == 'auto_swap' else 'bot')
+
+    started = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        runner(scenario)
+        # Log lines still queued must also go to devnull, and their writing counts towards the run
+        from logger import Logger
+        Logger.flush()
+    elapsed = time.perf_counter() - started
+
+    results.put({
+        'elapsed': elapsed,
+        'requests': len(latencies),
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        # ru_maxrss is reported in KiB on Linux
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    })
+
+
+def run_scenario(scenario: Dict) -> Dict:
+    """Run one scenario in a fresh process and return its metrics"""
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    proc = ctx.Process(target=_scenario_child, args=(scenario, results))
+    proc.start()
+    proc.join()
+    if proc.exitcode != 0:
+        raise RuntimeError(f'Scenario {scenario_label(scenario)} exited with {proc.exitcode}')
+    metrics = results.get()
+    metrics['connections'] = 0
+    metrics['req_per_sec'] = metrics['requests'] / metrics['elapsed'] if metrics['elapsed'] else 0.0
+    metrics['wallets_per_sec'] = scenario['wallets'] / metrics['elapsed'] if metrics['elapsed'] else 0.0
+    return metrics
+
+
+def scenario_label(scenario: Dict) -> str:
+    label = f"{scenario['bot']} w={scenario['wallets']} c={scenario['concurrency']}"
+    if scenario['bot'] == 'auto_swap':
+        label += f" {scenario['transport']}"
+    if scenario.get('session_file'):
+        label += f" sess={scenario['session_phase']}"
+    if scenario.get('ledger_file'):
+        label += ' ledger'
+    return label
+
+
+def print_report(rows: List[Dict]):
+    header = f"{'scenario':<36}{'wall s':>9}{'reqs':>7}{'req/s':>9}{'wallet/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'conns':>7}{'RSS MB':>9}"
+    print(header)
+    print('-' * len(header))
+    for row in rows:
+        m = row['metrics']
+        print(f"{scenario_label(row['scenario']):<36}{m['elapsed']:>9.2f}{m['requests']:>7}"
+              f"{m['req_per_sec']:>9.1f}{m['wallets_per_sec']:>10.2f}{m['p50_ms']:>9.1f}"
+              f"{m['p99_ms']:>9.1f}{m['connections']:>7}{m['peak_rss_mb']:>9.1f}")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='BlockStreet bot throughput benchmark')
+    parser.add_argument('--bot', choices=BOTS + ('both',), default='both')
+    parser.add_argument('--wallets', type=int, default=8)
+    parser.add_argument('--tx', type=int, default=3, help='transactions per wallet (auto_swap)')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4],
+                        help='wallet concurrency levels to sweep (auto_swap)')
+    parser.add_argument('--transport', nargs='+', choices=sorted(TRANSPORTS), default=['http1'],
+                        help='HTTP transports to sweep (auto_swap)')
+    parser.add_argument('--delay-scale', type=float, default=0.01, help='multiplier for the bots\' sleeps')
+    parser.add_argument('--latency-ms', type=float, default=20)
+    parser.add_argument('--jitter-ms', type=float, default=5)
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--throttle-rate', type=float, default=0, help='fraction of requests the mock answers with 429')
+    parser.add_argument('--set-cookie', choices=COOKIE_MODES, default='login')
+    parser.add_argument('--session-cache', action='store_true',
+                        help='run auto_swap scenarios twice (cold, then warm) against a shared session file')
+    parser.add_argument('--ledger', action='store_true', help='record every scenario in a throwaway run ledger')
+    parser.add_argument('--json', dest='json_out', help='also write results to this file')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = MockConfig(args.latency_ms, args.jitter_ms, args.error_rate, args.set_cookie,
+                        throttle_rate=args.throttle_rate, retry_after=0)
+    server = MockServer(config=config).start()
+
+    bots = BOTS if args.bot == 'both' else (args.bot,)
+    session_dir = tempfile.mkdtemp(prefix='bs-bench-sessions-')
+    scenarios = []
+    for bot_name, concurrency, transport_name in itertools.product(bots, args.concurrency, args.transport):
+        # bot.py has no concurrency or transport knob; run it once
+        if bot_name == 'bot' and (concurrency != args.concurrency[0] or transport_name != args.transport[0]):
+            continue
+        scenario = {
+            'bot': bot_name,
+            'wallets': args.wallets,
+            'tx': args.tx,
+            'transport': transport_name,
+            'concurrency': concurrency if bot_name == 'auto_swap' else 1,
+            'delay_scale': args.delay_scale,
+            'base_url': server.base_url,
+        }
+        if args.ledger:
+            scenario['ledger_file'] = os.path.join(session_dir, f'ledger-{bot_name}-c{concurrency}-{transport_name}.db')
+        if args.session_cache and bot_name == 'auto_swap':
+            session_file = os.path.join(session_dir, f'sessions-c{concurrency}-{transport_name}.json')
+            for phase in ('cold', 'warm'):
+                scenarios.append(dict(scenario, session_file=session_file, session_phase=phase))
+        else:
+            scenarios.append(scenario)
+
+    rows = []
+    try:
+        for scenario in scenarios:
+            server.stats.reset()
+            metrics = run_scenario(scenario)
+            metrics['server'] = server.stats.snapshot()
+            metrics['connections'] = metrics['server']['connections']
+            rows.append({'scenario': scenario, 'metrics': metrics})
+    finally:
+        server.stop()
+
+    print_report(rows)
+    if args.json_out:
+        with open(args.json_out, 'w') as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,22 +1,63 @@
-import requests
 import time
 import json
 import os
+import heapq
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from decimal import Decimal
 from colorama import Fore, init
+from logger import LEVELS, LOG_JSONL, LOG_LEVEL, Logger
+from metrics import METRICS_FILE, METRICS_PORT, metrics
+from profiling import COMPOSITE, NETWORK, SLEEP, profiler
+from retry import CircuitBreaker, RequestFailure, policy_for
+from balances import BalanceLedger
+from models import MalformedResponse, SwapResult, decode_envelope, parse_balances
+from quote_engine import QuoteEngine, format_amount
+from planner import Plan, WalletPlan, format_report as format_plan, parse_distribution, simulate
+from run_ledger import DEFAULT_LEDGER, RunLedger, format_summary
+from traffic import recorder, seed_random
+from pools import registry as transport_registry
 init(autoreset=True)
 
-BASE_URL = "https://blockstreet.money"
+BASE_URL = os.getenv("BLOCKSTREET_BASE_URL", "https://blockstreet.money")
+SWAP_DELAY = 20 * float(os.getenv("DELAY_SCALE", "1"))
+# Keys whose cooldown has expired at the same moment run on this many threads
+SWAP_WORKERS = int(os.getenv("SWAP_WORKERS", "4"))
+# Balance requests in flight at once while triaging the keys
+TRIAGE_WORKERS = int(os.getenv("TRIAGE_WORKERS", "16"))
+SWAP_ITERS = 5
+
+# Triage outcome of a key
+RUNNABLE = "runnable"
+INSUFFICIENT = "insufficient"
+INVALID = "invalid"
+
+# Console colour used by log() -> Logger method it is written with
+LOG_METHODS = {
+    Fore.RED: Logger.error,
+    Fore.YELLOW: Logger.warning,
+    Fore.GREEN: Logger.success,
+}
 
 # ------------------------------
 # Utility classes and functions
 # ------------------------------
+def key_id(pk):
+    # Ledger rows must never contain the private key itself
+    return "key-" + hashlib.sha256(pk.encode()).hexdigest()[:16]
+
+
 class BlockStreetAutoBot:
-    def __init__(self):
-        self.session = requests.Session()
+    def __init__(self, ledger=None):
+        self.session = transport_registry.session()
         self.user_agent = "Mozilla/5.0 (Linux; Android 13)"
+        self.ledger = ledger
+        # Shared by every key: when the API is down all keys pause together
+        self.breaker = CircuitBreaker()
 
-    def log(self, msg, color=Fore.WHITE):
-        print(color + str(msg))
+    def log(self, msg, color=Fore.WHITE, wallet=None, **fields):
+        LOG_METHODS.get(color, Logger.info)(wallet, str(msg), **fields)
 
     def load_private_keys(self):
         if not os.path.exists("private_keys.txt"):
@@ -27,84 +68,433 @@ class BlockStreetAutoBot:
         self.log(f"[OK] Loaded {len(keys)} private key(s)", Fore.GREEN)
         return keys
 
+    def build_tasks(self, keys, swap_iters=SWAP_ITERS, ledger=None):
+        FROM_SYMBOL = "BSD"
+        TO_SYMBOL = "AAPL"
+        RATE_BSD_TO_AAPL = "0.000438"
+        quotes = QuoteEngine.from_pair_rate(FROM_SYMBOL, TO_SYMBOL, RATE_BSD_TO_AAPL)
+        # Same amount every swap, so quote once
+        quote = quotes.quote(FROM_SYMBOL, TO_SYMBOL, "0.01")
+
+        tasks = []
+        for idx, pk in enumerate(keys, 1):
+            wallet = key_id(pk)
+            progress = ledger.progress(wallet) if ledger else None
+            if progress and progress.done:
+                self.log(f"{wallet} already completed in this run, skipping", Fore.CYAN, wallet=f"#{idx}")
+                continue
+            start_iter = progress.tx_done if progress else 0
+            tasks.append(KeySwapTask(self, idx, pk, quote, swap_iters, start_iter))
+        return tasks
+
     # ------------------------------
-    # MAIN SWAP LOGIC (with delay)
+    # TRIAGE (parallel balance check)
     # ------------------------------
-    def swap(self):
-        url_balance = f"{BASE_URL}/api/me/balance"
-        url_swap = f"{BASE_URL}/api/me/swap"
+    def triage(self, tasks, workers=TRIAGE_WORKERS):
+        """Fetch every key's balance over a bounded pool; returns the runnable tasks, most feasible swaps first"""
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            list(pool.map(KeySwapTask.triage, tasks))
+        runnable = sorted((task for task in tasks if task.status == RUNNABLE), key=lambda task: -task.feasible)
+        counts = {status: sum(task.status == status for task in tasks) for status in (RUNNABLE, INSUFFICIENT, INVALID)}
+        self.log(f"Triage of {len(tasks)} key(s) in {time.perf_counter() - started:.1f}s: "
+                 + ", ".join(f"{count} {status}" for status, count in counts.items()), Fore.CYAN,
+                 event="triage", **counts)
+        return runnable
 
+    def status(self, workers=TRIAGE_WORKERS):
+        """Standalone triage report: balances and feasible swaps per key, no swaps and no run recorded"""
         keys = self.load_private_keys()
         if not keys:
             self.log("No private keys found.", Fore.RED)
             return
+        tasks = self.build_tasks(keys)
+        self.triage(tasks, workers)
+        Logger.raw(format_triage(tasks))
 
-        FROM_SYMBOL = "BSD"
-        TO_SYMBOL = "AAPL"
-        swap_iters = 5
-        RATE_BSD_TO_AAPL = 0.000438
-        from_amount_val = 0.01
-        FROM_AMOUNT_STR = f"{from_amount_val:.6f}".rstrip("0").rstrip(".")
-
-        for pk in keys:
-            headers = {"Authorization": pk, "User-Agent": self.user_agent}
-            try:
-                r = self.session.get(url_balance, headers=headers, timeout=15)
-                data = r.json()
-            except:
-                self.log("Balance fetch failed", Fore.RED)
-                continue
+    def plan(self, workers=SWAP_WORKERS, triage_workers=TRIAGE_WORKERS, latency="lognormal:150,0.5", delay=None, out=None):
+        """Dry run: simulate the requests swap() would send through triage and the cooldown scheduler; sends nothing"""
+        keys = self.load_private_keys()
+        if not keys:
+            self.log("No private keys found.", Fore.RED)
+            return
+        # Balances are only known online: every key is planned as runnable for all its swaps
+        plan = Plan("bot", {"swap_iters": SWAP_ITERS, "swap_delay": SWAP_DELAY})
+        for task in self.build_tasks(keys):
+            # key_id stands in for the address; the plan never holds a key
+            wallet_plan = WalletPlan(f"#{task.idx}", task.wallet)
+            wallet_plan.add("GET /api/me/balance")
+            swaps = task.swap_iters - task.next_iter
+            for i in range(swaps):
+                wallet_plan.add("POST /api/me/swap", SWAP_DELAY if i < swaps - 1 else 0.0, swap=True, **task.payload)
+            plan.wallets.append(wallet_plan)
 
-            if data.get("code") != 0:
-                self.log("Invalid response for balance", Fore.RED)
-                continue
+        triage = Plan("bot", {}, wallets=[WalletPlan(w.name, w.address, w.ops[:1]) for w in plan.wallets])
+        swaps = Plan("bot", {}, wallets=[WalletPlan(w.name, w.address, w.ops[1:]) for w in plan.wallets])
+        latency = parse_distribution(latency, 0.001)
+        delay = parse_distribution(delay) if delay else None
+        sim = simulate(triage, triage_workers, latency, model="slots")
+        sim = simulate(swaps, workers, latency, delay, model="cooldown", sim=sim)
+        Logger.raw(format_plan(plan, sim))
+        if out:
+            plan.save(out)
+            self.log(f"Plan written to {out}", Fore.GREEN)
+
+    # ------------------------------
+    # MAIN SWAP LOGIC (with delay)
+    # ------------------------------
+    def swap(self, resume=False, workers=SWAP_WORKERS, triage_workers=TRIAGE_WORKERS):
+        with profiler.phase("load keys"):
+            keys = self.load_private_keys()
+        if not keys:
+            self.log("No private keys found.", Fore.RED)
+            return
+
+        metrics.start_run()
+        swap_iters = SWAP_ITERS
+        ledger = self.ledger
+        if ledger:
+            ledger.start_run("bot", {"swap_iters": swap_iters}, resume=resume)
+            if ledger.resumed:
+                swap_iters = ledger.params.get("swap_iters", swap_iters)
+                self.log(f"Resuming run #{ledger.run_id}", Fore.CYAN)
+
+        tasks = self.build_tasks(keys, swap_iters, ledger)
+        # Every balance up front, so empty and broken keys are known before any key swaps
+        runnable = self.triage(tasks, triage_workers)
+        Logger.raw(format_triage(tasks))
+
+        # Keys swap interleaved: while one key cools down for SWAP_DELAY the others run
+        CooldownScheduler(workers).run(runnable, on_finished=lambda task: task.report_finished())
+
+        for task in tasks:
+            task.log(f"Swaps done: {task.successful_swaps}", Fore.GREEN)
+            task.log(f"Total AAPL earned: {format_amount(task.swapped_total)}", Fore.CYAN)
+
+        if ledger:
+            ledger.finish_run()
+            Logger.raw(format_summary(ledger.summary()))
+        Logger.raw(metrics.format_table())
+
+
+class KeySwapTask:
+    """Balance check followed by up to swap_iters swaps for one key, run one step at a time"""
 
-            balance_val = float(data["data"].get(FROM_SYMBOL, 0))
-            self.log(f"Balance: {balance_val} {FROM_SYMBOL}", Fore.CYAN)
-
-            successful_swaps = 0
-            swapped_aapl_total = 0.0
-
-            for i in range(swap_iters):
-                if balance_val < from_amount_val:
-                    self.log("⚠ Remaining balance insufficient.", Fore.YELLOW)
-                    break
-
-                to_amount_val = from_amount_val * RATE_BSD_TO_AAPL
-                to_amount_str = f"{to_amount_val:.6f}".rstrip("0").rstrip(".")
-
-                payload = {
-                    "from_symbol": FROM_SYMBOL,
-                    "to_symbol": TO_SYMBOL,
-                    "from_amount": FROM_AMOUNT_STR,
-                    "to_amount": to_amount_str,
-                }
-
-                try:
-                    s = self.session.post(url_swap, headers=headers, json=payload, timeout=15)
-                    swap_data = s.json()
-                except:
-                    self.log("Swap request error", Fore.RED)
-                    break
-
-                if swap_data.get("code") == 0:
-                    self.log(f"✅ Swap #{i+1} OK", Fore.GREEN)
-                    successful_swaps += 1
-                    swapped_aapl_total += to_amount_val
-                    balance_val -= from_amount_val
-                else:
-                    self.log("Swap failed.", Fore.RED)
-                    break
-
-                # *** 20-SECOND DELAY ADDED HERE ***
-                time.sleep(20)
-
-            self.log(f"Swaps done: {successful_swaps}", Fore.GREEN)
-            self.log(f"Total AAPL earned: {swapped_aapl_total}", Fore.CYAN)
+    def __init__(self, bot, idx, pk, quote, swap_iters, start_iter=0):
+        self.bot = bot
+        self.idx = idx
+        self.wallet = key_id(pk)
+        self.headers = {"Authorization": pk, "User-Agent": bot.user_agent}
+        self.quote = quote
+        self.payload = {
+            "from_symbol": quote.from_symbol,
+            "to_symbol": quote.to_symbol,
+            "from_amount": format_amount(quote.from_amount),
+            "to_amount": format_amount(quote.to_amount),
+        }
+        self.swap_iters = swap_iters
+        self.next_iter = start_iter
+        # Seeded from /api/me/balance, then tracked locally from each swap
+        self.balances = BalanceLedger()
+        # 1-based attempt number of the request the next step sends
+        self.attempt = 1
+        self.successful_swaps = 0
+        self.swapped_total = Decimal(0)
+        # Set by triage(): RUNNABLE / INSUFFICIENT / INVALID and the swaps the balance allows
+        self.status = None
+        self.feasible = 0
+
+    def log(self, msg, color=Fore.WHITE, **fields):
+        self.bot.log(msg, color, wallet=f"#{self.idx}", **fields)
+
+    def step(self):
+        """Run the next request; return the cooldown before the following step, or None when done"""
+        ledger = self.bot.ledger
+        if self.balances.needs_sync:
+            return self._fetch_balance(ledger)
+
+        i = self.next_iter
+        if i >= self.swap_iters:
+            return self._finish(ledger)
+        if not self.balances.can_cover(self.quote.from_symbol, self.quote.from_amount):
+            if self.balances.ops_since_sync:
+                # Only an estimate since the last fetch; confirm before giving up
+                self.balances.mark_stale()
+                return 0
+            self.log("Remaining balance insufficient.", Fore.YELLOW)
+            return self._finish(ledger)
+
+        # Asked right before sending: in half-open state a go-ahead is the probe and must end in a request
+        paused = self.bot.breaker.delay()
+        if paused > 0:
+            # While the breaker is open, come back when it may close instead of holding a worker
+            return paused
+        started = time.perf_counter()
+        s = None
+        try:
+            with profiler.phase("swap request", COMPOSITE):
+                s = self._send("POST", "/api/me/swap", json=self.payload)
+                with profiler.phase("json decode"):
+                    swap = SwapResult.parse(decode_envelope(s.content, "/api/me/swap", s.status_code), "/api/me/swap")
+        except Exception as e:
+            failure = RequestFailure.from_exception(e)
+            self._observe("/api/me/swap", "POST", started, self._outcome(failure), s)
+            retry_in = self._retry_delay("POST", "/api/me/swap", failure)
+            if retry_in is not None:
+                return retry_in
+            if ledger:
+                ledger.tx(self.wallet, i + 1, self.swap_iters, "/api/me/swap", self.payload, False, str(e))
+            self.log(f"Swap request error: {failure}", Fore.RED)
+            return self._finish(ledger)
+
+        if ledger:
+            ledger.tx(self.wallet, i + 1, self.swap_iters, "/api/me/swap", self.payload, swap.ok, swap.to_dict())
+        self._observe("/api/me/swap", "POST", started, "ok" if swap.ok else f"code_{swap.code}", s, swap.code)
+        if not swap.ok:
+            self.balances.mark_stale()
+            self.log("Swap failed.", Fore.RED, event="swap", endpoint="/api/me/swap", outcome="failed", tx=i + 1)
+            return self._finish(ledger)
+
+        self.attempt = 1
+        self.log(f"Swap #{i+1} OK", Fore.GREEN, event="swap", endpoint="/api/me/swap", outcome="ok", tx=i + 1)
+        self.successful_swaps += 1
+        self.swapped_total += self.quote.to_amount
+        self.balances.record_swap(self.quote.from_symbol, self.quote.to_symbol, self.quote.from_amount, self.quote.to_amount)
+        self.next_iter += 1
+        if self.next_iter >= self.swap_iters:
+            return self._finish(ledger)
+        return SWAP_DELAY
+
+    def triage(self):
+        """Fetch the balance (retrying per policy) and classify the key"""
+        ledger = self.bot.ledger
+        while True:
+            delay = self._fetch_balance(ledger)
+            if not delay:
+                break
+            with profiler.phase("delay", SLEEP):
+                time.sleep(delay)
+
+        if delay is None:
+            self.status = INVALID
+            return
+        remaining = max(0, self.swap_iters - self.next_iter)
+        spendable = self.balances.balance(self.quote.from_symbol) - self.balances.min_balance
+        self.feasible = min(remaining, max(0, int(spendable // self.quote.from_amount)))
+        if self.feasible:
+            self.status = RUNNABLE
+        else:
+            self.status = INSUFFICIENT
+            self.log("Balance insufficient for a swap, skipping", Fore.YELLOW)
+            self._finish(ledger)
+
+    def _fetch_balance(self, ledger):
+        """Fetch and resync the balance; 0 when done, a delay to come back after, or None on failure"""
+        paused = self.bot.breaker.delay()
+        if paused > 0:
+            return paused
+        started = time.perf_counter()
+        r = None
+        try:
+            with profiler.phase("balance request", COMPOSITE):
+                r = self._send("GET", "/api/me/balance")
+                with profiler.phase("json decode"):
+                    data = decode_envelope(r.content, "/api/me/balance", r.status_code)
+                    balances = parse_balances(data.get("data")) if data.get("code") == 0 else None
+        except Exception as e:
+            failure = RequestFailure.from_exception(e)
+            self._observe("/api/me/balance", "GET", started, self._outcome(failure), r)
+            retry_in = self._retry_delay("GET", "/api/me/balance", failure)
+            if retry_in is not None:
+                return retry_in
+            self.log(f"Balance fetch failed: {failure}", Fore.RED)
+            return None
+
+        self._observe("/api/me/balance", "GET", started, "ok" if data.get("code") == 0 else f"code_{data.get('code')}",
+                      r, data.get("code"))
+        if data.get("code") != 0:
+            self.log("Invalid response for balance", Fore.RED)
+            return None
+
+        self.attempt = 1
+        symbol = self.quote.from_symbol
+        drift = self.balances.sync(balances)
+        balance = self.balances.balance(symbol)
+        self.log(f"Balance: {balance} {symbol}", Fore.CYAN)
+        if drift:
+            self.log("Balance drift since last fetch: " + ", ".join(f"{sym} {format_amount(d)}" for sym, d in drift.items()),
+                     Fore.CYAN, event="balance_drift")
+        if ledger:
+            ledger.phase(self.wallet, "balance", f"{format_amount(balance)} {symbol}")
+        return 0
+
+    def _send(self, method, endpoint, **kwargs):
+        """One request; HTTP errors raise RequestFailure so the retry policy can judge them"""
+        response = None
+        try:
+            with profiler.phase("http", NETWORK):
+                response = self.bot.session.request(method, f"{BASE_URL}{endpoint}", headers=self.headers, timeout=15, **kwargs)
+        finally:
+            self.bot.breaker.record(response is not None and response.status_code < 500)
+        if response.status_code >= 400:
+            raise RequestFailure.from_response(response, f"HTTP {response.status_code}")
+        return response
+
+    @staticmethod
+    def _outcome(failure):
+        if isinstance(failure, MalformedResponse):
+            return "malformed"
+        return f"http_{failure.status}" if failure.status else "error"
+
+    def _retry_delay(self, method, endpoint, failure):
+        """Backoff before retrying this request, or None when the policy gives up"""
+        policy = policy_for(method, endpoint)
+        if not policy.should_retry(failure, self.attempt):
+            self.attempt = 1
+            return None
+        delay = policy.backoff(self.attempt, failure.retry_after)
+        self.log(f"{endpoint} failed ({failure}); retry {self.attempt}/{policy.attempts - 1} in {delay:.1f}s",
+                 Fore.YELLOW, event="retry", endpoint=endpoint, status=failure.status)
+        self.attempt += 1
+        return delay
+
+    def _observe(self, endpoint, method, started, outcome, response=None, code=None):
+        latency = time.perf_counter() - started
+        metrics.observe_response(endpoint, method, latency, outcome, response, code)
+        recorder.record(method, f"{BASE_URL}{endpoint}", started, latency,
+                        response.status_code if response is not None else None, outcome, self.wallet,
+                        self.payload if method == "POST" else None)
+        Logger.event(f"#{self.idx}", "request", method=method, endpoint=endpoint, outcome=outcome, key=self.wallet,
+                     status=response.status_code if response is not None else None,
+                     latency_ms=round(latency * 1000, 2))
+
+    def _finish(self, ledger):
+        if ledger:
+            ledger.phase(self.wallet, "done")
+        return None
+
+    def report_finished(self):
+        self.log(f"finished: {self.successful_swaps} swap(s), {format_amount(self.swapped_total)} AAPL", Fore.GREEN)
+
+
+def format_triage(tasks):
+    """Per-key triage table; keys appear by their key_id, never the key"""
+    lines = [f"{'#':>4}  {'key':<22}{'status':<14}{'balance':>16}{'swaps':>7}"]
+    for task in tasks:
+        balance = format_amount(task.balances.balance(task.quote.from_symbol)) if task.balances.synced else "-"
+        lines.append(f"{task.idx:>4}  {task.wallet:<22}{task.status or '-':<14}{balance:>16}{task.feasible:>7}")
+    return "\n".join(lines)
+
+
+class CooldownScheduler:
+    """Deadline-ordered runner: a min-heap of each task's next eligible time
+
+    A task's step() returns the cooldown before its next step (None when done).
+    Up to `workers` due steps run at once, so one key's cooldown is spent on
+    the other keys' requests instead of sleeping.
+    """
+
+    def __init__(self, workers=SWAP_WORKERS):
+        self.workers = max(1, workers)
+
+    def run(self, tasks, on_finished=None):
+        heap = [(time.monotonic(), seq, task) for seq, task in enumerate(tasks)]
+        heapq.heapify(heap)
+        seq = len(heap)
+        inflight = {}
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while heap or inflight:
+                now = time.monotonic()
+                while heap and heap[0][0] <= now and len(inflight) < self.workers:
+                    _, _, task = heapq.heappop(heap)
+                    inflight[pool.submit(self._step, task)] = task
+
+                if not inflight:
+                    # Every key is cooling down
+                    with profiler.phase("delay", SLEEP):
+                        time.sleep(max(0.0, heap[0][0] - now))
+                    continue
+
+                timeout = None
+                if heap and len(inflight) < self.workers:
+                    timeout = max(0.0, heap[0][0] - now)
+                done, _ = wait(inflight, timeout=timeout, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    task = inflight.pop(future)
+                    cooldown = future.result()
+                    if cooldown is None:
+                        if on_finished:
+                            on_finished(task)
+                    else:
+                        seq += 1
+                        heapq.heappush(heap, (time.monotonic() + cooldown, seq, task))
+
+    @staticmethod
+    def _step(task):
+        try:
+            return task.step()
+        except Exception as e:
+            task.log(f"Unexpected error: {e}", Fore.RED)
+            return None
 
 # ------------------------------
 # Program Start
 # ------------------------------
 if __name__ == "__main__":
-    bot = BlockStreetAutoBot()
-    bot.swap()
+    parser = argparse.ArgumentParser(description="BlockStreet BSD -> AAPL swap bot")
+    parser.add_argument("command", nargs="?", choices=["swap", "status", "plan"], default="swap",
+                        help="swap (default); status: only print each key's balance and feasible swaps; "
+                             "plan: predict a swap run's wall time and requests without sending anything")
+    parser.add_argument("--plan-latency", default="lognormal:150,0.5",
+                        help="plan: request latency model in ms (N, uniform:A,B, normal:MEAN,SD, lognormal:MEDIAN,SIGMA)")
+    parser.add_argument("--plan-delay", help="plan: cooldown model in s replacing SWAP_DELAY (same forms)")
+    parser.add_argument("--plan-out", help="plan: also save the plan to this file")
+    parser.add_argument("--ledger", default=os.getenv("RUN_LEDGER", DEFAULT_LEDGER), help="SQLite run ledger")
+    parser.add_argument("--no-ledger", action="store_true", help="do not record the run")
+    parser.add_argument("--resume", action="store_true", help="continue the last unfinished run")
+    parser.add_argument("--workers", type=int, default=SWAP_WORKERS, help="keys served in parallel between cooldowns")
+    parser.add_argument("--triage-workers", type=int, default=TRIAGE_WORKERS, help="balance requests in flight while triaging keys")
+    parser.add_argument("--metrics-file", default=METRICS_FILE or None, help="write request metrics in Prometheus text format")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT, help="serve Prometheus metrics on this port at /metrics")
+    parser.add_argument("--log-level", choices=list(LEVELS), default=LOG_LEVEL, help="lowest level shown and recorded")
+    parser.add_argument("--log-jsonl", default=LOG_JSONL or None, help="append structured JSONL log records to this file")
+    parser.add_argument("--quiet", action="store_true", help="no console log output")
+    parser.add_argument("--no-color", action="store_true", help="plain console output without ANSI colours")
+    parser.add_argument("--seed", type=int, default=int(os.environ["SEED"]) if os.getenv("SEED") else None,
+                        help="seed retry jitter, for a repeatable workload")
+    parser.add_argument("--capture", help="record every request (secrets redacted) to this file for traffic.py")
+    parser.add_argument("--profile", action="store_true", help="time run phases and print a breakdown at exit")
+    parser.add_argument("--profile-out", help="also dump a cProfile of every thread to this file (pstats format)")
+    parser.add_argument("--profile-memory", action="store_true", help="also report tracemalloc allocation growth")
+    args = parser.parse_args()
+    Logger.configure(args.log_level, args.log_jsonl, args.quiet, False if args.no_color else None)
+    profiler.configure(args.profile, args.profile_out, args.profile_memory)
+    profiler.start()
+    seed_random(args.seed)
+    recorder.configure(args.capture, bot="bot", command=args.command, seed=args.seed, workers=args.workers)
+
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+
+    # status and plan record nothing
+    ledger = None if args.no_ledger or args.command != "swap" else RunLedger(args.ledger)
+    bot = BlockStreetAutoBot(ledger)
+    try:
+        if args.command == "status":
+            bot.status(args.triage_workers)
+        elif args.command == "plan":
+            bot.plan(args.workers, args.triage_workers, args.plan_latency, args.plan_delay, args.plan_out)
+        else:
+            bot.swap(resume=args.resume, workers=args.workers, triage_workers=args.triage_workers)
+    finally:
+        if ledger:
+            ledger.close()
+        if args.metrics_file:
+            metrics.write_prometheus(args.metrics_file)
+        recorder.save()
+        profiler.stop()
+        if profiler.enabled:
+            Logger.raw(profiler.format_report())
+        Logger.flush()
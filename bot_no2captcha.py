@@ -1,85 +1,98 @@
 import os
 import sys
 import time
+# Start of module imports, for --startup-profile
+IMPORT_STARTED = time.perf_counter()
 import json
 import random
 import asyncio
-import requests
-from datetime import datetime, timezone, timedelta
+import argparse
+import threading
+import contextlib
+from email.utils import parsedate_to_datetime
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
-from eth_account import Account
-from eth_account.messages import encode_defunct
+from typing import Any, Awaitable, Callable, List, Dict, Optional, Tuple
 from dotenv import load_dotenv
+try:
+    import fcntl
+except ImportError:
+    # Windows: no cross-process lock for the session file
+    fcntl = None
+from logger import LEVELS, LOG_JSONL, LOG_LEVEL, Colors, Logger
+from metrics import METRICS_FILE, METRICS_PORT, metrics
+from retry import CircuitBreaker, RequestFailure, policy_for
+from sharding import WORKERS, ShardSupervisor, format_report
+from quote_engine import Number, SwapQuote, format_amount, get_quote_engine, to_decimal
+from balances import RESYNC_EVERY, BalanceLedger
+from models import MalformedResponse, SupplyPosition, SwapResult, Token, TokenTable, decode_envelope, parse_supplies
+from wallets import WALLET_INDEX, Wallet, WalletIndex
+from pipeline import Pipeline, Stage
+from adaptive import AIMDController, classify
+from profiling import COMPOSITE, NETWORK, SLEEP, profiler
+from signing import SIGN_WORKERS, SignatureCache, SignInMessage, parse_message
+from rate_limit import RATE_LIMIT_DB, SlidingWindowLimiter
+from traffic import recorder, seed_random
+from planner import Plan, WalletPlan, format_report as format_plan, parse_distribution, simulate
+from run_ledger import DEFAULT_LEDGER, RunLedger, format_summary
+from transport import HTTP_TRANSPORT, TRANSPORTS, Transport, create_transport
 
 load_dotenv()
 
-class Colors:
-    RESET = "\033[0m"
-    BRIGHT = "\033[1m"
-    GREEN = "\033[32m\033[1m"
-    YELLOW = "\033[33m\033[1m"
-    BLUE = "\033[34m\033[1m"
-    MAGENTA = "\033[35m\033[1m"
-    CYAN = "\033[36m\033[1m"
-    WHITE = "\033[37m\033[1m"
-    RED = "\033[31m\033[1m"
-    GRAY = "\033[90m"
+API_BASE_URL = os.getenv('BLOCKSTREET_API_URL', 'https://api.blockstreet.money/api')
+# Multiplier for the deliberate delays between operations (benchmarks run with a small value)
+DELAY_SCALE = float(os.getenv('DELAY_SCALE', '1'))
+# Lifetime assumed for a gfsessionid cookie that carries no Max-Age/Expires
+SESSION_TTL = int(os.getenv('SESSION_TTL', str(6 * 3600)))
+# Freshness window for wallet-independent market data, and how long past it a stale copy may be served
+MARKET_CACHE_TTL = float(os.getenv('MARKET_CACHE_TTL', '60'))
+MARKET_CACHE_STALE = float(os.getenv('MARKET_CACHE_STALE', '300'))
+# Last fetched token list and supplies per wallet, so --plan can work without going online
+PLAN_CACHE = os.getenv('PLAN_CACHE', 'plan_cache.json')
+
+class PlanCache:
+    """Market data and balances --plan works from, refreshed by every online run"""
+    
+    def __init__(self, filename: Optional[str] = PLAN_CACHE):
+        self.filename = filename
+        self.token_list: Optional[List[Dict]] = None
+        # lowercased address -> last /my/supply rows
+        self.supplies: Dict[str, List[Dict]] = {}
+        self.dirty = False
+        if filename:
+            try:
+                with open(filename) as f:
+                    data = json.load(f)
+                self.token_list = data.get('token_list')
+                self.supplies = data.get('supplies', {})
+            except (OSError, ValueError):
+                pass
+    
+    def set_token_list(self, token_list: List[Token]):
+        self.token_list = [token.to_dict() for token in token_list]
+        self.dirty = True
+    
+    def set_supplies(self, address: str, supplies: List[SupplyPosition]):
+        self.supplies[address.lower()] = [row.to_dict() for row in supplies]
+        self.dirty = True
+    
+    def save(self):
+        if not self.filename or not self.dirty:
+            return
+        try:
+            with open(self.filename, 'w') as f:
+                json.dump({'token_list': self.token_list, 'supplies': self.supplies}, f)
+            self.dirty = False
+        except OSError:
+            pass
 
 class SecurityConfig:
     """Security configuration to prevent wallet drain"""
     MAX_TRANSACTION_AMOUNT = 0.01
     MIN_BALANCE_THRESHOLD = 0.001
     MAX_TRANSACTIONS_PER_HOUR = 100
+    MAX_CONCURRENT_REQUESTS = 16
     REQUIRE_CONFIRMATION = False
 
-class Logger:
-    """Enhanced logger with custom formatting"""
-    
-    @staticmethod
-    def clear_terminal():
-        os.system('clear' if os.name != 'nt' else 'cls')
-    
-    @staticmethod
-    def _get_timestamp():
-        wib_timezone = timezone(timedelta(hours=7))
-        return datetime.now(wib_timezone).strftime("%H:%M:%S")
-    
-    @staticmethod
-    def info(wallet: Optional[str], msg: str):
-        timestamp = Logger._get_timestamp()
-        wallet_display = wallet or 'SYS'
-        print(f"{Colors.GRAY}{timestamp}{Colors.RESET} {Colors.BLUE}[{wallet_display}]{Colors.RESET} {msg}")
-    
-    @staticmethod
-    def success(wallet: Optional[str], msg: str):
-        timestamp = Logger._get_timestamp()
-        wallet_display = wallet or 'SYS'
-        print(f"{Colors.GRAY}{timestamp}{Colors.RESET} {Colors.GREEN}[{wallet_display}]{Colors.RESET} âœ… {msg}")
-    
-    @staticmethod
-    def error(wallet: Optional[str], msg: str):
-        timestamp = Logger._get_timestamp()
-        wallet_display = wallet or 'SYS'
-        print(f"{Colors.GRAY}{timestamp}{Colors.RESET} {Colors.RED}[{wallet_display}]{Colors.RESET} âŒ {msg}")
-    
-    @staticmethod
-    def warning(wallet: Optional[str], msg: str):
-        timestamp = Logger._get_timestamp()
-        wallet_display = wallet or 'SYS'
-        print(f"{Colors.GRAY}{timestamp}{Colors.RESET} {Colors.YELLOW}[{wallet_display}]{Colors.RESET} âš¡ {msg}")
-    
-    @staticmethod
-    def process(wallet: Optional[str], msg: str):
-        timestamp = Logger._get_timestamp()
-        wallet_display = wallet or 'SYS'
-        print(f"{Colors.GRAY}{timestamp}{Colors.RESET} {Colors.MAGENTA}[{wallet_display}]{Colors.RESET} ðŸ”„ {msg}")
-    
-    @staticmethod
-    def security(msg: str):
-        timestamp = Logger._get_timestamp()
-        print(f"{Colors.GRAY}{timestamp}{Colors.RESET} {Colors.RED}[SECURITY]{Colors.RESET} ðŸ” {msg}")
-
 def display_banner():
     """Display application banner"""
     banner = f"""{Colors.CYAN}
@@ -93,6 +106,8 @@ def display_banner():
 
 def display_menu():
     """Display main menu"""
+    # Queued log lines must land before the menu and its prompt
+    Logger.flush()
     print(f"\n{Colors.CYAN}â•”â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â• MAIN MENU â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•—{Colors.RESET}")
     print(f"{Colors.GREEN}  [1]{Colors.RESET} Auto Swap          {Colors.GREEN}[6]{Colors.RESET} Repay Loan")
     print(f"{Colors.GREEN}  [2]{Colors.RESET} Manual Swap        {Colors.GREEN}[7]{Colors.RESET} Auto All Operations")
@@ -102,12 +117,34 @@ def display_menu():
     print(f"{Colors.CYAN}â•šâ•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•{Colors.RESET}")
     print(f"{Colors.RED}  [0]{Colors.RESET} Exit Bot\n")
 
+class StartupProfile:
+    """Wall time of each start-up phase (--startup-profile)"""
+    
+    def __init__(self, started: float):
+        self.phases: List[Tuple[str, float]] = []
+        self._last = started
+    
+    def mark(self, phase: str):
+        """Close the phase that ran since the previous mark"""
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+    
+    def format(self) -> str:
+        total = sum(seconds for _, seconds in self.phases)
+        lines = [f"{'startup phase':<24}{'ms':>10}{'share':>8}"]
+        for phase, seconds in self.phases:
+            lines.append(f'{phase:<24}{seconds * 1000:>10.1f}{100 * seconds / total if total else 0:>7.0f}%')
+        lines.append(f"{'total':<24}{total * 1000:>10.1f}")
+        lines.append('eth_account: ' + ('loaded' if 'eth_account' in sys.modules else 'not loaded (no wallet signed yet)'))
+        return '\n'.join(lines)
+
 class WalletManager:
     """Secure wallet management"""
     
     @staticmethod
-    def load_wallets_from_file(filename: str = 'private_keys.txt') -> List[Dict]:
-        """Load wallets from file with validation"""
+    def load_wallets_from_file(filename: str = 'private_keys.txt', index: Optional[WalletIndex] = None) -> List[Wallet]:
+        """Load wallets from file with validation; addresses come from the index while the file is unchanged"""
         wallets = []
         
         if not Path(filename).exists():
@@ -116,32 +153,9 @@ class WalletManager:
             return wallets
         
         try:
-            with open(filename, 'r') as f:
-                lines = f.readlines()
-            
-            for idx, line in enumerate(lines, 1):
-                line = line.strip()
-                if not line or line.startswith('#'):
-                    continue
-                
-                try:
-                    parts = line.split(':')
-                    private_key = parts[0].strip()
-                    name = parts[1].strip() if len(parts) > 1 else f'W{idx}'
-                    
-                    if not private_key.startswith('0x'):
-                        private_key = '0x' + private_key
-                    
-                    account = Account.from_key(private_key)
-                    
-                    wallets.append({
-                        'account': account,
-                        'name': name,
-                        'address': account.address
-                    })
-                    
-                except Exception as e:
-                    Logger.warning(None, f'Invalid wallet config at line {idx}')
+            content = Path(filename).read_bytes()
+            on_invalid = lambda idx: Logger.warning(None, f'Invalid wallet config at line {idx}')
+            wallets = (index or WalletIndex(None)).load(content, on_invalid)
             
             if wallets:
                 Logger.success(None, f'Successfully loaded {len(wallets)} wallet(s)')
@@ -152,7 +166,7 @@ class WalletManager:
         return wallets
     
     @staticmethod
-    def validate_transaction_amount(amount: float) -> bool:
+    def validate_transaction_amount(amount: Number) -> bool:
         """Validate transaction amount against security limits"""
         if amount > SecurityConfig.MAX_TRANSACTION_AMOUNT:
             Logger.security(f'Amount {amount} exceeds limit {SecurityConfig.MAX_TRANSACTION_AMOUNT}')
@@ -207,31 +221,235 @@ class ProxyManager:
         
         return proxies
 
+class SessionStore:
+    """On-disk gfsessionid cache keyed by wallet address
+    
+    Changes are written in batches by a background timer, off the event loop;
+    call flush() before the process exits to write what is still pending.
+    """
+    
+    # Sessions this close to expiry are treated as stale so they do not die mid-run
+    EXPIRY_MARGIN = 60
+    # A re-issued identical cookie whose expiry moved less than this is not a change
+    EXPIRY_SLACK = 300
+    # Seconds to collect changes before writing them in one go
+    FLUSH_DELAY = 1.0
+    
+    def __init__(self, filename: str = 'sessions.json', ttl: int = SESSION_TTL):
+        self.filename = filename
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._dirty: set = set()
+        self._timer: Optional[threading.Timer] = None
+        self._sessions: Dict[str, Dict] = self._load()
+    
+    def _load(self) -> Dict[str, Dict]:
+        if not Path(self.filename).exists():
+            return {}
+        try:
+            with open(self.filename, 'r') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except Exception as e:
+            Logger.warning(None, f'Ignoring unreadable session cache: {str(e)}')
+            return {}
+    
+    @contextlib.contextmanager
+    def _file_lock(self):
+        """Exclusive lock on a sidecar file, held across processes (a no-op without fcntl)"""
+        if fcntl is None:
+            yield
+            return
+        with open(f'{self.filename}.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    def _changed(self, key: str):
+        """Mark key for the next batched write (caller holds self._lock)"""
+        self._dirty.add(key)
+        if self._timer is None:
+            self._timer = threading.Timer(self.FLUSH_DELAY, self.flush)
+            self._timer.start()
+    
+    def flush(self):
+        """Write the changed entries now"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            changes = {key: self._sessions.get(key) for key in self._dirty}
+            self._dirty.clear()
+        if not changes:
+            return
+        # Shard workers share the file: under the file lock, merge the changed entries into
+        # what is on disk instead of overwriting other processes' entries with a stale copy
+        with self._flush_lock, self._file_lock():
+            on_disk = self._load()
+            if all(on_disk.get(key) == entry for key, entry in changes.items()):
+                # Nothing differs from the file (e.g. another worker wrote the same): leave it alone
+                return
+            for key, entry in changes.items():
+                if entry is not None:
+                    on_disk[key] = entry
+                else:
+                    on_disk.pop(key, None)
+            tmp_name = f'{self.filename}.{os.getpid()}.tmp'
+            with open(tmp_name, 'w') as f:
+                json.dump(on_disk, f, indent=2)
+            os.replace(tmp_name, self.filename)
+    
+    @staticmethod
+    def _key(address: str) -> str:
+        return address.lower()
+    
+    def parse_expiry(self, set_cookie: str, now: float) -> float:
+        """Expiry timestamp from the cookie's Max-Age/Expires attributes, else now + ttl"""
+        for attr in set_cookie.split(';')[1:]:
+            name, _, value = attr.strip().partition('=')
+            name = name.lower()
+            try:
+                if name == 'max-age':
+                    return now + int(value)
+                if name == 'expires':
+                    return parsedate_to_datetime(value).timestamp()
+            except (TypeError, ValueError):
+                continue
+        return now + self.ttl
+    
+    def get(self, address: str) -> Optional[str]:
+        """Return the cached cookie if it is still valid"""
+        with self._lock:
+            entry = self._sessions.get(self._key(address))
+        if not entry or entry.get('expires_at', 0) - self.EXPIRY_MARGIN <= time.time():
+            return None
+        return entry.get('cookie')
+    
+    def save(self, address: str, set_cookie: str):
+        """Remember a freshly issued cookie (full set-cookie header value)"""
+        now = time.time()
+        key = self._key(address)
+        cookie = set_cookie.split(';')[0]
+        expires_at = self.parse_expiry(set_cookie, now)
+        with self._lock:
+            entry = self._sessions.get(key)
+            # Servers that refresh the cookie on every response would otherwise rewrite the file per request
+            if entry and entry.get('cookie') == cookie and abs(expires_at - entry.get('expires_at', 0)) < self.EXPIRY_SLACK:
+                return
+            self._sessions[key] = {'cookie': cookie, 'obtained_at': now, 'expires_at': expires_at}
+            self._changed(key)
+    
+    def invalidate(self, address: str):
+        key = self._key(address)
+        with self._lock:
+            if self._sessions.pop(key, None) is not None:
+                self._changed(key)
+
+
+class ResponseCache:
+    """Shared TTL cache with single-flight fetches for wallet-independent endpoints
+    
+    Concurrent callers for a missing key wait on one in-flight fetch. Past the TTL
+    but inside the stale window the cached value is returned immediately while one
+    background fetch revalidates it. Cached values are shared, callers must not mutate them.
+    """
+    
+    def __init__(self, ttl: float = MARKET_CACHE_TTL, stale_ttl: float = MARKET_CACHE_STALE):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries: Dict[str, Tuple[float, Any]] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+    
+    async def get(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._entries.get(key)
+        if entry:
+            age = time.monotonic() - entry[0]
+            if age < self.ttl:
+                self.hits += 1
+                return entry[1]
+            if age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                if key not in self._inflight:
+                    self._start_fetch(key, fetch).add_done_callback(self._log_refresh_error)
+                return entry[1]
+        
+        task = self._inflight.get(key)
+        if task:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = self._start_fetch(key, fetch)
+        # shield: one caller being cancelled must not cancel the fetch the others wait on
+        return await asyncio.shield(task)
+    
+    def _start_fetch(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        async def run():
+            try:
+                value = await fetch()
+                self._entries[key] = (time.monotonic(), value)
+                return value
+            finally:
+                self._inflight.pop(key, None)
+        
+        task = asyncio.ensure_future(run())
+        self._inflight[key] = task
+        return task
+    
+    @staticmethod
+    def _log_refresh_error(task: asyncio.Task):
+        if not task.cancelled() and task.exception():
+            Logger.warning(None, f'Background cache refresh failed: {str(task.exception())}')
+    
+    def invalidate(self, key: Optional[str] = None):
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+    
+    def stats(self) -> Dict[str, int]:
+        return {
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+        }
+
+
+class SessionInvalidError(Exception):
+    """Server rejected the gfsessionid cookie"""
+
 
 class CaptchaSolver:
-    \"\"\"Captcha solver stub â€” automated 2Captcha usage removed.
+    """Captcha solver stub â€” automated 2Captcha usage removed.
 
     This stub preserves the original method names so the rest of the script
     works unchanged. It intentionally returns an empty API key and will not
     perform any network captcha solving. If a captcha_token is required by the
     site, the script will continue but you must provide or obtain the token
     manually (or integrate an alternative solver).
-    \"\"\"
+    """
 
     @staticmethod
     def get_api_key(filename: str = '2captcha.txt') -> str:
-        \"\"\"Return empty string to indicate no 2Captcha key will be used.\"\"\"
+        """Return empty string to indicate no 2Captcha key will be used."""
         # 2Captcha usage removed by user request â€” do not load or require any key.
         return ''
 
     @staticmethod
     async def solve_turnstile(api_key: str, sitekey: str, pageurl: str) -> Optional[str]:
-        \"\"\"Automated solving disabled.
+        """Automated solving disabled.
 
         If api_key is provided (non-empty) this function will raise to avoid
         accidentally calling 2Captcha. When api_key is empty, the caller should
         skip automated solving and continue (captcha_token should be '').
-        \"\"\"
+        """
         if api_key:
             raise Exception('Automated Turnstile solving disabled: 2Captcha integration removed.')
         # Return empty token to continue execution without automated captcha solving.
@@ -253,255 +471,1109 @@ Nonce: Z9YFj5VY80yTwN3n
 Issued At: 2025-10-27T09:49:38.537Z
 Expiration Time: 2025-10-27T09:51:38.537Z"""
     
-    def __init__(self, wallet_data: Dict, proxy: Optional[str] = None):
+    # Token list and earn info are the same for every wallet; all instances share one cache
+    market_cache = ResponseCache()
+    # Parsed token records, kept across refreshes that change nothing
+    token_table = TokenTable()
+    # HTTP/1.1 over the shared pools by default; swapped for HTTP/2 with --transport http2
+    transport: Transport = create_transport('http1')
+    # One breaker for all wallets: when the API is down they all pause together
+    breaker = CircuitBreaker()
+    # Sliding hourly transaction limit per wallet, shared by every instance; main() and shard
+    # workers point it at the --rate-limit-db file so runs and processes share it too
+    limiter = SlidingWindowLimiter(SecurityConfig.MAX_TRANSACTIONS_PER_HOUR)
+    # Adaptive limit on requests in flight across all wallets (--adaptive); None means no limit
+    concurrency: Optional[AIMDController] = None
+    # Login signatures per wallet and sign-in message, filled up front by presign_wallets
+    signatures = SignatureCache()
+    # Token list and balances seen online, for --plan (main() loads the file)
+    plan_cache = PlanCache(None)
+    
+    DEFAULT_HEADERS = {
+        'accept': 'application/json, text/plain, */*',
+        'accept-language': 'en-US,en;q=0.9',
+        'origin': 'https://blockstreet.money',
+        'referer': 'https://blockstreet.money/',
+        'sec-fetch-dest': 'empty',
+        'sec-fetch-mode': 'cors',
+        'sec-fetch-site': 'same-site',
+    }
+    
+    def __init__(self, wallet_data: Wallet, proxy: Optional[str] = None, session_store: Optional[SessionStore] = None):
         self.wallet_data = wallet_data
-        self.account = wallet_data['account']
-        self.name = wallet_data['name']
-        self.address = wallet_data['address']
+        self.name = wallet_data.name
+        self.address = wallet_data.address
         self.session_cookie = None
-        self.transaction_count = 0
-        self.last_transaction_time = 0
-        
-        self.session = requests.Session()
-        self.session.headers.update({
-            'accept': 'application/json, text/plain, */*',
-            'accept-language': 'en-US,en;q=0.9',
-            'origin': 'https://blockstreet.money',
-            'referer': 'https://blockstreet.money/',
-            'sec-fetch-dest': 'empty',
-            'sec-fetch-mode': 'cors',
-            'sec-fetch-site': 'same-site',
-        })
-        
-        if proxy:
-            self.session.proxies = {
-                'http': proxy,
-                'https': proxy
-            }
+        self.session_store = session_store
+        self.captcha_token: Optional[str] = None
+        # Seeded by get_supplies, updated by every successful transaction
+        self.balances = BalanceLedger(SecurityConfig.MIN_BALANCE_THRESHOLD)
+        
+        self.proxy = proxy
     
     def _check_rate_limit(self) -> bool:
-        """Check if rate limit is exceeded"""
-        current_time = time.time()
-        if current_time - self.last_transaction_time < 3600:
-            if self.transaction_count >= SecurityConfig.MAX_TRANSACTIONS_PER_HOUR:
-                Logger.security(f'Rate limit reached for {self.name}')
-                return False
-        else:
-            self.transaction_count = 0
-            self.last_transaction_time = current_time
-        
-        self.transaction_count += 1
+        """Take a transaction slot; False when the wallet's hourly limit is reached"""
+        if not self.limiter.acquire(self.address):
+            Logger.security(f'Rate limit reached for {self.name}, next slot in {self.limiter.wait_time(self.address):.0f}s')
+            return False
         return True
     
-    def _send_request(self, method: str, endpoint: str, **kwargs) -> Dict:
-        """Send HTTP request with security checks"""
-        url = f'https://api.blockstreet.money/api{endpoint}'
+    async def _send_request(self, method: str, endpoint: str, **kwargs) -> Dict:
+        """Send HTTP request, retrying per the endpoint's policy; retried mutations count against the rate limit"""
+        policy = policy_for(method, endpoint)
+        attempt = 1
+        while True:
+            try:
+                return await self._send_authenticated(method, endpoint, **kwargs)
+            except RequestFailure as e:
+                if not policy.should_retry(e, attempt):
+                    raise
+                if policy.mutating and not self._check_rate_limit():
+                    raise Exception('Rate limit exceeded') from e
+                delay = policy.backoff(attempt, e.retry_after)
+                Logger.warning(self.name, f'{str(e)}; retry {attempt}/{policy.attempts - 1} in {delay:.1f}s',
+                               event='retry', endpoint=endpoint, status=e.status)
+                attempt += 1
+                await asyncio.sleep(delay)
+    
+    async def _send_authenticated(self, method: str, endpoint: str, **kwargs) -> Dict:
+        """Send one request, re-authenticating once on an invalid session"""
+        try:
+            return await self._request(method, endpoint, **kwargs)
+        except SessionInvalidError:
+            if endpoint == '/account/signverify' or self.captcha_token is None:
+                raise Exception('Request failed: session rejected by server')
         
-        headers = kwargs.pop('headers', {})
+        Logger.warning(self.name, 'Session expired, re-authenticating...')
+        self.invalidate_session()
+        await self.login(self.captcha_token)
+        try:
+            return await self._request(method, endpoint, **kwargs)
+        except SessionInvalidError:
+            raise Exception('Request failed: session rejected by server')
+    
+    @staticmethod
+    def _is_session_rejected(response, data: Optional[Dict] = None) -> bool:
+        if response.status_code == 401:
+            return True
+        return isinstance(data, dict) and data.get('code') in [401, '401']
+    
+    async def _request(self, method: str, endpoint: str, **kwargs) -> Dict:
+        url = f'{API_BASE_URL}{endpoint}'
+        
+        headers = {**self.DEFAULT_HEADERS, **kwargs.pop('headers', {})}
         headers['User-Agent'] = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         
         if self.session_cookie:
             headers['Cookie'] = self.session_cookie
         
+        await self.breaker.wait()
+        started = time.perf_counter()
+        response = None
+        code = None
+        outcome = 'error'
         try:
-            response = self.session.request(method, url, headers=headers, timeout=30, **kwargs)
+            with profiler.phase('http', NETWORK):
+                response = await self.transport.request(method, url, proxy=self.proxy, headers=headers, timeout=30, **kwargs)
+            self.breaker.record(response.status_code < 500)
             
             if 'set-cookie' in response.headers:
                 cookie = response.headers['set-cookie']
                 if 'gfsessionid=' in cookie:
                     self.session_cookie = cookie.split(';')[0]
+                    if self.session_store:
+                        self.session_store.save(self.address, cookie)
             
             if response.status_code >= 200 and response.status_code < 300:
-                data = response.json()
+                with profiler.phase('json decode'):
+                    data = decode_envelope(response.content, endpoint, response.status_code)
+                code = data.get('code')
                 if data.get('code') in [0, '0']:
+                    outcome = 'ok'
                     return data.get('data', data)
+                if self.session_cookie and self._is_session_rejected(response, data):
+                    outcome = 'session_rejected'
+                    raise SessionInvalidError()
+                outcome = f"code_{data.get('code')}"
                 return data
             
-            raise Exception(f'HTTP {response.status_code}: {response.text}')
+            if self.session_cookie and self._is_session_rejected(response):
+                outcome = 'session_rejected'
+                raise SessionInvalidError()
+            
+            outcome = f'http_{response.status_code}'
+            raise RequestFailure.from_response(response, f'HTTP {response.status_code}: {response.text}')
         
+        except SessionInvalidError:
+            raise
+        except MalformedResponse:
+            outcome = 'malformed'
+            raise
         except Exception as e:
-            raise Exception(f'Request failed: {str(e)}')
+            if response is None:
+                self.breaker.record(False)
+            raise RequestFailure.from_exception(e, f'Request failed: {str(e)}') from e
+        finally:
+            latency = time.perf_counter() - started
+            metrics.observe_response(endpoint, method, latency, outcome, response, code)
+            recorder.record(method, url, started, latency, response.status_code if response is not None else None,
+                            outcome, self.name, kwargs.get('json', kwargs.get('data')),
+                            'form' if 'data' in kwargs else 'json')
+            if self.concurrency:
+                await self.concurrency.observe(latency, classify(response.status_code if response is not None else None, outcome))
+            Logger.event(self.name, 'request', method=method, endpoint=endpoint, outcome=outcome,
+                         status=response.status_code if response is not None else None,
+                         latency_ms=round(latency * 1000, 2))
+    
+    def invalidate_session(self):
+        """Drop the current session cookie locally and from the store"""
+        self.session_cookie = None
+        if self.session_store:
+            self.session_store.invalidate(self.address)
+    
+    async def ensure_session(self, captcha_token: str) -> bool:
+        """Reuse a cached session if still valid, otherwise log in. Returns True on reuse."""
+        self.captcha_token = captcha_token
+        cookie = self.session_store.get(self.address) if self.session_store else None
+        if cookie:
+            self.session_cookie = cookie
+            Logger.info(self.name, 'Reusing cached session')
+            return True
+        await self.login(captcha_token)
+        return False
+    
+    @classmethod
+    def sign_in_message(cls) -> SignInMessage:
+        """The parsed sign-in template (parsed once per template text)"""
+        return parse_message(cls.CUSTOM_SIGN_TEXT)
     
     async def login(self, captcha_token: str) -> Dict:
         """Login to BlockStreet"""
+        self.captcha_token = captcha_token
         try:
-            Logger.process(self.name, 'Generating signature...')
-            
-            message = encode_defunct(text=self.CUSTOM_SIGN_TEXT)
-            signed_message = self.account.sign_message(message)
-            signature = signed_message.signature.hex()
-            
-            import re
-            nonce_match = re.search(r'Nonce:\s*([^\n\r]+)', self.CUSTOM_SIGN_TEXT)
-            nonce = nonce_match.group(1).strip() if nonce_match else 'Z9YFj5VY80yTwN3n'
-            
-            issued_match = re.search(r'Issued At:\s*([^\n\r]+)', self.CUSTOM_SIGN_TEXT)
-            issued_at = issued_match.group(1).strip() if issued_match else datetime.now().isoformat()
-            
-            expiration_match = re.search(r'Expiration Time:\s*([^\n\r]+)', self.CUSTOM_SIGN_TEXT)
-            expiration_time = expiration_match.group(1).strip() if expiration_match else datetime.now().isoformat()
-            
-            data = {
-                'address': self.address,
-                'nonce': nonce,
-                'signature': signature,
-                'chainId': '1',
-                'issuedAt': issued_at,
-                'expirationTime': expiration_time,
-                'invite_code': os.getenv('INVITE_CODE', '')
-            }
-            
-            Logger.process(self.name, 'Authenticating with server...')
-            result = self._send_request('POST', '/account/signverify', data=data)
-            
-            Logger.success(self.name, 'Authentication successful âœ“')
-            return result
+            with profiler.phase('login', COMPOSITE):
+                Logger.process(self.name, 'Generating signature...')
+                
+                message = self.sign_in_message()
+                signature = self.signatures.sign(self.wallet_data, message)
+                fields = message.fields()
+                
+                data = {
+                    'address': self.address,
+                    'nonce': fields['nonce'],
+                    'signature': signature,
+                    'chainId': '1',
+                    'issuedAt': fields['issuedAt'],
+                    'expirationTime': fields['expirationTime'],
+                    'invite_code': os.getenv('INVITE_CODE', '')
+                }
+                
+                Logger.process(self.name, 'Authenticating with server...')
+                result = await self._send_request('POST', '/account/signverify', data=data)
+                
+                Logger.success(self.name, 'Authentication successful âœ“')
+                return result
         
         except Exception as e:
             raise Exception(f'Authentication failed: {str(e)}')
     
-    def get_token_list(self) -> List[Dict]:
+    async def get_token_list(self) -> List[Token]:
         """Get available tokens"""
-        return self._send_request('GET', '/swap/token_list')
+        return await self.market_cache.get('/swap/token_list', self._fetch_token_list)
     
-    def get_earn_info(self) -> Dict:
+    async def _fetch_token_list(self) -> List[Token]:
+        tokens = await self._send_request('GET', '/swap/token_list')
+        self._raise_if_rejected(tokens)
+        with profiler.phase('parse'):
+            return self.token_table.parse(tokens)
+    
+    async def get_earn_info(self) -> Dict:
         """Get earning information"""
-        return self._send_request('GET', '/earn/info')
+        return await self.market_cache.get('/earn/info', lambda: self._send_request('GET', '/earn/info'))
+    
+    async def get_supplies(self) -> List[SupplyPosition]:
+        """Get supplied assets and resync the balance ledger with them"""
+        with profiler.phase('fetch supplies', COMPOSITE):
+            supplies = await self._send_request('GET', '/my/supply')
+        self._raise_if_rejected(supplies)
+        with profiler.phase('parse'):
+            supplies = parse_supplies(supplies)
+        self.plan_cache.set_supplies(self.address, supplies)
+        drift = self.balances.sync(supplies)
+        if drift:
+            Logger.info(self.name, 'Balance ledger resynced, drift: '
+                                   + ', '.join(f'{symbol} {format_amount(delta)}' for symbol, delta in drift.items()),
+                        event='balance_drift')
+        return supplies
     
-    def get_supplies(self) -> List[Dict]:
-        """Get supplied assets"""
-        return self._send_request('GET', '/my/supply')
+    @staticmethod
+    def _raise_if_rejected(result: Any):
+        """_request hands back the whole body when its code is not 0"""
+        if isinstance(result, dict) and result.get('code') not in (None, 0, '0'):
+            raise Exception(f"Rejected by server: {result.get('message') or result.get('code')}")
     
-    def share(self) -> Dict:
+    async def _transact(self, endpoint: str, data: Dict) -> Dict:
+        """POST a balance-changing operation; a rejection marks the balance ledger for a resync"""
+        try:
+            result = await self._send_request('POST', endpoint, json=data)
+        except RequestFailure as e:
+            if e.status is not None and not e.transient:
+                self.balances.mark_stale()
+            raise
+        if isinstance(result, dict) and result.get('code') not in (None, 0, '0'):
+            self.balances.mark_stale()
+            self._raise_if_rejected(result)
+        return result
+    
+    async def share(self) -> Dict:
         """Daily check-in"""
         if not self._check_rate_limit():
             raise Exception('Rate limit exceeded')
         
-        return self._send_request('POST', '/share')
+        return await self._send_request('POST', '/share')
     
-    def swap(self, from_symbol: str, to_symbol: str, from_amount: float, to_amount: float) -> Dict:
+    async def swap(self, from_symbol: str, to_symbol: str, from_amount: Number, to_amount: Number) -> SwapResult:
         """Swap tokens with security checks"""
-        if not self._check_rate_limit():
-            raise Exception('Rate limit exceeded')
-        
+        # Validated first, so a rejected amount does not use up a transaction slot
         if not WalletManager.validate_transaction_amount(from_amount):
             raise Exception('Amount exceeds security limit')
         
+        if not self._check_rate_limit():
+            raise Exception('Rate limit exceeded')
+        
         data = {
             'from_symbol': from_symbol,
             'to_symbol': to_symbol,
-            'from_amount': str(from_amount),
-            'to_amount': str(to_amount)
+            'from_amount': format_amount(from_amount),
+            'to_amount': format_amount(to_amount)
         }
         
-        return self._send_request('POST', '/swap', json=data)
+        with profiler.phase('swap request', COMPOSITE):
+            result = SwapResult.parse(await self._transact('/swap', data))
+        self.balances.record_swap(from_symbol, to_symbol, from_amount, to_amount)
+        return result
     
-    def supply(self, symbol: str, amount: float) -> Dict:
+    async def supply(self, symbol: str, amount: Number) -> Dict:
         """Supply tokens with security checks"""
-        if not self._check_rate_limit():
-            raise Exception('Rate limit exceeded')
-        
         if not WalletManager.validate_transaction_amount(amount):
             raise Exception('Amount exceeds security limit')
         
+        if not self._check_rate_limit():
+            raise Exception('Rate limit exceeded')
+        
         data = {
             'symbol': symbol,
-            'amount': str(amount)
+            'amount': format_amount(amount)
         }
         
-        return self._send_request('POST', '/supply', json=data)
+        result = await self._transact('/supply', data)
+        self.balances.record('supply', symbol, amount)
+        return result
     
-    def withdraw(self, symbol: str, amount: float) -> Dict:
+    async def withdraw(self, symbol: str, amount: Number) -> Dict:
         """Withdraw tokens with security checks"""
-        if not self._check_rate_limit():
-            raise Exception('Rate limit exceeded')
-        
         if not WalletManager.validate_transaction_amount(amount):
             raise Exception('Amount exceeds security limit')
         
+        if not self._check_rate_limit():
+            raise Exception('Rate limit exceeded')
+        
         data = {
             'symbol': symbol,
-            'amount': str(amount)
+            'amount': format_amount(amount)
         }
         
-        return self._send_request('POST', '/withdraw', json=data)
+        result = await self._transact('/withdraw', data)
+        self.balances.record('withdraw', symbol, amount)
+        return result
     
-    def borrow(self, symbol: str, amount: float) -> Dict:
+    async def borrow(self, symbol: str, amount: Number) -> Dict:
         """Borrow tokens with security checks"""
-        if not self._check_rate_limit():
-            raise Exception('Rate limit exceeded')
-        
         if not WalletManager.validate_transaction_amount(amount):
             raise Exception('Amount exceeds security limit')
         
+        if not self._check_rate_limit():
+            raise Exception('Rate limit exceeded')
+        
         data = {
             'symbol': symbol,
-            'amount': str(amount)
+            'amount': format_amount(amount)
         }
         
-        return self._send_request('POST', '/borrow', json=data)
+        result = await self._transact('/borrow', data)
+        self.balances.record('borrow', symbol, amount)
+        return result
     
-    def repay(self, symbol: str, amount: float) -> Dict:
+    async def repay(self, symbol: str, amount: Number) -> Dict:
         """Repay borrowed tokens with security checks"""
-        if not self._check_rate_limit():
-            raise Exception('Rate limit exceeded')
-        
         if not WalletManager.validate_transaction_amount(amount):
             raise Exception('Amount exceeds security limit')
         
+        if not self._check_rate_limit():
+            raise Exception('Rate limit exceeded')
+        
         data = {
             'symbol': symbol,
-            'amount': str(amount)
+            'amount': format_amount(amount)
         }
         
-        return self._send_request('POST', '/repay', json=data)
+        result = await self._transact('/repay', data)
+        self.balances.record('repay', symbol, amount)
+        return result
+
+def get_random_amount(min_val: float, max_val: float) -> float:
+    """Generate random amount within range"""
+    return round(random.uniform(min_val, max_val), 6)
 
-async def process_auto_swap(wallets: List[Dict], proxies: List[str], token_list: List[Dict], captcha_token: str, tx_count: int):
-    """Process auto swap for all wallets"""
-    Logger.info(None, f'Starting Auto Swap for {len(wallets)} wallet(s)')
+def untradable(amount: Number, sources: List[str]) -> str:
+    """Why quote_swap found nothing although the balance covers amount"""
+    return (f"No tradable quote: {format_amount(amount)} of {', '.join(sources)} is below one unit "
+            f"of every target token at its precision")
+
+def draw_delay(min_sec: float = 3, max_sec: float = 8) -> float:
+    """Seconds random_delay sleeps"""
+    return random.uniform(min_sec, max_sec) * DELAY_SCALE
+
+async def random_delay(min_sec: float = 3, max_sec: float = 8, planned: Optional[float] = None):
+    """Random delay between operations; planned replaces the draw when executing a plan"""
+    delay = draw_delay(min_sec, max_sec) if planned is None else planned
+    with profiler.phase('delay', SLEEP):
+        await asyncio.sleep(delay)
+
+def wallet_slots(concurrency: int):
+    """Admission for wallet operations: the adaptive controller with --adaptive, else a fixed `concurrency`"""
+    return BlockStreetAPI.concurrency or asyncio.Semaphore(max(1, concurrency))
+
+async def run_wallets(wallets: List[Wallet], proxies: List[str], handler, concurrency: int = 1) -> List:
+    """Run handler(idx, wallet_data, proxy) for every wallet, at most `concurrency` (or the adaptive limit) at a time"""
+    semaphore = wallet_slots(concurrency)
+    
+    async def run_one(idx: int, wallet_data: Wallet):
+        proxy = proxies[(idx - 1) % len(proxies)] if proxies else None
+        async with semaphore:
+            try:
+                return await handler(idx, wallet_data, proxy)
+            except Exception as e:
+                Logger.error(wallet_data.name, f'Error: {str(e)}')
+                return None
+    
+    return await asyncio.gather(*(run_one(idx, wallet_data) for idx, wallet_data in enumerate(wallets, 1)))
+
+async def presign_wallets(wallets: List[Wallet], workers: int = SIGN_WORKERS):
+    """Sign the sign-in message for wallets up front, off the event loop, so their logins only send a request"""
+    if workers < 1 or not wallets:
+        return
+    signed = await asyncio.to_thread(BlockStreetAPI.signatures.presign, wallets, BlockStreetAPI.sign_in_message(), workers)
+    if signed:
+        Logger.info(None, f'Signed the sign-in message for {signed} wallet(s) up front ({min(workers, signed)} worker(s))')
+
+async def preauth_wallets(wallets: List[Wallet], proxies: List[str], captcha_token: str, session_store: SessionStore, concurrency: int = 1, sign_workers: int = SIGN_WORKERS):
+    """Refresh missing or stale cached sessions concurrently before any operation runs"""
+    # Keep the wallet's position so it gets the same proxy as in run_wallets
+    stale = [(idx, w) for idx, w in enumerate(wallets, 1) if not session_store.get(w.address)]
+    Logger.info(None, f'Sessions cached: {len(wallets) - len(stale)}/{len(wallets)}, refreshing {len(stale)}')
+    await presign_wallets([w for _, w in stale], sign_workers)
+    semaphore = wallet_slots(concurrency)
+    
+    async def refresh(idx: int, wallet_data: Wallet):
+        proxy = proxies[(idx - 1) % len(proxies)] if proxies else None
+        async with semaphore:
+            try:
+                await BlockStreetAPI(wallet_data, proxy, session_store).login(captcha_token)
+            except Exception as e:
+                Logger.error(wallet_data.name, f'Pre-auth failed: {str(e)}')
+    
+    await asyncio.gather(*(refresh(idx, w) for idx, w in stale))
+
+async def process_auto_swap(wallets: List[Wallet], proxies: List[str], token_list: List[Token], captcha_token: str, tx_count: int, concurrency: int = 1, session_store: Optional[SessionStore] = None, ledger: Optional[RunLedger] = None, on_wallet_done: Optional[Callable[[Dict], None]] = None, plan: Optional[Plan] = None) -> List[Dict]:
+    """Process auto swap for all wallets; returns one result dict per wallet
+    
+    With a plan every wallet runs exactly its planned swaps and delays instead of drawing them.
+    """
+    Logger.info(None, f'Starting Auto Swap for {len(wallets)} wallet(s)' + (' (executing plan)' if plan else ''))
     Logger.info(None, f'Transactions per wallet: {tx_count}')
+    adaptive = BlockStreetAPI.concurrency
+    Logger.info(None, f'Concurrency: adaptive, {adaptive.current} up to {adaptive.ceiling}' if adaptive else f'Concurrency: {concurrency}')
+    quotes = get_quote_engine(token_list)
     
-    proxy_index = 0
-    for idx, wallet_data in enumerate(wallets, 1):
-        proxy = proxies[proxy_index % len(proxies)] if proxies else None
-        proxy_index += 1
+    async def auto_swap_wallet(idx: int, wallet_data: Wallet, proxy: Optional[str]) -> Dict:
+        result = {'wallet': wallet_data.name, 'address': wallet_data.address, 'ok': 0, 'failed': 0, 'status': 'done'}
+        try:
+            await swap_wallet(idx, wallet_data, proxy, result)
+        except Exception as e:
+            Logger.error(wallet_data.name, f'Error: {str(e)}')
+            result['status'] = 'error'
+            result['error'] = str(e)
+        if on_wallet_done:
+            on_wallet_done(result)
+        return result
+    
+    async def swap_wallet(idx: int, wallet_data: Wallet, proxy: Optional[str], result: Dict):
+        address = wallet_data.address
+        progress = ledger.progress(address) if ledger else None
+        if progress and progress.done:
+            Logger.info(wallet_data.name, 'Already completed in this run, skipping')
+            result['status'] = 'skipped'
+            return
+        start_tx = progress.tx_done if progress else 0
+        planned = None
+        if plan:
+            wallet_plan = plan.for_address(address)
+            if wallet_plan is None:
+                Logger.warning(wallet_data.name, 'Not in the plan, skipping')
+                result['status'] = 'unplanned'
+                return
+            planned = wallet_plan.swaps()
         
-        print(f"\n{Colors.CYAN}{'â•' * 60}{Colors.RESET}")
-        print(f"{Colors.YELLOW}Processing Wallet {idx}/{len(wallets)}: {wallet_data['name']}{Colors.RESET}")
-        print(f"{Colors.CYAN}{'â•' * 60}{Colors.RESET}")
+        def record_tx(i: int, quote, ok: bool, response):
+            result['ok' if ok else 'failed'] += 1
+            if ledger:
+                request = None if quote is None else {
+                    'from': quote.from_symbol, 'to': quote.to_symbol,
+                    'from_amount': format_amount(quote.from_amount), 'to_amount': format_amount(quote.to_amount),
+                }
+                ledger.tx(address, i + 1, tx_count, '/swap', request, ok, response)
         
-        api = BlockStreetAPI(wallet_data, proxy)
+        Logger.raw(f"\n{Colors.CYAN}{'â•' * 60}{Colors.RESET}\n"
+                   f"{Colors.YELLOW}Processing Wallet {idx}/{len(wallets)}: {wallet_data.name}{Colors.RESET}\n"
+                   f"{Colors.CYAN}{'â•' * 60}{Colors.RESET}")
         
-        try:
-            await api.login(captcha_token)
+        api = BlockStreetAPI(wallet_data, proxy, session_store)
+        
+        await api.ensure_session(captcha_token)
+        if ledger:
+            ledger.phase(address, 'login')
+        
+        await api.get_supplies()
+        balances = api.balances
+        if ledger:
+            ledger.phase(address, 'supplies')
+        
+        if not balances.held():
+            Logger.warning(wallet_data.name, 'No supplied assets found to swap')
+            result['status'] = 'no_assets'
+            if ledger:
+                ledger.phase(address, 'done', 'no supplied assets')
+            return
+        
+        if start_tx:
+            Logger.info(wallet_data.name, f'Resuming after swap {start_tx}/{tx_count}')
+        amounts, batch = [], []
+        if planned is None:
+            # All of the wallet's quotes up front; each one is checked against the live balances before it is sent
+            with profiler.phase('quote'):
+                amounts = [get_random_amount(0.001, 0.0015) for _ in range(start_tx, tx_count)]
+                batch = quotes.plan_swaps(balances.balances, amounts, balances.min_balance)
+        for i in range(start_tx, tx_count):
+            if planned is not None and i >= len(planned):
+                Logger.info(wallet_data.name, f'Plan ends after {len(planned)} swap(s)')
+                break
+            step = planned[i] if planned is not None else None
+            wait = api.limiter.wait_time(address)
+            if wait:
+                Logger.warning(wallet_data.name, f'Hourly transaction limit reached, next slot in {wait / 60:.0f} min, stopping',
+                               event='rate_limited', wait=round(wait))
+                result['status'] = 'rate_limited'
+                break
+            Logger.process(wallet_data.name, f'Executing swap {i + 1}/{tx_count}')
             
-            supplies = api.get_supplies()
-            owned_tokens = [s for s in supplies if s and float(s.get('amount', 0)) > 0]
+            quote = None
+            try:
+                if balances.needs_sync:
+                    await api.get_supplies()
+                if step is not None and not step['endpoint']:
+                    Logger.warning(wallet_data.name, 'No tradable quote in the plan for this swap, skipping')
+                    record_tx(i, quote, False, 'no tradable quote')
+                    continue
+                with profiler.phase('quote'):
+                    if step is None:
+                        amount = amounts[i - start_tx]
+                        quote = batch[i - start_tx] if i - start_tx < len(batch) else None
+                        # The batch assumed every earlier swap went through; requote when the live balances disagree
+                        if quote is not None and balances.can_cover(quote.from_symbol, quote.from_amount):
+                            sources = [quote.from_symbol]
+                        else:
+                            quote = None
+                            sources = balances.covering(amount)
+                    else:
+                        amount = to_decimal(step['from_amount'])
+                        sources = balances.covering(amount, [step['from_symbol']])
+                if not sources and balances.ops_since_sync:
+                    # The local view only ever estimates; confirm with the server before giving up
+                    await api.get_supplies()
+                    sources = balances.covering(amount, None if step is None else [step['from_symbol']])
+                if not sources:
+                    Logger.warning(wallet_data.name, f'No asset balance covers {amount} above the minimum, stopping')
+                    result['status'] = 'low_balance'
+                    break
+                
+                with profiler.phase('quote'):
+                    if step is not None:
+                        quote = SwapQuote(step['from_symbol'], step['to_symbol'], amount, to_decimal(step['to_amount']))
+                    elif quote is None:
+                        quote = quotes.quote_swap(sources, amount)
+                if quote is None:
+                    Logger.warning(wallet_data.name, f'{untradable(amount, sources)}, skipping')
+                    record_tx(i, quote, False, 'no tradable quote: output rounds to zero')
+                    continue
+                
+                response = await api.swap(quote.from_symbol, quote.to_symbol, quote.from_amount, quote.to_amount)
+                record_tx(i, quote, True, response.to_dict())
+                Logger.success(wallet_data.name, f'Swapped {quote.from_amount:.6f} {quote.from_symbol} â†’ {quote.to_amount:.6f} {quote.to_symbol}',
+                               event='swap', endpoint='/swap', outcome='ok', tx=i + 1)
+                
+            except Exception as e:
+                record_tx(i, quote, False, str(e))
+                Logger.error(wallet_data.name, f'Swap failed: {str(e)}', event='swap', endpoint='/swap', outcome='failed', tx=i + 1)
             
-            if not owned_tokens:
-                Logger.warning(wallet_data['name'], 'No supplied assets found to swap')
+            if i < tx_count - 1:
+                await random_delay(planned=None if step is None else step['delay_after'])
+        
+        # A rate-limited wallet is not done: --resume picks it up once slots are free again
+        if ledger and result['status'] != 'rate_limited':
+            ledger.phase(address, 'done', 'balance exhausted' if result['status'] == 'low_balance' else None)
+    
+    results = await run_wallets(wallets, proxies, auto_swap_wallet, concurrency)
+    Logger.success(None, 'Auto Swap completed')
+    return results
+
+# Auto All Operations, in pipeline order after login
+ALL_OPERATIONS = ('share', 'supply', 'swap', 'borrow', 'repay', 'withdraw')
+
+class OperationJob:
+    """One wallet's state while it moves through the Auto All Operations stages"""
+    
+    def __init__(self, idx: int, wallet_data: Wallet, proxy: Optional[str]):
+        self.idx = idx
+        self.wallet_data = wallet_data
+        self.name = wallet_data.name
+        self.proxy = proxy
+        self.api: Optional[BlockStreetAPI] = None
+        # (symbol, amount) supplied / borrowed earlier in the run, undone by withdraw / repay
+        self.supplied: Optional[Tuple[str, float]] = None
+        self.borrowed: Optional[Tuple[str, float]] = None
+        self.result = {'wallet': self.name, 'address': wallet_data.address, 'ok': 0, 'failed': 0, 'status': 'done'}
+
+async def process_auto_all(wallets: List[Wallet], proxies: List[str], token_list: List[Token], captcha_token: str, concurrency: int = 1, session_store: Optional[SessionStore] = None, ledger: Optional[RunLedger] = None, stage_concurrency: Optional[Dict[str, int]] = None) -> List[Dict]:
+    """Run share, supply, swap, borrow, repay and withdraw for every wallet as a stage pipeline"""
+    stage_concurrency = stage_concurrency or {}
+    Logger.info(None, f'Starting Auto All Operations for {len(wallets)} wallet(s)')
+    quotes = get_quote_engine(token_list)
+    
+    async def login(job: OperationJob):
+        job.api = BlockStreetAPI(job.wallet_data, job.proxy, session_store)
+        await job.api.ensure_session(captcha_token)
+        await job.api.get_supplies()
+        if ledger:
+            ledger.phase(job.result['address'], 'login')
+    
+    async def share(job: OperationJob):
+        await job.api.share()
+        Logger.success(job.name, 'Daily check-in done')
+    
+    async def supply(job: OperationJob):
+        symbol, amount = random.choice(quotes.symbols), get_random_amount(0.001, 0.0015)
+        await job.api.supply(symbol, amount)
+        job.supplied = (symbol, amount)
+        Logger.success(job.name, f'Supplied {amount:.6f} {symbol}')
+    
+    async def swap(job: OperationJob):
+        balances = job.api.balances
+        if balances.needs_sync:
+            await job.api.get_supplies()
+        with profiler.phase('quote'):
+            amount = get_random_amount(0.001, 0.0015)
+            sources = balances.covering(amount)
+            quote = quotes.quote_swap(sources, amount) if sources else None
+        if not sources:
+            raise Exception(f'No asset balance covers {amount} above the minimum')
+        if quote is None:
+            raise Exception(untradable(amount, sources))
+        await job.api.swap(quote.from_symbol, quote.to_symbol, quote.from_amount, quote.to_amount)
+        Logger.success(job.name, f'Swapped {quote.from_amount:.6f} {quote.from_symbol} â†’ {quote.to_amount:.6f} {quote.to_symbol}')
+    
+    async def borrow(job: OperationJob):
+        symbol, amount = random.choice(quotes.symbols), get_random_amount(0.001, 0.0015)
+        await job.api.borrow(symbol, amount)
+        job.borrowed = (symbol, amount)
+        Logger.success(job.name, f'Borrowed {amount:.6f} {symbol}')
+    
+    async def repay(job: OperationJob):
+        if job.borrowed is None:
+            Logger.info(job.name, 'Nothing borrowed in this run, skipping repay')
+            return
+        symbol, amount = job.borrowed
+        await job.api.repay(symbol, amount)
+        Logger.success(job.name, f'Repaid {amount:.6f} {symbol}')
+    
+    async def withdraw(job: OperationJob):
+        if job.supplied is None:
+            Logger.info(job.name, 'Nothing supplied in this run, skipping withdraw')
+            return
+        symbol, amount = job.supplied
+        await job.api.withdraw(symbol, amount)
+        Logger.success(job.name, f'Withdrew {amount:.6f} {symbol}')
+    
+    def operation(name: str, body: Callable[[OperationJob], Awaitable[None]]):
+        async def run(job: OperationJob):
+            Logger.process(job.name, f'{name.capitalize()}...')
+            try:
+                await body(job)
+            except Exception as e:
+                job.result['failed'] += 1
+                if ledger:
+                    ledger.phase(job.result['address'], f'{name}_failed', str(e))
+                raise
+            job.result['ok'] += 1
+            if ledger:
+                ledger.phase(job.result['address'], name)
+        return run
+    
+    def finished(job: OperationJob, completed: bool):
+        if not completed:
+            job.result['status'] = 'error'
+        if ledger:
+            ledger.phase(job.result['address'], 'done', None if completed else 'login failed')
+    
+    def admitted(body: Callable[[OperationJob], Awaitable[None]]):
+        # With --adaptive the controller also bounds the operations in flight across all stages
+        adaptive = BlockStreetAPI.concurrency
+        if adaptive is None:
+            return body
+        
+        async def run(job: OperationJob):
+            async with adaptive:
+                await body(job)
+        return run
+    
+    bodies = {'share': share, 'supply': supply, 'swap': swap, 'borrow': borrow, 'repay': repay, 'withdraw': withdraw}
+    stages = [Stage('login', admitted(login), stage_concurrency.get('login', concurrency), required=True)]
+    # Same pacing between one wallet's operations as auto swap, slept outside the stage workers
+    stages += [Stage(name, operation(name, admitted(bodies[name])), stage_concurrency.get(name, concurrency), pace=random_delay)
+               for name in ALL_OPERATIONS]
+    Logger.info(None, 'Stages: ' + ', '.join(f'{stage.name}={stage.concurrency}' for stage in stages))
+    
+    jobs = []
+    for idx, wallet_data in enumerate(wallets, 1):
+        progress = ledger.progress(wallet_data.address) if ledger else None
+        if progress and progress.done:
+            Logger.info(wallet_data.name, 'Already completed in this run, skipping')
+            continue
+        jobs.append(OperationJob(idx, wallet_data, proxies[(idx - 1) % len(proxies)] if proxies else None))
+    
+    pipeline = Pipeline(stages, on_item_done=finished)
+    await pipeline.run(jobs)
+    Logger.success(None, 'Auto All Operations completed')
+    Logger.raw(pipeline.format_stats())
+    return [job.result for job in jobs]
+
+def parse_stage_limit(value: str) -> Tuple[str, int]:
+    """'swap=2' -> ('swap', 2)"""
+    name, _, count = value.partition('=')
+    if name not in ('login',) + ALL_OPERATIONS or not count.isdigit() or int(count) < 1:
+        raise argparse.ArgumentTypeError(f'invalid stage limit {value!r}, expected STAGE=N with STAGE one of '
+                                         f"{', '.join(('login',) + ALL_OPERATIONS)}")
+    return name, int(count)
+
+def run_shard(shard_id: int, items: List[Dict], config: Dict, events):
+    """Shard worker process body: auto swap over one shard, reporting everything to the supervisor"""
+    Logger.configure(config['log_level'])
+    Logger.forward(events, jsonl=config['log_events'])
+    BlockStreetAPI.market_cache.ttl = config['cache_ttl']
+    BlockStreetAPI.transport = create_transport(config['transport'])
+    BlockStreetAPI.limiter = SlidingWindowLimiter(SecurityConfig.MAX_TRANSACTIONS_PER_HOUR, path=config['rate_limit_db'])
+    if config['adaptive']:
+        BlockStreetAPI.concurrency = AIMDController(config['adaptive']['initial'], config['adaptive']['ceiling'])
+    
+    wallets = [Wallet(item['name'], item['address'], item['key']) for item in items]
+    # One proxy per wallet, in shard order, so every wallet keeps the proxy it has in a single-process run
+    proxies = [item['proxy'] for item in items] if any(item['proxy'] for item in items) else []
+    session_store = SessionStore(config['session_file']) if config['session_file'] else None
+    ledger = None
+    if config['ledger']:
+        ledger = RunLedger(config['ledger'])
+        ledger.attach_run(config['run_id'])
+    
+    async def run():
+        try:
+            await process_auto_swap(wallets, proxies, config['token_list'], config['captcha_token'], config['tx_count'],
+                                    config['concurrency'], session_store, ledger,
+                                    on_wallet_done=lambda result: events.put(('result', shard_id, result)))
+        finally:
+            await BlockStreetAPI.transport.aclose()
+    
+    try:
+        asyncio.run(run())
+    finally:
+        if session_store:
+            # Worker processes end with os._exit, which would drop a pending batch
+            session_store.flush()
+        if ledger:
+            ledger.close()
+        events.put(('metrics', metrics.snapshot()))
+        Logger.flush()
+    events.put(('done', shard_id))
+
+def run_sharded(wallets: List[Wallet], proxies: List[str], token_list: List[Token], captcha_token: str, tx_count: int, args: argparse.Namespace, ledger: Optional[RunLedger] = None) -> List[Dict]:
+    """Auto swap over `args.workers` processes; blocks until every shard is finished"""
+    items = [
+        {
+            'key': wallet_data.key,
+            'name': wallet_data.name,
+            'address': wallet_data.address,
+            'proxy': proxies[(idx - 1) % len(proxies)] if proxies else None,
+        }
+        for idx, wallet_data in enumerate(wallets, 1)
+    ]
+    config = {
+        'token_list': token_list,
+        'captcha_token': captcha_token,
+        'tx_count': tx_count,
+        'concurrency': args.concurrency,
+        'transport': BlockStreetAPI.transport.name,
+        'cache_ttl': args.cache_ttl,
+        'session_file': None if args.no_session_cache else args.session_file,
+        'rate_limit_db': BlockStreetAPI.limiter.path,
+        'ledger': ledger.path if ledger else None,
+        'run_id': ledger.run_id if ledger else None,
+        'log_level': args.log_level,
+        'log_events': Logger.jsonl is not None,
+        # Each worker adapts on its own from its --concurrency; split the ceiling so the total stays under it
+        'adaptive': None if BlockStreetAPI.concurrency is None else {
+            'initial': args.concurrency,
+            'ceiling': max(1, BlockStreetAPI.concurrency.ceiling // args.workers),
+        },
+    }
+    if ledger:
+        # Workers write into the same run; make sure they see everything recorded so far
+        ledger.flush()
+    if not BlockStreetAPI.limiter.path:
+        Logger.warning(None, 'No rate limit store: each worker process enforces the transaction limit on its own')
+    return ShardSupervisor(run_shard, args.workers).run(items, config)
+
+async def fetch_token_list(wallet_data: Wallet, proxy: Optional[str], captcha_token: str, session_store: Optional[SessionStore] = None) -> List[Token]:
+    """Fetch the market token list through one authenticated wallet and keep a copy for --plan"""
+    api = BlockStreetAPI(wallet_data, proxy, session_store)
+    await api.ensure_session(captcha_token)
+    token_list = await api.get_token_list()
+    BlockStreetAPI.plan_cache.set_token_list(token_list)
+    return token_list
+
+def build_swap_plan(wallets: List[Wallet], cache: PlanCache, tx_count: int, session_store: Optional[SessionStore] = None) -> Plan:
+    """Auto swap plan from local data only: the requests process_auto_swap would send and the swaps it would draw
+    
+    Each wallet's balance ledger starts from its cached supplies and is updated by the planned swaps, as
+    online; a wallet without cached supplies is assumed to hold enough of every listed token.
+    """
+    quotes = get_quote_engine(cache.token_list)
+    limiter = BlockStreetAPI.limiter
+    plan = Plan('auto_swap', {'tx_count': tx_count, 'delay_scale': DELAY_SCALE},
+                preamble=[{'endpoint': 'GET /swap/token_list', 'delay_after': 0.0}])
+    rate_limited, low_balance, uncached = [], [], 0
+    too_large = 0
+    for wallet_data in wallets:
+        wallet_plan = WalletPlan(wallet_data.name, wallet_data.address)
+        plan.wallets.append(wallet_plan)
+        if not (session_store and session_store.get(wallet_data.address)):
+            wallet_plan.add('POST /account/signverify')
+        wallet_plan.add('GET /my/supply')
+        balances = BalanceLedger(SecurityConfig.MIN_BALANCE_THRESHOLD, resync_every=0)
+        supplies = cache.supplies.get(wallet_data.address.lower())
+        if supplies is None:
+            uncached += 1
+            supplies = {symbol: 1 for symbol in quotes.symbols}
+        balances.sync(supplies)
+        if not balances.held():
+            wallet_plan.status = 'no_assets'
+            continue
+        count = max(0, min(tx_count, limiter.limit - limiter.used(wallet_data.address)))
+        # Same draws in the same order as process_auto_swap: every amount, the batch of quotes, then a delay per swap
+        amounts = [get_random_amount(0.001, 0.0015) for _ in range(count)]
+        batch = quotes.plan_swaps(balances.balances, amounts, balances.min_balance)
+        for i, quote in enumerate(batch):
+            if i and i % RESYNC_EVERY == 0:
+                wallet_plan.add('GET /my/supply')
+            if quote is None:
+                wallet_plan.add(None, swap=True)
                 continue
+            if amounts[i] > SecurityConfig.MAX_TRANSACTION_AMOUNT:
+                too_large += 1
+            wallet_plan.add('POST /swap', draw_delay() if i < tx_count - 1 else 0.0, swap=True,
+                            from_symbol=quote.from_symbol, to_symbol=quote.to_symbol,
+                            from_amount=format_amount(quote.from_amount), to_amount=format_amount(quote.to_amount))
+        if len(batch) < count:
+            if batch and len(batch) % RESYNC_EVERY == 0:
+                # The resync due at the swap that finds no balance still happens
+                wallet_plan.add('GET /my/supply')
+            wallet_plan.status = 'low_balance'
+            low_balance.append(wallet_data.name)
+        elif count < tx_count:
+            wallet_plan.status = 'rate_limited'
+            rate_limited.append(wallet_data.name)
+    
+    if uncached:
+        Logger.warning(None, f'{uncached} wallet(s) have no cached supplies; planned as holding every token')
+    if low_balance:
+        plan.bindings.append(f'MIN_BALANCE_THRESHOLD ({SecurityConfig.MIN_BALANCE_THRESHOLD}) stops '
+                             f'{len(low_balance)} wallet(s) early: ' + ', '.join(low_balance))
+    if rate_limited:
+        plan.bindings.append(f'MAX_TRANSACTIONS_PER_HOUR ({limiter.limit}) stops {len(rate_limited)} wallet(s) early: '
+                             + ', '.join(rate_limited))
+    if too_large:
+        plan.bindings.append(f'MAX_TRANSACTION_AMOUNT ({SecurityConfig.MAX_TRANSACTION_AMOUNT}) rejects {too_large} swap(s)')
+    return plan
+
+def run_plan(wallets: List[Wallet], args: argparse.Namespace, session_store: Optional[SessionStore]):
+    """--plan: build the auto swap plan, simulate it and print the prediction; no network traffic"""
+    cache = BlockStreetAPI.plan_cache
+    if not cache.token_list:
+        Logger.error(None, f'No cached token list in {cache.filename}; run Auto Swap once to create it')
+        return
+    plan = build_swap_plan(wallets, cache, args.tx_count, session_store)
+    latency = parse_distribution(args.plan_latency, 0.001)
+    delay = parse_distribution(args.plan_delay) if args.plan_delay else None
+    sim = simulate(plan, args.concurrency, latency, delay, model='slots')
+    Logger.raw(format_plan(plan, sim))
+    if args.plan_out:
+        plan.save(args.plan_out)
+        Logger.success(None, f'Plan written to {args.plan_out}; run it with --execute-plan {args.plan_out}')
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description='BlockStreet Auto Bot')
+    parser.add_argument('--concurrency', type=int, default=int(os.getenv('CONCURRENCY', '1')),
+                        help='number of wallets processed in parallel (default: 1), per worker with --workers')
+    parser.add_argument('--stage-concurrency', nargs='*', type=parse_stage_limit, default=[], metavar='STAGE=N',
+                        help='Auto All Operations: workers for a stage (login, share, supply, swap, borrow, repay, '
+                             'withdraw); other stages use --concurrency')
+    parser.add_argument('--adaptive', action='store_true', default=bool(os.getenv('ADAPTIVE_CONCURRENCY')),
+                        help='adapt how many wallets run at once to API health (AIMD): starts at --concurrency, grows '
+                             'while requests are fast and error-free, backs off on errors; capped by '
+                             'SecurityConfig.MAX_CONCURRENT_REQUESTS')
+    parser.add_argument('--wallet-index', default=WALLET_INDEX,
+                        help='cache of wallet addresses, reused while private_keys.txt is unchanged ("" disables it)')
+    parser.add_argument('--startup-profile', action='store_true',
+                        help='print how long imports, wallet loading and the other start-up phases took')
+    parser.add_argument('--plan', action='store_true',
+                        help='predict an Auto Swap run (wall time, requests, limits) from local data and exit; sends nothing')
+    parser.add_argument('--plan-out', help='with --plan: save the plan for --execute-plan')
+    parser.add_argument('--plan-latency', default='lognormal:150,0.5',
+                        help="request latency model in ms: N, uniform:A,B, normal:MEAN,SD or lognormal:MEDIAN,SIGMA")
+    parser.add_argument('--plan-delay', help='delay model in s replacing the planned draws (same forms as --plan-latency)')
+    parser.add_argument('--plan-cache', default=PLAN_CACHE,
+                        help="token list and supplies kept from online runs for --plan (default: plan_cache.json; '' disables)")
+    parser.add_argument('--execute-plan', help='Auto Swap runs exactly the swaps and delays of this saved plan')
+    parser.add_argument('--tx-count', type=int, default=5, help='transactions per wallet (menu option 8 changes it)')
+    parser.add_argument('--seed', type=int, default=int(os.environ['SEED']) if os.getenv('SEED') else None,
+                        help='seed amounts, asset choices, delays and retry jitter, for a repeatable workload')
+    parser.add_argument('--capture', help='record every request (secrets redacted) to this file for traffic.py')
+    parser.add_argument('--profile', action='store_true',
+                        help='time run phases (signing, JSON, network, delays, ...) and print a breakdown at exit')
+    parser.add_argument('--profile-out', help='also dump a cProfile of every thread to this file (pstats format)')
+    parser.add_argument('--profile-memory', action='store_true', help='also report tracemalloc allocation growth')
+    parser.add_argument('--sign-workers', type=int, default=SIGN_WORKERS,
+                        help='processes signing the sign-in message up front (default: 1, in-process; 0: sign at login)')
+    parser.add_argument('--workers', type=int, default=WORKERS,
+                        help='run auto swap in this many processes, each over a shard of the wallets (default: 1)')
+    parser.add_argument('--rate-limit-db', default=RATE_LIMIT_DB,
+                        help='SQLite file holding the per-wallet transaction slots, shared by runs and workers '
+                             "(default: rate_limit.db; '' keeps them in memory)")
+    parser.add_argument('--session-file', default=os.getenv('SESSION_FILE', 'sessions.json'),
+                        help='on-disk session cache (default: sessions.json)')
+    parser.add_argument('--no-session-cache', action='store_true',
+                        help='always sign in instead of reusing cached sessions')
+    parser.add_argument('--cache-ttl', type=float, default=MARKET_CACHE_TTL,
+                        help=f'seconds token list / earn info stay fresh (default: {MARKET_CACHE_TTL:g})')
+    parser.add_argument('--transport', choices=sorted(TRANSPORTS), default=HTTP_TRANSPORT,
+                        help=f'HTTP transport for API calls (default: {HTTP_TRANSPORT}); http1 is recommended, '
+                             'http2 needs fewer connections but its pure-Python framing adds latency per request')
+    parser.add_argument('--ledger', default=os.getenv('RUN_LEDGER', DEFAULT_LEDGER),
+                        help=f'SQLite run ledger (default: {DEFAULT_LEDGER})')
+    parser.add_argument('--no-ledger', action='store_true', help='do not record runs')
+    parser.add_argument('--resume', action='store_true',
+                        help='continue the last unfinished auto swap run from its checkpoint')
+    parser.add_argument('--metrics-file', default=METRICS_FILE or None,
+                        help='write per-endpoint request metrics in Prometheus text format after each run')
+    parser.add_argument('--metrics-port', type=int, default=METRICS_PORT,
+                        help='serve Prometheus metrics on http://127.0.0.1:PORT/metrics (default: off)')
+    parser.add_argument('--log-level', choices=list(LEVELS), default=LOG_LEVEL,
+                        help=f'lowest level shown and recorded (default: {LOG_LEVEL})')
+    parser.add_argument('--log-jsonl', default=LOG_JSONL or None,
+                        help='append structured JSONL log records (with per-request timings) to this file')
+    parser.add_argument('--quiet', action='store_true', help='no console log output')
+    parser.add_argument('--no-color', action='store_true', help='plain console output without ANSI colours')
+    return parser.parse_args(argv)
+
+async def main():
+    profile = StartupProfile(IMPORT_STARTED)
+    profile.mark('imports')
+    args = parse_args()
+    Logger.configure(args.log_level, args.log_jsonl, args.quiet, False if args.no_color else None)
+    profiler.configure(args.profile, args.profile_out, args.profile_memory)
+    profiler.start()
+    seed_random(args.seed)
+    recorder.configure(args.capture, bot='bot_no2captcha', seed=args.seed, concurrency=args.concurrency)
+    BlockStreetAPI.market_cache.ttl = args.cache_ttl
+    BlockStreetAPI.transport = create_transport(args.transport)
+    BlockStreetAPI.plan_cache = PlanCache(args.plan_cache or None)
+    if args.rate_limit_db:
+        BlockStreetAPI.limiter = SlidingWindowLimiter(SecurityConfig.MAX_TRANSACTIONS_PER_HOUR, path=args.rate_limit_db)
+    stage_concurrency = dict(args.stage_concurrency)
+    if args.adaptive:
+        if args.concurrency > SecurityConfig.MAX_CONCURRENT_REQUESTS:
+            Logger.warning(None, f'--adaptive caps concurrency at SecurityConfig.MAX_CONCURRENT_REQUESTS '
+                                 f'({SecurityConfig.MAX_CONCURRENT_REQUESTS}), starting there instead of {args.concurrency}')
+        BlockStreetAPI.concurrency = AIMDController(args.concurrency, SecurityConfig.MAX_CONCURRENT_REQUESTS)
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+    profile.mark('configure')
+    
+    Logger.clear_terminal()
+    display_banner()
+    profile.mark('banner')
+    
+    wallet_index = WalletIndex(args.wallet_index or None)
+    with profiler.phase('load keys'):
+        wallets = WalletManager.load_wallets_from_file(index=wallet_index)
+    if not wallets:
+        return
+    profile.mark('load wallets (index hit)' if wallet_index.hits else 'load wallets (derived)')
+    
+    if args.plan:
+        run_plan(wallets, args, None if args.no_session_cache else SessionStore(args.session_file))
+        return
+    plan = None
+    if args.execute_plan:
+        try:
+            plan = Plan.load(args.execute_plan, 'auto_swap')
+        except (OSError, ValueError) as e:
+            Logger.error(None, f'Cannot execute plan: {str(e)}')
+            return
+        Logger.info(None, f'Auto Swap will execute the plan in {args.execute_plan} ({len(plan.wallets)} wallet(s))')
+    
+    proxies = ProxyManager.load_proxies()
+    if proxies:
+        Logger.info(None, f'Loaded {len(proxies)} proxy(ies)')
+    profile.mark('load proxies')
+    
+    captcha_api_key = CaptchaSolver.get_api_key()
+    captcha_token = await CaptchaSolver.solve_turnstile(captcha_api_key, '', 'https://blockstreet.money') or ''
+    profile.mark('captcha')
+    
+    if BlockStreetAPI.transport.name != args.transport:
+        Logger.warning(None, f"{args.transport} transport unavailable (pip install 'httpx[http2]'), using {BlockStreetAPI.transport.name}")
+    
+    session_store = None if args.no_session_cache else SessionStore(args.session_file)
+    if session_store:
+        await preauth_wallets(wallets, proxies, captcha_token, session_store, args.concurrency, args.sign_workers)
+    else:
+        await presign_wallets(wallets, args.sign_workers)
+    profile.mark('sessions')
+    if args.startup_profile:
+        Logger.raw(profile.format())
+    
+    tx_count = plan.params.get('tx_count', args.tx_count) if plan else args.tx_count
+    ledger = None if args.no_ledger else RunLedger(args.ledger)
+    resume = args.resume
+    
+    try:
+        while True:
+            display_menu()
+            choice = input(f'{Colors.YELLOW}Select option: {Colors.RESET}').strip()
             
-            for i in range(tx_count):
-                Logger.process(wallet_data['name'], f'Executing swap {i + 1}/{tx_count}')
+            if choice == '0':
+                Logger.info(None, 'Goodbye!')
+                break
+            elif choice == '1':
+                metrics.start_run()
+                try:
+                    token_list = await fetch_token_list(wallets[0], proxies[0] if proxies else None, captcha_token, session_store)
+                except Exception as e:
+                    Logger.error(None, f'Failed to load token list: {str(e)}')
+                    continue
+                run_tx_count = tx_count
+                if ledger:
+                    ledger.start_run('auto_swap', {'tx_count': tx_count}, resume=resume)
+                    if ledger.resumed:
+                        run_tx_count = ledger.params.get('tx_count', tx_count)
+                        Logger.info(None, f'Resuming run #{ledger.run_id}')
+                # Only the first run after start-up can be a resume
+                resume = False
                 
+                if args.workers > 1 and plan:
+                    Logger.warning(None, 'A plan runs in a single process; ignoring --workers')
+                if args.workers > 1 and not plan:
+                    results = await asyncio.to_thread(run_sharded, wallets, proxies, token_list, captcha_token,
+                                                      run_tx_count, args, ledger)
+                else:
+                    results = await process_auto_swap(wallets, proxies, token_list, captcha_token, run_tx_count, args.concurrency, session_store, ledger, plan=plan)
+                Logger.raw(format_report(results))
+                if ledger:
+                    ledger.finish_run()
+                    Logger.raw(format_summary(ledger.summary()))
+                Logger.raw(metrics.format_table())
+                if args.metrics_file:
+                    metrics.write_prometheus(args.metrics_file)
+                if BlockStreetAPI.concurrency:
+                    Logger.info(None, 'Adaptive concurrency: ' + ', '.join(f'{k}={v}' for k, v in BlockStreetAPI.concurrency.stats().items()))
+                cache_stats = BlockStreetAPI.market_cache.stats()
+                Logger.info(None, 'Market cache: ' + ', '.join(f'{k}={v}' for k, v in cache_stats.items()))
+                for route, route_stats in BlockStreetAPI.transport.stats().items():
+                    Logger.info(None, f'Transport {BlockStreetAPI.transport.name} [{route}]: '
+                                      + ', '.join(f'{k}={v}' for k, v in route_stats.items()))
+            elif choice == '7':
+                metrics.start_run()
                 try:
-                    from_asset = random.choice(owned_tokens)
-                    from_token = next((t for t in token_list if t['symbol'] == from_asset['symbol']), None)
-                    
-                    if not from_token:
-                        continue
-                    
-                    to_token = random.choice([t for t in token_list if t['symbol'] != from_token['symbol']])
-                    
-                    from_amount = get_random_amount(0.001, 0.0015)
-                    to_amount = (from_amount * float(from_token.get('price', 1))) / float(to_token.get('price', 1))
-                    
-                    api.swap(from_token['symbol'], to_token['symbol'], from_amount, to_amount)
-                    Logger.success(wallet_data['name'], f'Swapped {from_amount:.6f} {from_token["symbol"]} â†’ {to_amount:.6f} {to_token["symbol"]}')
-                    
+                    token_list = await fetch_token_list(wallets[0], proxies[0] if proxies else None, captcha_token, session_store)
                 except Exception as e:
-                    Logger.error(wallet_data['name'], f'Swap failed: {str(e)}')
+                    Logger.error(None, f'Failed to load token list: {str(e)}')
+                    continue
+                if ledger:
+                    ledger.start_run('auto_all', {}, resume=resume)
+                    if ledger.resumed:
+                        Logger.info(None, f'Resuming run #{ledger.run_id}')
+                resume = False
                 
-                if i < tx_count - 1:
-                    await random_delay()
+                results = await process_auto_all(wallets, proxies, token_list, captcha_token, args.concurrency,
+                                                 session_store, ledger, stage_concurrency)
+                Logger.raw(format_report(results))
+                if ledger:
+                    ledger.finish_run()
+                    Logger.raw(format_summary(ledger.summary()))
+                Logger.raw(metrics.format_table())
+                if args.metrics_file:
+                    metrics.write_prometheus(args.metrics_file)
+            elif choice == '8':
+                try:
+                    tx_count = max(1, int(input(f'{Colors.YELLOW}Transactions per wallet: {Colors.RESET}').strip()))
+                    Logger.success(None, f'TX count set to {tx_count}')
+                except ValueError:
+                    Logger.error(None, 'Invalid number')
+            elif choice == '9':
+                Logger.security(f'Max transaction amount: {SecurityConfig.MAX_TRANSACTION_AMOUNT}')
+                Logger.security(f'Min balance threshold: {SecurityConfig.MIN_BALANCE_THRESHOLD}')
+                Logger.security(f'Max transactions per hour: {SecurityConfig.MAX_TRANSACTIONS_PER_HOUR}')
+                Logger.security('Transaction slots: ' + ', '.join(f'{k}={v}' for k, v in BlockStreetAPI.limiter.stats().items()))
+                Logger.security(f'Max concurrent requests: {SecurityConfig.MAX_CONCURRENT_REQUESTS}')
+            else:
+                Logger.warning(None, 'Option not available in this build')
+    finally:
+        if session_store:
+            session_store.flush()
+        if ledger:
+            ledger.close()
+        await BlockStreetAPI.transport.aclose()
+        BlockStreetAPI.limiter.close()
+        BlockStreetAPI.plan_cache.save()
+        recorder.save()
+        profiler.stop()
+        if profiler.enabled:
+            Logger.raw(profiler.format_report())
+        Logger.flush()
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        Logger.info(None, 'Interrupted by user')
+        Logger.flush()
@@ -0,0 +1,132 @@
+"""Micro-benchmark of response handling and per-swap bookkeeping, dicts vs models.py records.
+
+Bodies have the mock server's shape (`--tokens` lists that many tokens,
+`--supplies` rows). Every case runs the same work both ways:
+
+- dicts:   json.loads into dicts, what response.json() ran, with the
+           conversions happening where the dicts are used (the quote
+           engine reading token dicts, the balance ledger converting
+           amount strings on every resync, `.get('code')` checks)
+- records: models.decode_envelope with the configured JSON backend and
+           parsing into Token / SupplyPosition / Balance / SwapResult
+           records, which the engine and the ledger take as they are
+
+`token_list refresh` is a refresh that changed nothing: the dict path builds a
+new quote engine for the new list object, TokenTable hands back the
+records (and so the engine) it already has. `per-swap bookkeeping` is
+the swap loop's local work per swap: covering check, quote, ledger
+update, response check, and a resync every RESYNC_EVERY swaps.
+
+    python decode_benchmark.py --tokens 6 --supplies 3 --number 20000
+    JSON_BACKEND=json python decode_benchmark.py     # the stdlib fallback
+"""
+import sys
+import json
+import random
+import timeit
+import argparse
+from typing import Callable, Dict, List, Tuple
+
+import models
+from models import SwapResult, TokenTable, decode_envelope, parse_balances, parse_supplies
+from balances import RESYNC_EVERY, BalanceLedger
+from quote_engine import QuoteEngine
+from mock_server import SUPPLIES, TOKENS
+
+SWAP_AMOUNT = 0.0012
+
+
+def build_bodies(tokens: int, supplies: int) -> Dict[str, bytes]:
+    token_list = [dict(TOKENS[i % len(TOKENS)], symbol=f'{TOKENS[i % len(TOKENS)]["symbol"]}{i // len(TOKENS) or ""}')
+                  for i in range(tokens)]
+    rows = [{'symbol': token_list[i % tokens]['symbol'], 'amount': SUPPLIES[i % len(SUPPLIES)]['amount']}
+            for i in range(supplies)]
+
+    def envelope(data) -> bytes:
+        return json.dumps({'code': 0, 'message': 'success', 'data': data}).encode()
+    return {
+        'token_list': envelope(token_list),
+        'supply': envelope(rows),
+        'balance': json.dumps({'code': 0, 'data': {'BSD': 1.0, 'AAPL': 0}}).encode(),
+        'swap': envelope({'status': 'success'}),
+    }
+
+
+def _engine_cache():
+    """get_quote_engine's rule (rebuild for a new list object) with a cache of its own"""
+    cache = {}
+
+    def engine(token_list) -> QuoteEngine:
+        if cache.get('list') is not token_list:
+            cache['list'], cache['engine'] = token_list, QuoteEngine(token_list)
+        return cache['engine']
+    return engine
+
+
+def response_cases(bodies: Dict[str, bytes]) -> List[Tuple[str, Callable, Callable]]:
+    table = TokenTable()
+    dict_engine, record_engine = _engine_cache(), _engine_cache()
+    dict_ledger, record_ledger = BalanceLedger(), BalanceLedger()
+    return [
+        ('token_list refresh', lambda: dict_engine(json.loads(bodies['token_list'].decode())['data']),
+         lambda: record_engine(table.parse(decode_envelope(bodies['token_list'], '/swap/token_list')['data']))),
+        ('supply', lambda: dict_ledger.sync(json.loads(bodies['supply'].decode())['data']),
+         lambda: record_ledger.sync(parse_supplies(decode_envelope(bodies['supply'], '/my/supply')['data']))),
+        ('balance', lambda: dict_ledger.sync(json.loads(bodies['balance'].decode())['data']),
+         lambda: record_ledger.sync(parse_balances(decode_envelope(bodies['balance'], '/api/me/balance')['data']))),
+        ('swap response', lambda: json.loads(bodies['swap'].decode()).get('code') == 0,
+         lambda: SwapResult.parse(decode_envelope(bodies['swap'], '/swap')).ok),
+    ]
+
+
+def swap_cases(bodies: Dict[str, bytes]) -> List[Tuple[str, Callable, Callable]]:
+    rows = json.loads(bodies['supply'])['data']
+    swap_data = json.loads(bodies['swap'])
+
+    def swapper(quotes: QuoteEngine, snapshot, ok: Callable[[], bool]) -> Callable[[], bool]:
+        rng = random.Random(0)
+        ledger = BalanceLedger(0, RESYNC_EVERY)
+
+        def swap():
+            if ledger.needs_sync:
+                ledger.sync(snapshot)
+            quote = quotes.quote_swap(ledger.covering(SWAP_AMOUNT), SWAP_AMOUNT, rng)
+            if quote is not None:
+                ledger.record_swap(quote.from_symbol, quote.to_symbol, quote.from_amount, quote.to_amount)
+            return ok()
+        return swap
+
+    swap_dicts = swapper(QuoteEngine(json.loads(bodies['token_list'])['data']), rows,
+                         lambda: swap_data.get('code') == 0)
+    result = SwapResult.parse(swap_data)
+    swap_records = swapper(QuoteEngine(TokenTable().parse(json.loads(bodies['token_list'])['data'])),
+                           parse_supplies(rows), lambda: result.ok)
+    return [('per-swap bookkeeping', swap_dicts, swap_records)]
+
+
+def measure(fn: Callable, number: int, repeat: int) -> float:
+    """Best of repeat, in microseconds per call"""
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number * 1e6
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Decode and bookkeeping cost with dicts vs typed records')
+    parser.add_argument('--tokens', type=int, default=len(TOKENS), help='tokens in the token list body')
+    parser.add_argument('--supplies', type=int, default=len(SUPPLIES), help='rows in the /my/supply body')
+    parser.add_argument('--number', type=int, default=20000, help='calls per timing')
+    parser.add_argument('--repeat', type=int, default=5, help='timings per case (the best is reported)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    bodies = build_bodies(max(2, args.tokens), max(1, args.supplies))
+    print(f'JSON backend: {models.JSON_BACKEND}; {args.tokens} tokens, {args.supplies} supply rows')
+    print(f"{'case':<24}{'dicts us':>10}{'records us':>12}{'change':>9}")
+    for name, before, after in response_cases(bodies) + swap_cases(bodies):
+        b, a = measure(before, args.number, args.repeat), measure(after, args.number, args.repeat)
+        print(f'{name:<24}{b:>10.2f}{a:>12.2f}{100 * (a - b) / b:>+8.0f}%')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,284 @@
+"""Non-blocking console and JSONL logger shared by bot.py and bot_no2captcha.py.
+
+Logger calls only put a record on a queue; a background thread formats
+the timestamps, renders the coloured console lines and appends JSONL
+records, writing whatever has queued up in one batch. Lines therefore
+never interleave mid-line and the request path never waits on the
+terminal.
+
+    Logger.configure(level='info', jsonl_path='bot.log.jsonl', quiet=True)
+    Logger.success(wallet, 'Swapped', event='swap', endpoint='/swap', outcome='ok')
+    Logger.event(wallet, 'request', endpoint='/my/supply', latency_ms=41.2, outcome='ok')
+
+Every JSONL record carries ts, level, wallet, event and msg, plus the
+endpoint, latency_ms, outcome (and any other) fields given to the call.
+Logger.event records go to the JSONL sink only and cost nothing when no
+sink is configured.
+
+A shard worker process calls Logger.forward(queue) so its records are
+rendered by the supervisor (Logger.replay) into one console and JSONL stream.
+"""
+import os
+import re
+import sys
+import json
+import time
+import queue
+import atexit
+import threading
+from datetime import datetime, timezone, timedelta
+from typing import Dict, List, Optional, TextIO
+
+from profiling import profiler
+
+# Console timestamps are shown in WIB
+WIB = timezone(timedelta(hours=7))
+
+LEVELS = {'debug': 10, 'info': 20, 'warning': 30, 'error': 40}
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'debug')
+LOG_JSONL = os.getenv('LOG_JSONL', '')
+NO_COLOR = bool(os.getenv('NO_COLOR'))
+
+_ANSI = re.compile(r'\033\[[0-9;]*m')
+
+
+class Colors:
+    RESET = "\033[0m"
+    BRIGHT = "\033[1m"
+    GREEN = "\033[32m\033[1m"
+    YELLOW = "\033[33m\033[1m"
+    BLUE = "\033[34m\033[1m"
+    MAGENTA = "\033[35m\033[1m"
+    CYAN = "\033[36m\033[1m"
+    WHITE = "\033[37m\033[1m"
+    RED = "\033[31m\033[1m"
+    GRAY = "\033[90m"
+
+
+# kind -> (level, label colour, icon)
+STYLES = {
+    'info': ('info', Colors.BLUE, ''),
+    'success': ('info', Colors.GREEN, 'âœ… '),
+    'error': ('error', Colors.RED, 'âŒ '),
+    'warning': ('warning', Colors.YELLOW, 'âš¡ '),
+    'process': ('debug', Colors.MAGENTA, 'ðŸ”„ '),
+    'security': ('warning', Colors.RED, 'ðŸ” '),
+}
+
+
+class _LogWriter:
+    """Background thread draining the record queue in batches"""
+
+    BATCH_SIZE = 500
+
+    def __init__(self):
+        self._queue: 'queue.SimpleQueue' = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._clock_second = -1
+        self._clock_text = ''
+
+    def put(self, record: tuple):
+        if self._thread is None:
+            self._start()
+        self._queue.put(record)
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._write_loop, name='logger', daemon=True)
+                self._thread.start()
+
+    def flush(self):
+        """Block until everything queued so far is written"""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        done = threading.Event()
+        self._queue.put(('flush', done))
+        done.wait()
+
+    def _clock(self, created: float) -> str:
+        # Records arrive in bursts within the same second; format each second once
+        second = int(created)
+        if second != self._clock_second:
+            self._clock_second = second
+            self._clock_text = datetime.fromtimestamp(second, WIB).strftime('%H:%M:%S')
+        return self._clock_text
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with profiler.phase('log write'):
+                    self._write(batch)
+            except Exception:
+                # A broken sink must not take the bot down with it
+                pass
+            for record in batch:
+                if record[0] == 'flush':
+                    record[1].set()
+
+    def _write(self, batch: List[tuple]):
+        if Logger.forward_queue is not None:
+            records = [record for record in batch if record[0] != 'flush']
+            if records:
+                Logger.forward_queue.put(('logs', records))
+            return
+        console: List[str] = []
+        jsonl: List[str] = []
+        color = Logger.color
+        for record in batch:
+            kind = record[0]
+            if kind == 'flush':
+                continue
+            if kind == 'raw':
+                if not Logger.quiet:
+                    console.append(record[1] if color else _ANSI.sub('', record[1]))
+                continue
+
+            _, created, wallet, msg, fields = record
+            if kind != 'event' and not Logger.quiet:
+                console.append(self._render(kind, created, wallet, msg, color))
+            if Logger.jsonl is not None:
+                jsonl.append(self._to_json(kind, created, wallet, msg, fields))
+
+        if console:
+            stream = sys.stdout
+            stream.write('\n'.join(console) + '\n')
+            stream.flush()
+        if jsonl and Logger.jsonl is not None:
+            Logger.jsonl.write('\n'.join(jsonl) + '\n')
+            Logger.jsonl.flush()
+
+    def _render(self, kind: str, created: float, wallet: Optional[str], msg: str, color: bool) -> str:
+        _, label_color, icon = STYLES[kind]
+        label = 'SECURITY' if kind == 'security' else wallet or 'SYS'
+        timestamp = self._clock(created)
+        if color:
+            return f"{Colors.GRAY}{timestamp}{Colors.RESET} {label_color}[{label}]{Colors.RESET} {icon}{msg}"
+        return f"{timestamp} [{label}] {icon}{_ANSI.sub('', msg)}"
+
+    @staticmethod
+    def _to_json(kind: str, created: float, wallet: Optional[str], msg: Optional[str], fields: Dict) -> str:
+        level = fields.pop('level', None) or STYLES.get(kind, ('debug',))[0]
+        record = {'ts': round(created, 3), 'level': level, 'wallet': wallet,
+                  'event': fields.pop('event', None) or kind}
+        if msg is not None:
+            record['msg'] = _ANSI.sub('', msg)
+        record.update(fields)
+        return json.dumps(record, default=str, ensure_ascii=False)
+
+
+class Logger:
+    """Enhanced logger with custom formatting"""
+
+    level = LEVELS.get(LOG_LEVEL, LEVELS['debug'])
+    quiet = False
+    color = not NO_COLOR
+    jsonl: Optional[TextIO] = None
+    # Set in shard workers: records go to the supervisor instead of the console
+    forward_queue = None
+    forward_events = False
+    _writer = _LogWriter()
+
+    @classmethod
+    def configure(cls, level: Optional[str] = None, jsonl_path: Optional[str] = None,
+                  quiet: Optional[bool] = None, color: Optional[bool] = None):
+        """Set the level filter, JSONL sink (appended to), console quiet mode and colours"""
+        cls._writer.flush()
+        if level is not None:
+            if level not in LEVELS:
+                raise ValueError(f'Unknown log level {level!r}, expected one of {list(LEVELS)}')
+            cls.level = LEVELS[level]
+        if quiet is not None:
+            cls.quiet = quiet
+        if color is not None:
+            cls.color = color
+        if jsonl_path is not None:
+            if cls.jsonl is not None:
+                cls.jsonl.close()
+            cls.jsonl = open(jsonl_path, 'a', encoding='utf-8') if jsonl_path else None
+
+    @staticmethod
+    def clear_terminal():
+        if os.name != 'nt' and sys.stdout.isatty():
+            # ANSI clear + home; no need to start a shell for it
+            sys.stdout.write('\033[2J\033[H')
+            sys.stdout.flush()
+        elif os.name == 'nt':
+            os.system('cls')
+
+    @classmethod
+    def enabled(cls, level: str) -> bool:
+        return LEVELS[level] >= cls.level
+
+    @classmethod
+    def _log(cls, kind: str, wallet: Optional[str], msg: str, fields: Dict):
+        if LEVELS[STYLES[kind][0]] < cls.level:
+            return
+        cls._writer.put((kind, time.time(), wallet, msg, fields))
+
+    @classmethod
+    def info(cls, wallet: Optional[str], msg: str, **fields):
+        cls._log('info', wallet, msg, fields)
+
+    @classmethod
+    def success(cls, wallet: Optional[str], msg: str, **fields):
+        cls._log('success', wallet, msg, fields)
+
+    @classmethod
+    def error(cls, wallet: Optional[str], msg: str, **fields):
+        cls._log('error', wallet, msg, fields)
+
+    @classmethod
+    def warning(cls, wallet: Optional[str], msg: str, **fields):
+        cls._log('warning', wallet, msg, fields)
+
+    @classmethod
+    def process(cls, wallet: Optional[str], msg: str, **fields):
+        cls._log('process', wallet, msg, fields)
+
+    @classmethod
+    def security(cls, msg: str, **fields):
+        cls._log('security', None, msg, fields)
+
+    @classmethod
+    def event(cls, wallet: Optional[str], event: str, level: str = 'debug', **fields):
+        """Structured record for the JSONL sink only (request timings, outcomes)"""
+        if (cls.jsonl is None and not cls.forward_events) or LEVELS[level] < cls.level:
+            return
+        fields['event'] = event
+        fields['level'] = level
+        cls._writer.put(('event', time.time(), wallet, None, fields))
+
+    @classmethod
+    def raw(cls, text: str):
+        """Pre-formatted console text (banners, tables), kept in order with the log lines"""
+        cls._writer.put(('raw', text))
+
+    @classmethod
+    def forward(cls, events, jsonl: bool = False):
+        """Send every record to another process's Logger.replay; jsonl keeps event records flowing"""
+        cls._writer.flush()
+        cls.forward_queue = events
+        cls.forward_events = jsonl
+        cls.quiet = False
+
+    @classmethod
+    def replay(cls, records: List[tuple]):
+        """Write records forwarded by a worker (already level-filtered there)"""
+        for record in records:
+            cls._writer.put(record)
+
+    @classmethod
+    def flush(cls):
+        """Wait until every queued line has been written, e.g. before prompting for input"""
+        cls._writer.flush()
+
+
+atexit.register(Logger.flush)
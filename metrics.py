@@ -0,0 +1,321 @@
+"""Per-endpoint request metrics shared by bot.py and bot_no2captcha.py.
+
+Every API call is observed once at the bots' request choke points
+(BlockStreetAPI._request, bot.py's balance and swap calls). Tracked
+per (endpoint, method):
+
+- latency histogram (Prometheus buckets, plus max)
+- HTTP status counts and the JSON body's `code` field counts
+- outcome counts (ok, code_N, http_N, session_rejected, malformed, error)
+- request / response bytes
+- requests served on a reused vs a newly opened connection
+
+plus process-wide gauges set elsewhere (set_gauge), such as the adaptive
+concurrency limit.
+
+Export as Prometheus text (`--metrics-file`, or served on
+`--metrics-port` at /metrics), and print `format_table()` at the end of a run.
+The export is cumulative for the process (Prometheus counters); the table
+covers only the requests since the last `start_run()`, so each menu run
+prints its own.
+"""
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+METRICS_FILE = os.getenv('METRICS_FILE', '')
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+
+# Upper bounds in seconds; the last bucket is +Inf
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+PREFIX = 'blockstreet'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels) -> str:
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile, 0 for an empty list"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+class EndpointStats:
+    """Counters for one (endpoint, method)"""
+
+    __slots__ = ('buckets', 'count', 'total', 'max', 'statuses', 'codes', 'outcomes',
+                 'bytes_out', 'bytes_in', 'reused', 'opened')
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.statuses: Dict[str, int] = {}
+        self.codes: Dict[str, int] = {}
+        self.outcomes: Dict[str, int] = {}
+        self.bytes_out = 0
+        self.bytes_in = 0
+        self.reused = 0
+        self.opened = 0
+
+    def quantile(self, q: float) -> float:
+        """Latency quantile estimated by interpolating inside the histogram bucket"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for i, bucket_count in enumerate(self.buckets):
+            upper = LATENCY_BUCKETS[i] if i < len(LATENCY_BUCKETS) else self.max
+            if bucket_count and seen + bucket_count >= rank:
+                upper = min(upper, self.max)
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+            lower = upper
+        return self.max
+
+    @property
+    def errors(self) -> int:
+        return self.count - self.outcomes.get('ok', 0)
+
+
+class RequestMetrics:
+    """Thread-safe registry of EndpointStats"""
+
+    def __init__(self):
+        self._endpoints: Dict[Tuple[str, str], EndpointStats] = {}
+        # Same counters since start_run(), for the end-of-run table
+        self._run: Dict[Tuple[str, str], EndpointStats] = {}
+        # name -> (value, help text); process-local values such as the adaptive concurrency limit
+        self._gauges: Dict[str, Tuple[float, str]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, endpoint: str, method: str, latency: float, outcome: str,
+                status: Optional[int] = None, code=None, bytes_out: int = 0, bytes_in: int = 0,
+                reused: Optional[bool] = None):
+        """Record one request; latency in seconds"""
+        key = (endpoint, method.upper())
+        i = 0
+        while i < len(LATENCY_BUCKETS) and latency > LATENCY_BUCKETS[i]:
+            i += 1
+        status_key = str(status) if status is not None else 'none'
+        with self._lock:
+            for table in (self._endpoints, self._run):
+                stats = table.get(key)
+                if stats is None:
+                    stats = table[key] = EndpointStats()
+                stats.buckets[i] += 1
+                stats.count += 1
+                stats.total += latency
+                stats.max = max(stats.max, latency)
+                stats.statuses[status_key] = stats.statuses.get(status_key, 0) + 1
+                if code is not None:
+                    stats.codes[str(code)] = stats.codes.get(str(code), 0) + 1
+                stats.outcomes[outcome] = stats.outcomes.get(outcome, 0) + 1
+                stats.bytes_out += bytes_out
+                stats.bytes_in += bytes_in
+                if reused is True:
+                    stats.reused += 1
+                elif reused is False:
+                    stats.opened += 1
+
+    def observe_response(self, endpoint: str, method: str, latency: float, outcome: str,
+                         response=None, code=None):
+        """Record a request from its requests/httpx response (None when nothing came back)"""
+        if response is None:
+            self.observe(endpoint, method, latency, outcome, code=code)
+            return
+        self.observe(endpoint, method, latency, outcome, response.status_code, code,
+                     request_size(response), len(response.content), getattr(response, 'connection_reused', None))
+
+    def set_gauge(self, name: str, value: float, help_text: str):
+        with self._lock:
+            self._gauges[name] = (value, help_text)
+
+    def snapshot(self) -> Dict[Tuple[str, str], EndpointStats]:
+        with self._lock:
+            return dict(self._endpoints)
+
+    def merge(self, snapshot: Dict[Tuple[str, str], EndpointStats]):
+        """Add another process's snapshot (a shard worker's) into this registry"""
+        with self._lock:
+            for key, other in snapshot.items():
+                for table in (self._endpoints, self._run):
+                    stats = table.get(key)
+                    if stats is None:
+                        stats = table[key] = EndpointStats()
+                    stats.buckets = [a + b for a, b in zip(stats.buckets, other.buckets)]
+                    stats.count += other.count
+                    stats.total += other.total
+                    stats.max = max(stats.max, other.max)
+                    for attr in ('statuses', 'codes', 'outcomes'):
+                        counts = getattr(stats, attr)
+                        for value, counted in getattr(other, attr).items():
+                            counts[value] = counts.get(value, 0) + counted
+                    stats.bytes_out += other.bytes_out
+                    stats.bytes_in += other.bytes_in
+                    stats.reused += other.reused
+                    stats.opened += other.opened
+
+    def start_run(self):
+        """Begin a new end-of-run table; the Prometheus export keeps counting"""
+        with self._lock:
+            self._run = {}
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+            self._run.clear()
+            self._gauges.clear()
+
+    # ------------------------------
+    # Export
+    # ------------------------------
+    def render_prometheus(self) -> str:
+        endpoints = sorted(self.snapshot().items())
+        lines: List[str] = []
+
+        def family(name: str, kind: str, help_text: str):
+            lines.append(f'# HELP {PREFIX}_{name} {help_text}')
+            lines.append(f'# TYPE {PREFIX}_{name} {kind}')
+
+        family('request_duration_seconds', 'histogram', 'API request latency')
+        for (endpoint, method), stats in endpoints:
+            cumulative = 0
+            for bound, bucket_count in zip(LATENCY_BUCKETS + ('+Inf',), stats.buckets):
+                cumulative += bucket_count
+                labels = _labels(endpoint=endpoint, method=method, le=bound)
+                lines.append(f'{PREFIX}_request_duration_seconds_bucket{labels} {cumulative}')
+            labels = _labels(endpoint=endpoint, method=method)
+            lines.append(f'{PREFIX}_request_duration_seconds_sum{labels} {stats.total:.6f}')
+            lines.append(f'{PREFIX}_request_duration_seconds_count{labels} {stats.count}')
+
+        for name, attr, label, help_text in (
+            ('requests_total', 'statuses', 'status', 'API requests by HTTP status'),
+            ('response_codes_total', 'codes', 'code', 'API responses by body code field'),
+            ('request_outcomes_total', 'outcomes', 'outcome', 'API requests by outcome'),
+        ):
+            family(name, 'counter', help_text)
+            for (endpoint, method), stats in endpoints:
+                for value, counted in sorted(getattr(stats, attr).items()):
+                    lines.append(f'{PREFIX}_{name}{_labels(endpoint=endpoint, method=method, **{label: value})} {counted}')
+
+        for name, attr, help_text in (
+            ('request_bytes_total', 'bytes_out', 'Request body bytes sent'),
+            ('response_bytes_total', 'bytes_in', 'Response body bytes received'),
+        ):
+            family(name, 'counter', help_text)
+            for (endpoint, method), stats in endpoints:
+                lines.append(f'{PREFIX}_{name}{_labels(endpoint=endpoint, method=method)} {getattr(stats, attr)}')
+
+        family('connection_requests_total', 'counter', 'Requests by whether they reused an open connection')
+        for (endpoint, method), stats in endpoints:
+            for reused, counted in (('true', stats.reused), ('false', stats.opened)):
+                lines.append(f'{PREFIX}_connection_requests_total'
+                             f'{_labels(endpoint=endpoint, method=method, reused=reused)} {counted}')
+
+        with self._lock:
+            gauges = sorted(self._gauges.items())
+        for name, (value, help_text) in gauges:
+            family(name, 'gauge', help_text)
+            lines.append(f'{PREFIX}_{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path: str):
+        """Write the text exposition atomically (node_exporter textfile collector format)"""
+        tmp_name = f'{path}.tmp'
+        with open(tmp_name, 'w') as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_name, path)
+
+    def serve(self, port: int, host: str = '127.0.0.1') -> 'ThreadingHTTPServer':
+        """Serve /metrics from a daemon thread"""
+        # Only --metrics-port needs an HTTP server; keep it out of every other start
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+        return server
+
+    def format_table(self) -> str:
+        """Per-endpoint table for the requests since start_run(), slowest p99 first"""
+        with self._lock:
+            endpoints = dict(self._run)
+        if not endpoints:
+            return 'No requests recorded'
+        lines = [f"{'endpoint':<24}{'method':<7}{'reqs':>6}{'err':>5}{'p50 ms':>9}{'p90 ms':>9}"
+                 f"{'p99 ms':>9}{'max ms':>9}{'KB out':>8}{'KB in':>8}{'reuse%':>8}"]
+        rows = sorted(endpoints.items(), key=lambda item: item[1].quantile(0.99), reverse=True)
+        for (endpoint, method), stats in rows:
+            tracked = stats.reused + stats.opened
+            reuse = f'{100 * stats.reused / tracked:.0f}' if tracked else '-'
+            lines.append(
+                f'{endpoint:<24}{method:<7}{stats.count:>6}{stats.errors:>5}'
+                f'{stats.quantile(0.5) * 1000:>9.1f}{stats.quantile(0.9) * 1000:>9.1f}'
+                f'{stats.quantile(0.99) * 1000:>9.1f}{stats.max * 1000:>9.1f}'
+                f'{stats.bytes_out / 1024:>8.1f}{stats.bytes_in / 1024:>8.1f}{reuse:>8}'
+            )
+        codes = {}
+        for stats in endpoints.values():
+            for code, counted in stats.codes.items():
+                codes[code] = codes.get(code, 0) + counted
+        if codes:
+            lines.append('response codes: ' + ', '.join(f'{code}={n}' for code, n in sorted(codes.items())))
+        return '\n'.join(lines)
+
+
+def body_size(body) -> int:
+    """Length in bytes of a requests/httpx request body (bytes, str or None)"""
+    if body is None:
+        return 0
+    if isinstance(body, str):
+        return len(body.encode())
+    try:
+        return len(body)
+    except TypeError:
+        return 0
+
+
+def request_size(response) -> int:
+    """Bytes of the request body that produced response"""
+    request = getattr(response, 'request', None)
+    if request is None:
+        return 0
+    # requests: PreparedRequest.body; httpx: Request.content
+    body = getattr(request, 'body', None)
+    if body is None:
+        try:
+            body = request.content
+        except Exception:
+            body = None
+    return body_size(body)
+
+
+metrics = RequestMetrics()
@@ -0,0 +1,391 @@
+"""Offline stand-in for the BlockStreet API.
+
+Serves the endpoints used by bot_no2captcha.py (under /api) and bot.py
+(/api/me/*) so both bots can be exercised and benchmarked without the
+live site. Latency, error rate, 429 throttling and set-cookie behaviour
+are configurable.
+Besides HTTP/1.1 it answers h2c with prior knowledge (needs the `h2`
+package), which is what the http2 transport speaks to plain-http URLs.
+
+    python mock_server.py --port 8787 --latency-ms 40 --jitter-ms 10 --error-rate 0.01
+
+Point the bots at it with:
+
+    BLOCKSTREET_API_URL=http://127.0.0.1:8787/api
+    BLOCKSTREET_BASE_URL=http://127.0.0.1:8787
+"""
+import json
+import random
+import secrets
+import threading
+import time
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+TOKENS = [
+    {'symbol': 'BSD', 'name': 'Block Street Dollar', 'price': '1', 'decimals': 6},
+    {'symbol': 'AAPL', 'name': 'Apple', 'price': '2283.1', 'decimals': 6},
+    {'symbol': 'TSLA', 'name': 'Tesla', 'price': '4437.5', 'decimals': 6},
+    {'symbol': 'NVDA', 'name': 'NVIDIA', 'price': '1850.25', 'decimals': 6},
+    {'symbol': 'MSFT', 'name': 'Microsoft', 'price': '5171.9', 'decimals': 6},
+    {'symbol': 'GOOGL', 'name': 'Alphabet', 'price': '2519.4', 'decimals': 6},
+]
+
+SUPPLIES = [
+    {'symbol': 'BSD', 'amount': '12.5'},
+    {'symbol': 'AAPL', 'amount': '0.004'},
+    {'symbol': 'TSLA', 'amount': '0'},
+]
+
+EARN_INFO = {'apy': '4.2', 'total_supply': '1839201.55', 'total_borrow': '402331.12'}
+
+# Cookie modes: 'login' sets gfsessionid on /account/signverify only,
+# 'always' sets it on every response, 'never' never sends one.
+COOKIE_MODES = ('login', 'always', 'never')
+
+H2_PREFACE = b'PRI * HTTP/2.0\r\n\r\nSM\r\n\r\n'
+H2_PREFACE_LINE = b'PRI * HTTP/2.0\r\n'
+
+
+class MockConfig:
+    """Runtime behaviour of the mock server"""
+
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0,
+                 set_cookie: str = 'login', require_session: bool = False, balance: float = 1.0,
+                 session_ttl: int = 0, throttle_rate: float = 0, retry_after: float = 1):
+        if set_cookie not in COOKIE_MODES:
+            raise ValueError(f'set_cookie must be one of {COOKIE_MODES}')
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.set_cookie = set_cookie
+        self.require_session = require_session
+        self.balance = balance
+        # 0 = sessions never expire and cookies carry no Max-Age
+        self.session_ttl = session_ttl
+        # Fraction of requests rejected with 429 and this Retry-After (seconds)
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+
+
+class MockStats:
+    """Thread-safe per-endpoint request counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self.sessions_issued = 0
+        self.connections = 0
+
+    def record(self, endpoint: str, error: bool = False):
+        with self._lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+            if error:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def new_connection(self):
+        with self._lock:
+            self.connections += 1
+
+    def new_session(self):
+        with self._lock:
+            self.sessions_issued += 1
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                'requests': dict(self.requests),
+                'errors': dict(self.errors),
+                'sessions_issued': self.sessions_issued,
+                'connections': self.connections,
+            }
+
+    def reset(self):
+        with self._lock:
+            self.requests.clear()
+            self.errors.clear()
+            self.sessions_issued = 0
+            self.connections = 0
+
+
+def _session_cookie(cookie_header: Optional[str]) -> Optional[str]:
+    for part in (cookie_header or '').split(';'):
+        name, _, value = part.strip().partition('=')
+        if name == 'gfsessionid':
+            return value
+    return None
+
+
+def respond(server: 'MockServer', method: str, path: str, cookie_header: Optional[str]):
+    """Apply latency/error/session behaviour and route; returns (status, payload, extra headers)"""
+    status, payload, cookie = _route(server, method, path, cookie_header)
+    headers = {}
+    if cookie:
+        headers['set-cookie'] = _cookie_header(cookie, server.config.session_ttl)
+    if status == 429:
+        headers['retry-after'] = f'{server.config.retry_after:g}'
+    return status, payload, headers
+
+
+def _route(server: 'MockServer', method: str, path: str, cookie_header: Optional[str]):
+    config: MockConfig = server.config
+
+    if path == '/__stats':
+        return 200, server.stats.snapshot(), None
+
+    if config.latency_ms or config.jitter_ms:
+        delay = config.latency_ms + random.uniform(-config.jitter_ms, config.jitter_ms)
+        time.sleep(max(0.0, delay) / 1000)
+
+    route = server.routes.get((method, path))
+    if route is None:
+        server.stats.record(path, error=True)
+        return 404, {'code': 404, 'message': 'not found'}, None
+
+    if config.throttle_rate and random.random() < config.throttle_rate:
+        server.stats.record(path, error=True)
+        return 429, {'code': 429, 'message': 'too many requests'}, None
+
+    if config.error_rate and random.random() < config.error_rate:
+        server.stats.record(path, error=True)
+        return 500, {'code': 500, 'message': 'internal error'}, None
+
+    cookie = None
+    if path == '/api/account/signverify':
+        if config.set_cookie != 'never':
+            cookie = secrets.token_hex(16)
+            server.add_session(cookie)
+    elif config.require_session and path.startswith('/api/') and not path.startswith('/api/me/'):
+        if not server.has_session(_session_cookie(cookie_header)):
+            server.stats.record(path, error=True)
+            return 401, {'code': 401, 'message': 'invalid session'}, None
+    if cookie is None and config.set_cookie == 'always':
+        cookie = _session_cookie(cookie_header) or secrets.token_hex(16)
+        server.add_session(cookie)
+
+    server.stats.record(path)
+    return 200, route(config), cookie
+
+
+def _cookie_header(cookie: str, max_age: int) -> str:
+    attrs = f'; Max-Age={max_age}' if max_age else ''
+    return f'gfsessionid={cookie}; Path=/{attrs}; HttpOnly'
+
+
+class H2Connection:
+    """Minimal h2c (prior knowledge) server side; each stream is answered on its own thread"""
+
+    def __init__(self, handler: BaseHTTPRequestHandler, server: 'MockServer'):
+        import h2.config
+        import h2.connection
+
+        self.handler = handler
+        self.server = server
+        self.conn = h2.connection.H2Connection(
+            config=h2.config.H2Configuration(client_side=False, header_encoding='utf-8')
+        )
+        self.lock = threading.Lock()
+        self.streams: Dict[int, Dict] = {}
+
+    def _flush(self):
+        data = self.conn.data_to_send()
+        if data:
+            self.handler.wfile.write(data)
+
+    def serve(self):
+        import h2.events
+
+        with self.lock:
+            self.conn.initiate_connection()
+            self.conn.receive_data(H2_PREFACE)
+            self._flush()
+
+        while True:
+            try:
+                data = self.handler.rfile.read1(65535)
+            except OSError:
+                return
+            if not data:
+                return
+            with self.lock:
+                events = self.conn.receive_data(data)
+                self._flush()
+            for event in events:
+                if isinstance(event, h2.events.RequestReceived):
+                    self.streams[event.stream_id] = dict(event.headers)
+                elif isinstance(event, h2.events.DataReceived):
+                    with self.lock:
+                        self.conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                        self._flush()
+                elif isinstance(event, h2.events.StreamEnded):
+                    headers = self.streams.pop(event.stream_id, {})
+                    threading.Thread(target=self._answer, args=(event.stream_id, headers), daemon=True).start()
+                elif isinstance(event, h2.events.ConnectionTerminated):
+                    return
+
+    def _answer(self, stream_id: int, headers: Dict[str, str]):
+        path = urlsplit(headers.get(':path', '/')).path
+        status, payload, extra_headers = respond(self.server, headers.get(':method', 'GET'), path, headers.get('cookie'))
+        body = json.dumps(payload).encode()
+        response_headers = [
+            (':status', str(status)),
+            ('content-type', 'application/json'),
+            ('content-length', str(len(body))),
+        ]
+        response_headers.extend(extra_headers.items())
+        with self.lock:
+            try:
+                self.conn.send_headers(stream_id, response_headers)
+                self.conn.send_data(stream_id, body, end_stream=True)
+                self._flush()
+            except Exception:
+                # the client may have reset the stream or closed the connection meanwhile
+                pass
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """Request handler; the server instance carries config, stats and sessions"""
+
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; without TCP_NODELAY a reused
+    # keep-alive connection stalls on delayed ACKs and skews latency numbers
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.stats.new_connection()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _send_json(self, status: int, payload, headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self, method: str):
+        self._read_body()
+        status, payload, headers = respond(self.server, method, urlsplit(self.path).path, self.headers.get('Cookie'))
+        self._send_json(status, payload, headers)
+
+    def parse_request(self) -> bool:
+        # An h2c client with prior knowledge opens with the HTTP/2 preface instead of a request line
+        if self.raw_requestline == H2_PREFACE_LINE:
+            self.command = 'PRI'
+            self.close_connection = True
+            return True
+        return super().parse_request()
+
+    def do_PRI(self):
+        # rest of the preface: b'\r\nSM\r\n\r\n'
+        self.rfile.read(len(H2_PREFACE) - len(H2_PREFACE_LINE))
+        H2Connection(self, self.server).serve()
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+
+def _ok(data):
+    return lambda config: {'code': 0, 'message': 'success', 'data': data}
+
+
+ROUTES = {
+    ('POST', '/api/account/signverify'): _ok({'address': '', 'is_new': False}),
+    ('GET', '/api/swap/token_list'): _ok(TOKENS),
+    ('GET', '/api/my/supply'): _ok(SUPPLIES),
+    ('GET', '/api/earn/info'): _ok(EARN_INFO),
+    ('POST', '/api/swap'): _ok({'status': 'success'}),
+    ('POST', '/api/supply'): _ok({'status': 'success'}),
+    ('POST', '/api/withdraw'): _ok({'status': 'success'}),
+    ('POST', '/api/borrow'): _ok({'status': 'success'}),
+    ('POST', '/api/repay'): _ok({'status': 'success'}),
+    ('POST', '/api/share'): _ok({'status': 'success'}),
+    ('GET', '/api/me/balance'): lambda config: {'code': 0, 'data': {'BSD': config.balance, 'AAPL': 0}},
+    ('POST', '/api/me/swap'): _ok({'status': 'success'}),
+}
+
+
+class MockServer(ThreadingHTTPServer):
+    """Threaded mock API server"""
+
+    daemon_threads = True
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, config: Optional[MockConfig] = None):
+        super().__init__((host, port), MockHandler)
+        self.config = config or MockConfig()
+        self.stats = MockStats()
+        self.routes = dict(ROUTES)
+        self._sessions: Dict[str, float] = {}
+        self._sessions_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def add_session(self, cookie: str):
+        with self._sessions_lock:
+            expires_at = time.time() + self.config.session_ttl if self.config.session_ttl else float('inf')
+            self._sessions[cookie] = expires_at
+        self.stats.new_session()
+
+    def has_session(self, cookie: Optional[str]) -> bool:
+        with self._sessions_lock:
+            return self._sessions.get(cookie, 0) > time.time()
+
+    def start(self) -> 'MockServer':
+        """Serve in a background thread"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline BlockStreet mock server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8787)
+    parser.add_argument('--latency-ms', type=float, default=0, help='base response latency')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='uniform +/- latency jitter')
+    parser.add_argument('--error-rate', type=float, default=0, help='fraction of requests answered with HTTP 500')
+    parser.add_argument('--throttle-rate', type=float, default=0, help='fraction of requests answered with HTTP 429')
+    parser.add_argument('--retry-after', type=float, default=1, help='Retry-After seconds sent with a 429')
+    parser.add_argument('--set-cookie', choices=COOKIE_MODES, default='login')
+    parser.add_argument('--require-session', action='store_true', help='answer 401 without a valid gfsessionid')
+    parser.add_argument('--session-ttl', type=int, default=0, help='session lifetime in seconds (0 = forever)')
+    args = parser.parse_args()
+
+    config = MockConfig(args.latency_ms, args.jitter_ms, args.error_rate, args.set_cookie,
+                        args.require_session, session_ttl=args.session_ttl,
+                        throttle_rate=args.throttle_rate, retry_after=args.retry_after)
+    server = MockServer(args.host, args.port, config)
+    print(f'Mock BlockStreet API listening on {server.base_url}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
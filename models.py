@@ -0,0 +1,275 @@
+"""Typed API response records and the JSON decode path shared by bot.py and bot_no2captcha.py.
+
+Bodies are decoded with orjson when it is installed (optional dependency:
+pip install orjson), otherwise with the stdlib json module;
+JSON_BACKEND=json forces the stdlib. Payloads are then parsed and
+validated once into __slots__ records with Decimal amounts, so the swap
+loop reads attributes instead of looking up string keys and converting
+strings again on every use:
+
+    Token           a /swap/token_list entry
+    SupplyPosition  a /my/supply row
+    Balance         one symbol of bot.py's /api/me/balance
+    SwapResult      a swap response (code, message, data)
+
+A body that is not JSON, or a payload with a missing or mistyped field,
+raises MalformedResponse naming the endpoint, the item and the field. It
+is a RequestFailure carrying the response's status, so retry policies
+treat it as final instead of as a lost connection.
+
+TokenTable keeps the records of the last parsed token list: a refresh
+that changed nothing returns the same list object, so every wallet and
+the quote engine (rebuilt only for a new list object) keep the records
+they already have.
+
+    tokens = TokenTable().parse(decode_envelope(body, '/swap/token_list')['data'])
+    positions = parse_supplies(payload)       # [SupplyPosition('BSD', Decimal('12.5')), ...]
+"""
+import os
+import json
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, List, Optional
+
+from retry import RequestFailure
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_BACKEND = os.getenv('JSON_BACKEND', 'orjson')
+if JSON_BACKEND == 'orjson' and orjson is None:
+    JSON_BACKEND = 'json'
+
+# Both accept bytes and raise a ValueError subclass on bad input
+loads = orjson.loads if JSON_BACKEND == 'orjson' else json.loads
+
+
+class MalformedResponse(RequestFailure):
+    """A response whose body or payload does not have the expected shape"""
+
+    def __init__(self, endpoint: str, problem: str, status: Optional[int] = 200):
+        # A 2xx answer that cannot be used: asking again will not fix it
+        super().__init__(f'Malformed response from {endpoint}: {problem}', status)
+        self.endpoint = endpoint
+
+
+def decode(content: bytes, endpoint: str, status: Optional[int] = 200) -> Any:
+    try:
+        return loads(content)
+    except ValueError as e:
+        raise MalformedResponse(endpoint, f'body is not JSON ({e}): {content[:80]!r}', status) from None
+
+
+def decode_envelope(content: bytes, endpoint: str, status: Optional[int] = 200) -> Dict:
+    """The {'code', 'message', 'data'} object every endpoint answers with"""
+    data = decode(content, endpoint, status)
+    if not isinstance(data, dict):
+        raise MalformedResponse(endpoint, f'expected a JSON object, got {_kind(data)}', status)
+    return data
+
+
+def _kind(value: Any) -> str:
+    return {dict: 'an object', list: 'a list', str: 'a string', type(None): 'null'}.get(type(value), type(value).__name__)
+
+
+def _number(value: Any) -> Optional[Decimal]:
+    """Finite Decimal from a JSON number or numeric string, None for anything else
+
+    Floats go through repr so 0.1 stays 0.1. A missing (null) amount is 0.
+    """
+    kind = type(value)
+    try:
+        if kind is str or kind is int:
+            number = Decimal(value)
+        elif kind is float:
+            number = Decimal(repr(value))
+        elif value is None:
+            return Decimal(0)
+        else:
+            return None
+    except InvalidOperation:
+        return None
+    return number if number.is_finite() else None
+
+
+def _label(kind: str, index: Optional[int]) -> str:
+    return kind if index is None else f'{kind} {index}'
+
+
+def _symbol(item: Any) -> Optional[str]:
+    symbol = item.get('symbol') if type(item) is dict else None
+    return symbol if type(symbol) is str and symbol else None
+
+
+def _no_symbol(item: Any, endpoint: str, where: str) -> MalformedResponse:
+    if not isinstance(item, dict):
+        return MalformedResponse(endpoint, f'{where} is {_kind(item)}, expected an object')
+    return MalformedResponse(endpoint, f"{where} has no symbol ({item.get('symbol')!r})")
+
+
+def _not_number(value: Any, endpoint: str, where: str) -> MalformedResponse:
+    return MalformedResponse(endpoint, f'{where} is not a number ({value!r})')
+
+
+def _items(payload: Any, endpoint: str) -> List:
+    if not isinstance(payload, list):
+        raise MalformedResponse(endpoint, f'expected a list, got {_kind(payload)}')
+    return payload
+
+
+class Token:
+    """A tradable token; precision is None when the list does not give one"""
+
+    __slots__ = ('symbol', 'name', 'price', 'precision')
+
+    def __init__(self, symbol: str, price: Decimal = Decimal(1), precision: Optional[int] = None,
+                 name: Optional[str] = None):
+        self.symbol = symbol
+        self.name = name
+        self.price = price
+        self.precision = precision
+
+    @classmethod
+    def parse(cls, item: Any, endpoint: str = '/swap/token_list', index: Optional[int] = None) -> 'Token':
+        """index is the item's position in the list, for error messages"""
+        symbol = _symbol(item)
+        if symbol is None:
+            raise _no_symbol(item, endpoint, _label('token', index))
+        raw_price = item.get('price', 1)
+        price = _number(raw_price)
+        if price is None or raw_price is None:
+            raise _not_number(raw_price, endpoint, f"{_label('token', index)} ({symbol}) price")
+        precision = item.get('precision', item.get('decimals'))
+        if precision is not None and type(precision) is not int:
+            if type(precision) is not str or not precision.isdigit():
+                raise MalformedResponse(endpoint, f"{_label('token', index)} ({symbol}) precision is not "
+                                                  f'a whole number ({precision!r})')
+            precision = int(precision)
+        if precision is not None and precision < 0:
+            raise MalformedResponse(endpoint, f"{_label('token', index)} ({symbol}) precision is negative ({precision})")
+        name = item.get('name')
+        return cls(symbol, price, precision, name if type(name) is str else None)
+
+    def key(self) -> tuple:
+        return self.symbol, self.name, self.price, self.precision
+
+    def to_dict(self) -> Dict:
+        data = {'symbol': self.symbol, 'price': str(self.price)}
+        if self.name is not None:
+            data['name'] = self.name
+        if self.precision is not None:
+            data['precision'] = self.precision
+        return data
+
+    def __repr__(self):
+        return f'Token({self.symbol}, price={self.price}, precision={self.precision})'
+
+
+def parse_tokens(payload: Any, endpoint: str = '/swap/token_list') -> List[Token]:
+    return [Token.parse(item, endpoint, i) for i, item in enumerate(_items(payload, endpoint))]
+
+
+class TokenTable:
+    """Token records of the last parsed list, handed out again while the list is unchanged"""
+
+    def __init__(self):
+        self.tokens: List[Token] = []
+        self._keys: Optional[List[tuple]] = None
+        self.reused = 0
+
+    def parse(self, payload: Any, endpoint: str = '/swap/token_list') -> List[Token]:
+        tokens = parse_tokens(payload, endpoint)
+        keys = [token.key() for token in tokens]
+        if keys == self._keys:
+            self.reused += 1
+        else:
+            self.tokens, self._keys = tokens, keys
+        return self.tokens
+
+
+class Position:
+    """An amount of one symbol"""
+
+    __slots__ = ('symbol', 'amount')
+
+    def __init__(self, symbol: str, amount: Decimal):
+        self.symbol = symbol
+        self.amount = amount
+
+    def to_dict(self) -> Dict:
+        return {'symbol': self.symbol, 'amount': str(self.amount)}
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.symbol}, {self.amount})'
+
+
+class SupplyPosition(Position):
+    """A /my/supply row"""
+
+    __slots__ = ()
+
+
+class Balance(Position):
+    """bot.py's balance of one symbol"""
+
+    __slots__ = ()
+
+
+def parse_supplies(payload: Any, endpoint: str = '/my/supply') -> List[SupplyPosition]:
+    """Supply rows; a null amount is an empty position"""
+    positions = []
+    for i, row in enumerate(_items(payload, endpoint)):
+        symbol = _symbol(row)
+        if symbol is None:
+            raise _no_symbol(row, endpoint, f'row {i}')
+        amount = _number(row.get('amount'))
+        if amount is None:
+            raise _not_number(row.get('amount'), endpoint, f'row {i} ({symbol}) amount')
+        positions.append(SupplyPosition(symbol, amount))
+    return positions
+
+
+def parse_balances(payload: Any, endpoint: str = '/api/me/balance') -> List[Balance]:
+    """{symbol: amount} balances; a null amount is an empty balance"""
+    if not isinstance(payload, dict):
+        raise MalformedResponse(endpoint, f'expected an object of balances, got {_kind(payload)}')
+    balances = []
+    for symbol, value in payload.items():
+        amount = _number(value)
+        if amount is None:
+            raise _not_number(value, endpoint, f'balance {symbol}')
+        balances.append(Balance(symbol, amount))
+    return balances
+
+
+class SwapResult:
+    """A swap response; ok when the API's code is 0"""
+
+    __slots__ = ('code', 'message', 'data')
+
+    def __init__(self, code: Any, message: Optional[str] = None, data: Any = None):
+        self.code = code
+        self.message = message
+        self.data = data
+
+    @property
+    def ok(self) -> bool:
+        return self.code in (0, '0')
+
+    @classmethod
+    def parse(cls, payload: Any, endpoint: str = '/swap') -> 'SwapResult':
+        """payload is the whole response body, or the data of a successful one (what bot_no2captcha's _request returns)"""
+        if isinstance(payload, dict) and 'code' in payload:
+            code = payload['code']
+            if not isinstance(code, (int, str)) or isinstance(code, bool):
+                raise MalformedResponse(endpoint, f'code is not an integer or string ({code!r})')
+            message = payload.get('message')
+            return cls(code, message if isinstance(message, str) else None, payload.get('data'))
+        return cls(0, None, payload)
+
+    def to_dict(self) -> Dict:
+        return {'code': self.code, 'message': self.message, 'data': self.data}
+
+    def __repr__(self):
+        return f'SwapResult(code={self.code!r}, message={self.message!r})'
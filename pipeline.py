@@ -0,0 +1,184 @@
+"""Stage-pipelined executor for bot_no2captcha.py's "Auto All Operations".
+
+Each operation is a Stage with its own bounded queue and worker pool.
+Items (one per wallet) stream through the stages in order, so wallet 2
+can be supplying while wallet 1 swaps, and each stage caps how many of
+its requests are in flight:
+
+    stages = [Stage('login', login, concurrency=4, required=True), Stage('swap', swap, concurrency=2)]
+    await Pipeline(stages).run(items)
+
+A stage body is `async def body(item)`. When it raises, the failure is
+counted and the item continues to the next stage, unless the stage is
+`required`, in which case the item leaves the pipeline. Queues hold at
+most `queue_size` items: a worker that finished an item waits for room
+in the next stage's queue (backpressure), so a slow stage throttles the
+stages in front of it instead of piling wallets up behind it.
+
+A stage's `pace` (`async def pace()`, e.g. a random delay) runs after each
+successful item before it moves on, in a task of its own: the worker is
+free for the next item meanwhile, so worker slots and backpressure count
+requests, not sleeping.
+
+Per stage the pipeline records items done / failed, time spent waiting
+in the queue, body latency, queue high-water mark and throughput;
+`format_stats()` prints them at the end of a run.
+"""
+import time
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from logger import Logger
+from metrics import percentile
+
+
+class StageStats:
+    """Counters for one stage"""
+
+    __slots__ = ('done', 'failed', 'dropped', 'latencies', 'waits', 'max_queued', 'first_start', 'last_end')
+
+    def __init__(self):
+        self.done = 0
+        self.failed = 0
+        self.dropped = 0
+        self.latencies: List[float] = []
+        self.waits: List[float] = []
+        self.max_queued = 0
+        self.first_start: Optional[float] = None
+        self.last_end: Optional[float] = None
+
+    def latency(self, q: float) -> float:
+        return percentile(self.latencies, q * 100)
+
+    def wait(self, q: float) -> float:
+        return percentile(self.waits, q * 100)
+
+    @property
+    def throughput(self) -> float:
+        """Items per second between the stage's first start and last finish"""
+        if self.first_start is None or self.last_end is None or self.last_end <= self.first_start:
+            return 0.0
+        return (self.done + self.failed) / (self.last_end - self.first_start)
+
+
+class Stage:
+    """One operation of the pipeline"""
+
+    def __init__(self, name: str, body: Callable[[Any], Awaitable[None]], concurrency: int = 1,
+                 queue_size: Optional[int] = None, required: bool = False,
+                 pace: Optional[Callable[[], Awaitable[None]]] = None):
+        self.name = name
+        self.body = body
+        self.concurrency = max(1, concurrency)
+        # Default: room for one waiting item per worker
+        self.queue_size = queue_size if queue_size is not None else self.concurrency
+        self.required = required
+        self.pace = pace
+        self.stats = StageStats()
+        self.queue: Optional[asyncio.Queue] = None
+
+
+class Pipeline:
+    """Runs items through stages, each stage with its own workers and bounded queue"""
+
+    def __init__(self, stages: Sequence[Stage], on_item_done: Optional[Callable[[Any, bool], None]] = None):
+        if not stages:
+            raise ValueError('A pipeline needs at least one stage')
+        self.stages = list(stages)
+        # on_item_done(item, completed): called once per item, completed is False when a required stage failed
+        self.on_item_done = on_item_done
+        self._transfers = set()
+
+    async def run(self, items: Sequence[Any]):
+        for stage in self.stages:
+            stage.queue = asyncio.Queue(maxsize=max(1, stage.queue_size))
+        workers = [
+            asyncio.create_task(self._worker(i, stage), name=f'{stage.name}-{n}')
+            for i, stage in enumerate(self.stages)
+            for n in range(stage.concurrency)
+        ]
+        try:
+            for item in items:
+                await self._put(self.stages[0], item)
+            # Items only move forward, so once stage i is drained nothing can enter it again
+            for stage in self.stages:
+                await stage.queue.join()
+        finally:
+            tasks = workers + list(self._transfers)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _put(self, stage: Stage, item: Any):
+        await stage.queue.put((time.perf_counter(), item))
+        stage.stats.max_queued = max(stage.stats.max_queued, stage.queue.qsize())
+
+    async def _worker(self, index: int, stage: Stage):
+        stats = stage.stats
+        next_stage = self.stages[index + 1] if index + 1 < len(self.stages) else None
+        while True:
+            queued_at, item = await stage.queue.get()
+            handed_off = False
+            try:
+                started = time.perf_counter()
+                stats.waits.append(started - queued_at)
+                if stats.first_start is None:
+                    stats.first_start = started
+                ok = True
+                try:
+                    await stage.body(item)
+                    stats.done += 1
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    ok = False
+                    stats.failed += 1
+                    Logger.error(getattr(item, 'name', None), f'{stage.name} failed: {str(e)}',
+                                 event='stage_failed', stage=stage.name)
+                stats.last_end = time.perf_counter()
+                stats.latencies.append(stats.last_end - started)
+
+                if not ok and stage.required:
+                    stats.dropped += 1
+                    self._finish(item, False)
+                elif next_stage is not None and ok and stage.pace is not None:
+                    transfer = asyncio.create_task(self._forward(stage, next_stage, item))
+                    self._transfers.add(transfer)
+                    transfer.add_done_callback(self._transfers.discard)
+                    handed_off = True
+                elif next_stage is not None:
+                    # Blocks while the next stage is full: backpressure
+                    await self._put(next_stage, item)
+                else:
+                    self._finish(item, True)
+            finally:
+                if not handed_off:
+                    stage.queue.task_done()
+
+    async def _forward(self, stage: Stage, next_stage: Stage, item: Any):
+        """Pace an item outside any worker, then move it on; it counts as in the stage until then"""
+        try:
+            await stage.pace()
+            await self._put(next_stage, item)
+        finally:
+            stage.queue.task_done()
+
+    def _finish(self, item: Any, completed: bool):
+        if self.on_item_done:
+            self.on_item_done(item, completed)
+
+    def stats(self) -> Dict[str, StageStats]:
+        return {stage.name: stage.stats for stage in self.stages}
+
+    def format_stats(self) -> str:
+        """Per-stage table: workers, items, latency and queue wait percentiles, throughput"""
+        lines = [f"{'stage':<10}{'workers':>8}{'done':>6}{'fail':>6}{'drop':>6}{'p50 ms':>9}{'p90 ms':>9}"
+                 f"{'wait p90':>10}{'max q':>7}{'items/s':>9}"]
+        for stage in self.stages:
+            stats = stage.stats
+            lines.append(
+                f'{stage.name:<10}{stage.concurrency:>8}{stats.done:>6}{stats.failed:>6}{stats.dropped:>6}'
+                f'{stats.latency(0.5) * 1000:>9.1f}{stats.latency(0.9) * 1000:>9.1f}'
+                f'{stats.wait(0.9) * 1000:>10.1f}{stats.max_queued:>7}{stats.throughput:>9.2f}'
+            )
+        return '\n'.join(lines)
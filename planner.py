@@ -0,0 +1,216 @@
+"""Dry-run planner shared by bot.py and bot_no2captcha.py (`--plan`).
+
+A bot builds a Plan from local data only (wallets, the cached token
+list, the session file, the rate-limit store): every wallet's requests
+in order, with the amounts and delays it would draw. simulate() then
+plays the plan through a model of the bot's scheduler with sampled
+request latencies and reports predicted wall time, requests per
+endpoint and peak concurrency. Nothing is sent over the network.
+
+Two scheduler models:
+
+- slots:    `workers` wallets at a time, each running its requests and
+            delays start to finish (bot_no2captcha.py's run_wallets)
+- cooldown: delays do not hold a worker, up to `workers` due requests
+            run at once (bot.py's CooldownScheduler)
+
+Distributions are given as specs: '40' (fixed), 'uniform:20,60',
+'normal:40,10' or 'lognormal:40,0.5' (median, sigma); latency specs are
+in milliseconds, delay specs in seconds. A plan saved with `--plan-out`
+can be run as planned with `--execute-plan`.
+"""
+import json
+import math
+import time
+import heapq
+import random
+from typing import Any, Callable, Dict, List, Optional
+
+PLAN_VERSION = 1
+
+Sampler = Callable[[random.Random], float]
+
+
+def parse_distribution(spec: str, unit: float = 1.0) -> Sampler:
+    """Sampler for spec, in spec units times unit (never negative)"""
+    kind, _, params = spec.partition(':')
+    if not params:
+        value = float(kind) * unit
+        return lambda rng: value
+    try:
+        a, b = (float(x) for x in params.split(','))
+    except ValueError:
+        raise ValueError(f'Distribution {spec!r} needs two parameters') from None
+    if kind == 'uniform':
+        return lambda rng: max(0.0, rng.uniform(a, b)) * unit
+    if kind == 'normal':
+        return lambda rng: max(0.0, rng.gauss(a, b)) * unit
+    if kind == 'lognormal':
+        mu = math.log(a)
+        return lambda rng: rng.lognormvariate(mu, b) * unit
+    raise ValueError(f'Unknown distribution {kind!r} (fixed, uniform, normal, lognormal)')
+
+
+class WalletPlan:
+    """One wallet's planned requests: {'endpoint', 'delay_after', ...detail}"""
+
+    __slots__ = ('name', 'address', 'ops', 'status')
+
+    def __init__(self, name: str, address: str, ops: Optional[List[Dict]] = None, status: str = 'planned'):
+        self.name = name
+        self.address = address
+        self.ops: List[Dict] = ops or []
+        self.status = status
+
+    def add(self, endpoint: str, delay_after: float = 0.0, **detail):
+        self.ops.append({'endpoint': endpoint, 'delay_after': delay_after, **detail})
+
+    def swaps(self) -> List[Dict]:
+        return [op for op in self.ops if op.get('swap')]
+
+
+class Plan:
+    """Everything a run would send, without sending it"""
+
+    def __init__(self, bot: str, params: Dict[str, Any], preamble: Optional[List[Dict]] = None,
+                 wallets: Optional[List[WalletPlan]] = None, bindings: Optional[List[str]] = None):
+        self.bot = bot
+        self.params = params
+        # Requests sent once before the wallets start (e.g. the token list)
+        self.preamble: List[Dict] = preamble or []
+        self.wallets: List[WalletPlan] = wallets or []
+        # SecurityConfig limits the plan runs into
+        self.bindings: List[str] = bindings or []
+
+    def for_address(self, address: str) -> Optional[WalletPlan]:
+        address = address.lower()
+        return next((wallet for wallet in self.wallets if wallet.address.lower() == address), None)
+
+    def to_dict(self) -> Dict:
+        return {
+            'version': PLAN_VERSION,
+            'bot': self.bot,
+            'created_at': time.time(),
+            'params': self.params,
+            'preamble': self.preamble,
+            'bindings': self.bindings,
+            'wallets': [{'name': w.name, 'address': w.address, 'status': w.status, 'ops': w.ops} for w in self.wallets],
+        }
+
+    def save(self, path: str):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=1)
+
+    @classmethod
+    def load(cls, path: str, bot: str) -> 'Plan':
+        with open(path) as f:
+            data = json.load(f)
+        if data.get('version') != PLAN_VERSION:
+            raise ValueError(f'{path}: unsupported plan version {data.get("version")}')
+        if data.get('bot') != bot:
+            raise ValueError(f"{path} is a plan for {data.get('bot')}, not {bot}")
+        wallets = [WalletPlan(w['name'], w['address'], w['ops'], w.get('status', 'planned')) for w in data['wallets']]
+        return cls(data['bot'], data.get('params', {}), data.get('preamble'), wallets, data.get('bindings'))
+
+
+class Simulation:
+    """Predicted timeline of a plan"""
+
+    def __init__(self):
+        self.wall_time = 0.0
+        self.requests: Dict[str, int] = {}
+        self.peak_concurrency = 0
+        self.request_time = 0.0
+        self.delay_time = 0.0
+        self.finished: Dict[str, float] = {}
+        # (start, end) of every request, for the concurrency sweep
+        self._intervals: List[tuple] = []
+
+    def request(self, endpoint: str, start: float, latency: float) -> float:
+        self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+        self.request_time += latency
+        self._intervals.append((start, start + latency))
+        return start + latency
+
+    def finish(self):
+        events = sorted([(start, 1) for start, _ in self._intervals] + [(end, -1) for _, end in self._intervals])
+        in_flight = 0
+        for _, change in events:
+            in_flight += change
+            self.peak_concurrency = max(self.peak_concurrency, in_flight)
+
+
+def simulate(plan: Plan, workers: int, latency: Sampler, delay: Optional[Sampler] = None, model: str = 'slots',
+             rng: Optional[random.Random] = None, sim: Optional[Simulation] = None) -> Simulation:
+    """Play plan through the scheduler model; delay overrides the planned delays when given
+
+    Passing the Simulation of an earlier phase continues it: this plan starts when that one ended.
+    """
+    rng = rng or random.Random(0)
+    sim = sim or Simulation()
+    now = sim.wall_time
+    for op in plan.preamble:
+        now = sim.request(op['endpoint'], now, latency(rng))
+    start = now
+
+    def pause(op: Dict) -> float:
+        if not op.get('delay_after'):
+            return 0.0
+        seconds = delay(rng) if delay else op['delay_after']
+        sim.delay_time += seconds
+        return seconds
+
+    workers = max(1, workers)
+    if model == 'slots':
+        slots = [start] * workers
+        for wallet in plan.wallets:
+            t = heapq.heappop(slots)
+            for op in wallet.ops:
+                # An op without endpoint is a draw the bot skips without sending anything
+                if op['endpoint']:
+                    t = sim.request(op['endpoint'], t, latency(rng))
+                t += pause(op)
+            sim.finished[wallet.address] = t
+            heapq.heappush(slots, t)
+    elif model == 'cooldown':
+        # Next step of every wallet by due time; a step waits for a free worker
+        due = [(start, seq, wallet, 0) for seq, wallet in enumerate(plan.wallets) if wallet.ops]
+        heapq.heapify(due)
+        free = [start] * workers
+        while due:
+            ready, seq, wallet, index = heapq.heappop(due)
+            t = max(ready, heapq.heappop(free))
+            op = wallet.ops[index]
+            end = sim.request(op['endpoint'], t, latency(rng)) if op['endpoint'] else t
+            heapq.heappush(free, end)
+            if index + 1 < len(wallet.ops):
+                heapq.heappush(due, (end + pause(op), seq, wallet, index + 1))
+            else:
+                sim.finished[wallet.address] = end
+    else:
+        raise ValueError(f'Unknown scheduler model {model!r}')
+
+    sim.wall_time = max(sim.finished.values(), default=now)
+    sim.finish()
+    return sim
+
+
+def format_report(plan: Plan, sim: Simulation) -> str:
+    """Predicted wall time, requests per endpoint, peak concurrency and binding limits"""
+    statuses: Dict[str, int] = {}
+    for wallet in plan.wallets:
+        statuses[wallet.status] = statuses.get(wallet.status, 0) + 1
+    total = sum(sim.requests.values())
+    lines = [
+        f'Plan: {len(plan.wallets)} wallet(s) (' + ', '.join(f'{n} {s}' for s, n in statuses.items()) + '), '
+        + ', '.join(f'{k}={v}' for k, v in plan.params.items()),
+        f'Predicted wall time: {sim.wall_time:.1f}s ({sim.wall_time / 60:.1f} min); '
+        f'summed request time {sim.request_time:.1f}s, summed delays {sim.delay_time:.1f}s',
+        f"{'endpoint':<28}{'requests':>9}",
+    ]
+    for endpoint, count in sorted(sim.requests.items(), key=lambda item: -item[1]):
+        lines.append(f'{endpoint:<28}{count:>9}')
+    lines.append(f"{'total':<28}{total:>9}")
+    lines.append(f'Peak requests in flight: {sim.peak_concurrency}')
+    lines.append('Limits that bind: ' + ('; '.join(plan.bindings) if plan.bindings else 'none'))
+    return '\n'.join(lines)
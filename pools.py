@@ -0,0 +1,137 @@
+"""Pooled requests sessions for transport.py's http1 transport and bot.py.
+
+TransportRegistry: one pooled requests.Session per outbound route (each
+proxy, plus the direct route), shared by every wallet on that route. Auth
+travels in per-request headers, so sessions carry no per-wallet state; the
+cookie jar is disabled so a gfsessionid from one wallet can never be
+replayed for another. Every response carries `connection_reused`.
+
+Kept apart from transport.py so that importing the transports does not
+import requests: bot_no2captcha.py loads it on its first http1 request.
+"""
+import os
+import threading
+from http.cookiejar import DefaultCookiePolicy
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.poolmanager import ProxyManager
+
+from transport import DIRECT_ROUTE, HTTP_POOL_SIZE
+
+HTTP_POOL_CONNECTIONS = int(os.getenv('HTTP_POOL_CONNECTIONS', '4'))
+HTTP_KEEP_ALIVE = os.getenv('HTTP_KEEP_ALIVE', '1') not in ('0', 'false', 'no')
+
+# Set when the current thread's request had to open a new connection
+_conn_state = threading.local()
+
+
+class _TrackedPoolMixin:
+    def _new_conn(self):
+        _conn_state.opened = True
+        return super()._new_conn()
+
+
+class _TrackedHTTPPool(_TrackedPoolMixin, HTTPConnectionPool):
+    pass
+
+
+class _TrackedHTTPSPool(_TrackedPoolMixin, HTTPSConnectionPool):
+    pass
+
+
+TRACKED_POOLS = {'http': _TrackedHTTPPool, 'https': _TrackedHTTPSPool}
+
+
+class TrackedAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools note, per thread, when a new connection is opened"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = TRACKED_POOLS
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        manager = super().proxy_manager_for(proxy, **proxy_kwargs)
+        # SOCKS managers bring their own pool classes; those go untracked
+        if isinstance(manager, ProxyManager):
+            manager.pool_classes_by_scheme = TRACKED_POOLS
+        return manager
+
+
+class TrackedSession(requests.Session):
+    """Session that flags every response with connection_reused"""
+
+    def request(self, *args, **kwargs):
+        _conn_state.opened = False
+        response = super().request(*args, **kwargs)
+        response.connection_reused = not _conn_state.opened
+        return response
+
+
+class TransportRegistry:
+    """Hands out one pooled session per route and reports connection reuse"""
+
+    def __init__(self, pool_size: int = HTTP_POOL_SIZE, pool_connections: int = HTTP_POOL_CONNECTIONS,
+                 keep_alive: bool = HTTP_KEEP_ALIVE):
+        self.pool_size = pool_size
+        self.pool_connections = pool_connections
+        self.keep_alive = keep_alive
+        self._sessions: Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    def session(self, proxy: Optional[str] = None) -> requests.Session:
+        route = proxy or DIRECT_ROUTE
+        with self._lock:
+            session = self._sessions.get(route)
+            if session is None:
+                session = self._build_session(proxy)
+                self._sessions[route] = session
+            return session
+
+    def _build_session(self, proxy: Optional[str]) -> requests.Session:
+        session = TrackedSession()
+        # pool_maxsize bounds idle connections kept per host; size it for the wallet concurrency
+        adapter = TrackedAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_size)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        if not self.keep_alive:
+            session.headers['Connection'] = 'close'
+        if proxy:
+            session.proxies = {'http': proxy, 'https': proxy}
+        return session
+
+    @staticmethod
+    def _pools(adapter: HTTPAdapter):
+        managers = [adapter.poolmanager] + list(adapter.proxy_manager.values())
+        for manager in managers:
+            for key in list(manager.pools.keys()):
+                pool = manager.pools.get(key)
+                if pool is not None:
+                    yield pool
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Per-route connections opened, requests sent and requests served on a reused connection"""
+        report = {}
+        with self._lock:
+            sessions = dict(self._sessions)
+        for route, session in sessions.items():
+            opened = sent = 0
+            adapters = {id(a): a for a in session.adapters.values() if isinstance(a, HTTPAdapter)}
+            for adapter in adapters.values():
+                for pool in self._pools(adapter):
+                    opened += pool.num_connections
+                    sent += pool.num_requests
+            report[route] = {'connections': opened, 'requests': sent, 'reused': max(0, sent - opened)}
+        return report
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+registry = TransportRegistry()
@@ -0,0 +1,177 @@
+"""Run-phase profiling hooks shared by bot.py and bot_no2captcha.py (`--profile`).
+
+Code wraps its phases in named timers:
+
+    with profiler.phase('sign'):
+        signed = account.sign_message(message)
+    with profiler.phase('delay', SLEEP):
+        await asyncio.sleep(delay)
+
+Every phase has a kind, so the end-of-run breakdown can separate
+intentional sleep from network waits and CPU work:
+
+- cpu:       signing, JSON decoding and parsing, quoting, key loading, log writing
+- network:   one HTTP round trip
+- sleep:     deliberate delays and cooldowns
+- composite: a whole operation (login, fetch supplies, swap request)
+             that contains the leaf phases above; shown, but not added
+             to the per-kind totals
+
+Phases of concurrent wallets overlap, so totals are summed phase time,
+not wall time. With profiling off, phase() returns a shared no-op
+context manager and nothing is recorded.
+
+`--profile-out FILE` also records a cProfile of every thread and dumps
+it in pstats format (`python -m pstats FILE`); `--profile-memory`
+takes tracemalloc snapshots at start and end and prints the top
+allocation sites.
+"""
+import time
+import threading
+import contextlib
+from typing import Dict, List, Optional
+
+CPU = 'cpu'
+NETWORK = 'network'
+SLEEP = 'sleep'
+COMPOSITE = 'composite'
+KINDS = (CPU, NETWORK, SLEEP)
+
+_NULL = contextlib.nullcontext()
+
+
+class PhaseStats:
+    """Count and durations of one phase"""
+
+    __slots__ = ('kind', 'count', 'total', 'max')
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
+class Profiler:
+    """Named phase timers plus optional cProfile and tracemalloc capture"""
+
+    def __init__(self):
+        self.enabled = False
+        self.phases: Dict[str, PhaseStats] = {}
+        self._lock = threading.Lock()
+        self._started = 0.0
+        self._elapsed = 0.0
+        self._cprofile_path: Optional[str] = None
+        self._profiles: List = []
+        self._memory = False
+        self._snapshot = None
+        self._memory_report = ''
+
+    def configure(self, enabled: bool, cprofile_path: Optional[str] = None, memory: bool = False):
+        """Turn phase timers on; cprofile_path and memory add the heavier captures"""
+        self.enabled = enabled or bool(cprofile_path) or memory
+        self._cprofile_path = cprofile_path
+        self._memory = memory
+
+    def phase(self, name: str, kind: str = CPU):
+        if not self.enabled:
+            return _NULL
+        return self._timed(name, kind)
+
+    @contextlib.contextmanager
+    def _timed(self, name: str, kind: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started, kind)
+
+    def record(self, name: str, seconds: float, kind: str = CPU):
+        with self._lock:
+            stats = self.phases.get(name)
+            if stats is None:
+                stats = self.phases[name] = PhaseStats(kind)
+            stats.count += 1
+            stats.total += seconds
+            stats.max = max(stats.max, seconds)
+
+    # ------------------------------
+    # Run capture
+    # ------------------------------
+    def start(self):
+        """Begin the run: start cProfile (every thread) and tracemalloc when configured"""
+        if not self.enabled:
+            return
+        self._started = time.perf_counter()
+        if self._cprofile_path:
+            import cProfile
+            profile = cProfile.Profile()
+            self._profiles.append(profile)
+            profile.enable()
+            # Threads started from now on (thread pools, the log writer) get a profile of their own
+            threading.setprofile(self._profile_thread)
+        if self._memory:
+            import tracemalloc
+            # One frame per trace is enough for a by-line report and keeps the overhead down
+            tracemalloc.start()
+            self._snapshot = tracemalloc.take_snapshot()
+
+    def _profile_thread(self, frame, event, arg):
+        import cProfile
+        profile = cProfile.Profile()
+        with self._lock:
+            self._profiles.append(profile)
+        # Replaces this hook for the calling thread
+        profile.enable()
+
+    def stop(self):
+        """End the run: dump the merged cProfile and compare the tracemalloc snapshots"""
+        if not self.enabled or not self._started:
+            return
+        self._elapsed = time.perf_counter() - self._started
+        if self._snapshot is not None:
+            import tracemalloc
+            end = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            end = end.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+            top = end.compare_to(self._snapshot, 'lineno')[:10]
+            lines = [f'tracemalloc: {current / 1024:.0f} KiB traced at end, peak {peak / 1024:.0f} KiB; '
+                     'top allocation growth:']
+            lines += [f'  {stat}' for stat in top]
+            self._memory_report = '\n'.join(lines)
+            self._snapshot = None
+        # After the memory report, so building the stats does not show up in it
+        if self._profiles:
+            import pstats
+            threading.setprofile(None)
+            self._profiles[0].disable()
+            stats = pstats.Stats(*self._profiles)
+            stats.dump_stats(self._cprofile_path)
+            self._profiles = []
+
+    def format_report(self) -> str:
+        """Per-phase table plus summed time per kind"""
+        with self._lock:
+            phases = sorted(self.phases.items(), key=lambda item: item[1].total, reverse=True)
+        lines = [f"{'phase':<20}{'kind':<11}{'count':>7}{'total s':>10}{'mean ms':>10}{'max ms':>10}"]
+        totals = {kind: 0.0 for kind in KINDS}
+        for name, stats in phases:
+            lines.append(f'{name:<20}{stats.kind:<11}{stats.count:>7}{stats.total:>10.3f}'
+                         f'{stats.total / stats.count * 1000:>10.2f}{stats.max * 1000:>10.2f}')
+            if stats.kind in totals:
+                totals[stats.kind] += stats.total
+        summed = sum(totals.values())
+        lines.append('summed phase time: ' + ', '.join(
+            f'{kind} {seconds:.3f}s ({100 * seconds / summed if summed else 0:.0f}%)' for kind, seconds in totals.items()
+        ))
+        if self._elapsed:
+            lines.append(f'run wall time: {self._elapsed:.3f}s (phases of concurrent wallets overlap)')
+        if self._cprofile_path:
+            lines.append(f'cProfile written to {self._cprofile_path} (python -m pstats {self._cprofile_path})')
+        if self._memory_report:
+            lines.append(self._memory_report)
+        return '\n'.join(lines)
+
+
+profiler = Profiler()
@@ -0,0 +1,178 @@
+"""Swap quote engine shared by bot.py and bot_no2captcha.py.
+
+Built once per token-list refresh: a symbol index, a cross-rate matrix
+from the tokens' `price` fields and the swap candidates for every source
+symbol. Amounts are Decimals quantized to each token's precision and are
+formatted as plain decimal strings (never `1e-05`).
+
+Takes models.Token records; plain dicts (the plan cache, hand-built
+lists) are parsed on the way in and invalid ones skipped.
+"""
+import random
+from decimal import Decimal, ROUND_DOWN
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+from models import MalformedResponse, Token
+
+DEFAULT_PRECISION = 6
+
+Number = Union[Decimal, float, int, str]
+
+
+def to_decimal(value: Number) -> Decimal:
+    """Exact-as-written Decimal; floats go through repr so 0.1 stays 0.1"""
+    if isinstance(value, Decimal):
+        return value
+    if isinstance(value, float):
+        return Decimal(repr(value))
+    return Decimal(str(value))
+
+
+def format_amount(value: Number) -> str:
+    """Plain decimal string without exponent or trailing zeros"""
+    text = format(to_decimal(value), 'f')
+    if '.' in text:
+        text = text.rstrip('0').rstrip('.')
+    return text or '0'
+
+
+class SwapQuote:
+    """One planned swap"""
+
+    __slots__ = ('from_symbol', 'to_symbol', 'from_amount', 'to_amount')
+
+    def __init__(self, from_symbol: str, to_symbol: str, from_amount: Decimal, to_amount: Decimal):
+        self.from_symbol = from_symbol
+        self.to_symbol = to_symbol
+        self.from_amount = from_amount
+        self.to_amount = to_amount
+
+    def __repr__(self):
+        return (f'SwapQuote({self.from_symbol}->{self.to_symbol}, '
+                f'{format_amount(self.from_amount)} -> {format_amount(self.to_amount)})')
+
+
+class QuoteEngine:
+    """Precomputed symbol index, cross rates and swap candidates for one token list"""
+
+    def __init__(self, token_list: Sequence[Union[Token, Dict]], default_precision: int = DEFAULT_PRECISION):
+        self.token_list = token_list
+        self.tokens: Dict[str, Token] = {}
+        self.symbols: List[str] = []
+        prices: List[Decimal] = []
+        self._quanta: Dict[str, Decimal] = {}
+
+        for token in token_list:
+            if not isinstance(token, Token):
+                try:
+                    token = Token.parse(token)
+                except MalformedResponse:
+                    continue
+            if token.symbol in self.tokens or token.price <= 0:
+                continue
+            precision = default_precision if token.precision is None else token.precision
+            self.tokens[token.symbol] = token
+            self.symbols.append(token.symbol)
+            prices.append(token.price)
+            self._quanta[token.symbol] = Decimal(1).scaleb(-precision)
+
+        self._index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        # rates[i][j]: units of token j received per unit of token i
+        self.rates = [[p_from / p_to for p_to in prices] for p_from in prices]
+        self._candidates = {
+            symbol: tuple(s for s in self.symbols if s != symbol) for symbol in self.symbols
+        }
+
+    @classmethod
+    def from_pair_rate(cls, from_symbol: str, to_symbol: str, rate: Number,
+                       precision: int = DEFAULT_PRECISION) -> 'QuoteEngine':
+        """Engine for a single fixed rate (1 from_symbol = rate to_symbol)"""
+        return cls([
+            Token(from_symbol, to_decimal(rate), precision),
+            Token(to_symbol, Decimal(1), precision),
+        ])
+
+    def token(self, symbol: str) -> Optional[Token]:
+        return self.tokens.get(symbol)
+
+    def candidates(self, symbol: str) -> Tuple[str, ...]:
+        """Symbols symbol can be swapped into"""
+        return self._candidates.get(symbol, ())
+
+    def targets(self, symbol: str, amount: Number) -> List[str]:
+        """Candidates whose output for amount of symbol does not round down to zero"""
+        amount = self.quantize(symbol, amount)
+        if amount <= 0 or symbol not in self._index:
+            return []
+        rates = self.rates[self._index[symbol]]
+        return [target for target in self._candidates.get(symbol, ())
+                if self.quantize(target, amount * rates[self._index[target]]) > 0]
+
+    def rate(self, from_symbol: str, to_symbol: str) -> Decimal:
+        return self.rates[self._index[from_symbol]][self._index[to_symbol]]
+
+    def quantize(self, symbol: str, amount: Number) -> Decimal:
+        """Round down to the token's precision so limits are never exceeded"""
+        quantum = self._quanta.get(symbol, Decimal(1).scaleb(-DEFAULT_PRECISION))
+        return to_decimal(amount).quantize(quantum, rounding=ROUND_DOWN)
+
+    def quote(self, from_symbol: str, to_symbol: str, from_amount: Number) -> SwapQuote:
+        """Quantized from/to amounts for one swap"""
+        amount = self.quantize(from_symbol, from_amount)
+        to_amount = self.quantize(to_symbol, amount * self.rate(from_symbol, to_symbol))
+        return SwapQuote(from_symbol, to_symbol, amount, to_amount)
+
+    def quote_swap(self, sources: Sequence[str], amount: Number,
+                   rng: Optional[random.Random] = None) -> Optional[SwapQuote]:
+        """Quote amount of a random source into a random target it can trade into
+
+        Only pairs whose output is at least one unit at the target's precision
+        are drawn from. None when no source has such a target.
+        """
+        rng = rng or random
+        tradable = {}
+        for symbol in sources:
+            targets = self.targets(symbol, amount)
+            if targets:
+                tradable[symbol] = targets
+        if not tradable:
+            return None
+        from_symbol = rng.choice(list(tradable))
+        return self.quote(from_symbol, rng.choice(tradable[from_symbol]), amount)
+
+    def plan_swaps(self, balances: Mapping[str, Number], amounts: Sequence[Number], min_balance: Number = 0,
+                   rng: Optional[random.Random] = None) -> List[Optional[SwapQuote]]:
+        """Quotes for a whole wallet's run, computed in one pass
+
+        Works on a copy of balances that every quote updates as
+        BalanceLedger.record_swap would, so each swap is drawn only from the
+        sources the earlier ones leave covering its amount above min_balance.
+        An entry is None when no covering source can trade the amount; the
+        list stops short at the first amount no source covers.
+        """
+        rng = rng or random
+        held = {symbol: to_decimal(amount) for symbol, amount in balances.items()}
+        floor = to_decimal(min_balance)
+        plan: List[Optional[SwapQuote]] = []
+        for amount in amounts:
+            amount = to_decimal(amount)
+            sources = [symbol for symbol, balance in held.items() if balance - amount >= floor]
+            if not sources:
+                break
+            quote = self.quote_swap(sources, amount, rng)
+            if quote is not None:
+                held[quote.from_symbol] -= quote.from_amount
+                held[quote.to_symbol] = held.get(quote.to_symbol, Decimal(0)) + quote.to_amount
+            plan.append(quote)
+        return plan
+
+
+_engine_cache: Optional[QuoteEngine] = None
+
+
+def get_quote_engine(token_list: Sequence[Union[Token, Dict]]) -> QuoteEngine:
+    """Engine for token_list, rebuilt only when a different list object (a refresh) comes in"""
+    global _engine_cache
+    if _engine_cache is None or _engine_cache.token_list is not token_list:
+        _engine_cache = QuoteEngine(token_list)
+    return _engine_cache
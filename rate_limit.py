@@ -0,0 +1,108 @@
+"""Sliding-window transaction limiter for bot_no2captcha.py.
+
+Allows at most `limit` transactions per key (a wallet address) in any
+`window` seconds. Unlike a fixed window, which resets an hour after its
+first transaction and so lets up to twice the limit through around the
+reset, every slot is freed exactly `window` seconds after it was used.
+
+Slots live in a SQLite file (WAL mode), so the limit holds across runs,
+across concurrent tasks and threads, and across worker processes
+(`--workers`) sharing the file. An acquire is one short
+`BEGIN IMMEDIATE` transaction, serialised between processes by SQLite's
+lock. Without a path the slots are kept in memory for this process only.
+The database (and sqlite3) is opened on first use.
+
+    limiter = SlidingWindowLimiter(100, path='rate_limit.db')
+    if limiter.acquire(address): ...          # takes a slot, False when full
+    delay = limiter.wait_time(address)        # seconds until a slot is free, never raises
+"""
+import os
+import time
+import threading
+from typing import Dict, Optional
+
+RATE_LIMIT_DB = os.getenv('RATE_LIMIT_DB', 'rate_limit.db')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS slots (
+    key TEXT NOT NULL,
+    ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_slots_key_ts ON slots (key, ts);
+"""
+
+
+class SlidingWindowLimiter:
+    """At most `limit` acquisitions per key in any `window` seconds, optionally persisted"""
+
+    def __init__(self, limit: int, window: float = 3600, path: Optional[str] = None):
+        self.limit = limit
+        self.window = window
+        self.path = path or None
+        self._db = None
+        self._lock = threading.Lock()
+
+    @property
+    def _conn(self):
+        """The connection, opened on first use (callers hold self._lock)"""
+        if self._db is None:
+            import sqlite3
+            # isolation_level=None: transactions are opened explicitly with BEGIN IMMEDIATE
+            self._db = sqlite3.connect(self.path or ':memory:', timeout=30, isolation_level=None,
+                                       check_same_thread=False)
+            if self.path:
+                self._db.execute('PRAGMA journal_mode=WAL')
+                self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.executescript(SCHEMA)
+        return self._db
+
+    def acquire(self, key: str) -> bool:
+        """Take a slot for key; False (and nothing recorded) when the window is full"""
+        key = key.lower()
+        now = time.time()
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._conn.execute('DELETE FROM slots WHERE key = ? AND ts <= ?', (key, now - self.window))
+                used = self._conn.execute('SELECT COUNT(*) FROM slots WHERE key = ?', (key,)).fetchone()[0]
+                if used >= self.limit:
+                    self._conn.execute('COMMIT')
+                    return False
+                self._conn.execute('INSERT INTO slots (key, ts) VALUES (?, ?)', (key, now))
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+        return True
+
+    def wait_time(self, key: str) -> float:
+        """Seconds until key can acquire a slot; 0 when one is free now"""
+        key = key.lower()
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT ts FROM slots WHERE key = ? AND ts > ? ORDER BY ts DESC LIMIT ?',
+                (key, now - self.window, self.limit)
+            ).fetchall()
+        if len(rows) < self.limit:
+            return 0.0
+        # The oldest of the newest `limit` slots is the next to leave the window
+        return max(0.0, rows[-1][0] + self.window - now)
+
+    def used(self, key: str) -> int:
+        """Slots key has used in the current window"""
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM slots WHERE key = ? AND ts > ?',
+                                      (key.lower(), time.time() - self.window)).fetchone()[0]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            keys, slots = self._conn.execute('SELECT COUNT(DISTINCT key), COUNT(*) FROM slots WHERE ts > ?',
+                                             (time.time() - self.window,)).fetchone()
+        return {'limit': self.limit, 'window': int(self.window), 'wallets': keys, 'slots_used': slots}
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,218 @@
+"""Retry policy and circuit breaker shared by bot.py and bot_no2captcha.py.
+
+Endpoints fall into classes with their own policy:
+
+- read:     idempotent GETs (token list, supplies, earn info, balance);
+            retried on timeouts, connection errors, 5xx and 429 with
+            exponential backoff and full jitter
+- auth:     sign-in; repeating it only issues another session, so it
+            retries like a read
+- mutation: swap, supply, withdraw, borrow, repay, share; retried only
+            when the failure proves the server did not apply the
+            request (429, or the connection was never established)
+
+A 429's Retry-After is honoured. One CircuitBreaker per bot counts
+consecutive server-side failures across all wallets; once open, every
+wallet waits out the cooldown instead of burning through the wallet
+list, then a single probe request decides whether to resume.
+"""
+import os
+import time
+import random
+import asyncio
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+from logger import Logger
+from transport import is_connect_error
+
+RETRY_ATTEMPTS = int(os.getenv('RETRY_ATTEMPTS', '4'))
+MUTATION_ATTEMPTS = int(os.getenv('MUTATION_ATTEMPTS', '3'))
+RETRY_BASE_DELAY = float(os.getenv('RETRY_BASE_DELAY', '0.5'))
+RETRY_MAX_DELAY = float(os.getenv('RETRY_MAX_DELAY', '15'))
+BREAKER_THRESHOLD = int(os.getenv('BREAKER_THRESHOLD', '5'))
+BREAKER_COOLDOWN = float(os.getenv('BREAKER_COOLDOWN', '30'))
+BREAKER_MAX_COOLDOWN = float(os.getenv('BREAKER_MAX_COOLDOWN', '300'))
+
+READ = 'read'
+AUTH = 'auth'
+MUTATION = 'mutation'
+
+# Endpoints whose class does not follow from the HTTP method
+ENDPOINT_CLASSES = {
+    '/account/signverify': AUTH,
+}
+
+
+class RequestFailure(Exception):
+    """A request that got no usable answer
+
+    status is the HTTP status (None when no response arrived) and
+    not_applied is True only when the failure proves the server did not
+    act on the request.
+    """
+
+    def __init__(self, message: str, status: Optional[int] = None, retry_after: Optional[float] = None,
+                 not_applied: bool = False):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+        self.not_applied = not_applied or status == 429
+
+    @property
+    def server_fault(self) -> bool:
+        """No response, or a 5xx: counts towards opening the circuit breaker"""
+        return self.status is None or self.status >= 500
+
+    @property
+    def transient(self) -> bool:
+        return self.server_fault or self.status == 429
+
+    @classmethod
+    def from_exception(cls, exc: Exception, message: Optional[str] = None) -> 'RequestFailure':
+        if isinstance(exc, RequestFailure) and message is None:
+            # Keeps subclasses such as MalformedResponse
+            return exc
+        message = message or str(exc)
+        if isinstance(exc, RequestFailure):
+            return cls(message, exc.status, exc.retry_after, exc.not_applied)
+        return cls(message, not_applied=is_connect_error(exc))
+
+    @classmethod
+    def from_response(cls, response, message: str) -> 'RequestFailure':
+        return cls(message, response.status_code, parse_retry_after(response.headers.get('retry-after')))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def endpoint_class(method: str, endpoint: str) -> str:
+    return ENDPOINT_CLASSES.get(endpoint) or (READ if method.upper() == 'GET' else MUTATION)
+
+
+class RetryPolicy:
+    """How often and how patiently one endpoint class is retried"""
+
+    def __init__(self, attempts: int, base_delay: float = RETRY_BASE_DELAY, max_delay: float = RETRY_MAX_DELAY,
+                 mutating: bool = False):
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.mutating = mutating
+
+    def should_retry(self, failure: RequestFailure, attempt: int) -> bool:
+        """attempt is the 1-based number of the attempt that just failed"""
+        if attempt >= self.attempts:
+            return False
+        if self.mutating:
+            return failure.not_applied
+        return failure.transient
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Full-jitter exponential backoff; a server-provided Retry-After wins when longer"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+
+POLICIES: Dict[str, RetryPolicy] = {
+    READ: RetryPolicy(RETRY_ATTEMPTS),
+    AUTH: RetryPolicy(RETRY_ATTEMPTS),
+    MUTATION: RetryPolicy(MUTATION_ATTEMPTS, mutating=True),
+}
+
+
+def policy_for(method: str, endpoint: str) -> RetryPolicy:
+    return POLICIES[endpoint_class(method, endpoint)]
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker shared by every wallet of a bot (thread-safe)"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, threshold: int = BREAKER_THRESHOLD, cooldown: float = BREAKER_COOLDOWN,
+                 max_cooldown: float = BREAKER_MAX_COOLDOWN):
+        self.threshold = max(1, threshold)
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened = 0
+        self._cooldown = cooldown
+        self._open_until = 0.0
+        self._lock = threading.Lock()
+
+    def delay(self) -> float:
+        """Seconds the caller must wait before sending; 0 means go ahead
+
+        When the cooldown has run out the first caller becomes the probe and
+        everyone else keeps waiting for its outcome.
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return 0.0
+            now = time.monotonic()
+            if self.state == self.OPEN:
+                if now < self._open_until:
+                    return self._open_until - now
+                self.state = self.HALF_OPEN
+                return 0.0
+            # Half-open: a probe is in flight
+            return min(1.0, self._cooldown)
+
+    async def wait(self):
+        while True:
+            delay = self.delay()
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+
+    def wait_sync(self):
+        while True:
+            delay = self.delay()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+    def record(self, ok: bool):
+        """Outcome of one request: ok means the server answered with a non-5xx status"""
+        with self._lock:
+            if ok:
+                if self.state != self.CLOSED:
+                    Logger.success(None, 'API reachable again, resuming all wallets')
+                self.state = self.CLOSED
+                self.failures = 0
+                self._cooldown = self.base_cooldown
+                return
+
+            self.failures += 1
+            if self.state == self.HALF_OPEN:
+                # Probe failed: back off harder
+                self._cooldown = min(self.max_cooldown, self._cooldown * 2)
+            elif self.state == self.OPEN or self.failures < self.threshold:
+                return
+            self.state = self.OPEN
+            self.opened += 1
+            self._open_until = time.monotonic() + self._cooldown
+            Logger.warning(None, f'API unavailable after {self.failures} consecutive failures, '
+                                 f'pausing all wallets for {self._cooldown:.1f}s',
+                           event='circuit_open', cooldown=self._cooldown)
+
+    def stats(self) -> Dict:
+        return {'state': self.state, 'consecutive_failures': self.failures, 'times_opened': self.opened}
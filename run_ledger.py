@@ -0,0 +1,315 @@
+"""Crash-safe run ledger shared by bot.py and bot_no2captcha.py.
+
+Append-only SQLite database (WAL mode) recording each wallet's phase
+(login, supplies fetched, tx i of N, done) and a request/response summary
+of every transaction. Writes go through a queue to a background thread
+that commits in batches, so the swap path never waits on the disk.
+
+After a crash, `--resume` continues the last unfinished run: wallets that
+reached `done` are skipped and the others pick up after their last
+recorded transaction.
+
+    python run_ledger.py summary            # last run
+    python run_ledger.py summary --run 12
+    python run_ledger.py runs
+"""
+import json
+import queue
+import threading
+import time
+import argparse
+from typing import Dict, List, Optional
+
+DEFAULT_LEDGER = 'run_ledger.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    bot TEXT NOT NULL,
+    params TEXT NOT NULL,
+    started_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id INTEGER NOT NULL,
+    wallet TEXT,
+    phase TEXT NOT NULL,
+    tx_index INTEGER,
+    tx_total INTEGER,
+    note TEXT,
+    ts REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id INTEGER NOT NULL,
+    wallet TEXT NOT NULL,
+    tx_index INTEGER NOT NULL,
+    endpoint TEXT NOT NULL,
+    request TEXT,
+    ok INTEGER NOT NULL,
+    response TEXT,
+    ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_events_run_wallet ON events (run_id, wallet);
+CREATE INDEX IF NOT EXISTS idx_transactions_run_wallet ON transactions (run_id, wallet);
+"""
+
+# Run-level events carry no wallet
+RUN_FINISHED = 'run_finished'
+PHASE_DONE = 'done'
+PHASE_TX = 'tx'
+
+
+def _connect(path: str) -> 'sqlite3.Connection':
+    import sqlite3
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+def _summarize(value, limit: int = 300) -> Optional[str]:
+    if value is None:
+        return None
+    text = value if isinstance(value, str) else json.dumps(value, default=str)
+    return text if len(text) <= limit else text[:limit] + '...'
+
+
+class WalletProgress:
+    """What an earlier attempt of a run finished for one wallet"""
+
+    __slots__ = ('wallet', 'done', 'tx_done', 'last_phase')
+
+    def __init__(self, wallet: str, done: bool = False, tx_done: int = 0, last_phase: Optional[str] = None):
+        self.wallet = wallet
+        self.done = done
+        self.tx_done = tx_done
+        self.last_phase = last_phase
+
+
+class RunLedger:
+    """SQLite run ledger with a batching background writer"""
+
+    BATCH_SIZE = 200
+    FLUSH_INTERVAL = 0.5
+
+    def __init__(self, path: str = DEFAULT_LEDGER):
+        self.path = path
+        self.run_id: Optional[int] = None
+        self.params: Dict = {}
+        self.resumed = False
+        self._progress: Dict[str, WalletProgress] = {}
+
+        with _connect(path) as conn:
+            conn.executescript(SCHEMA)
+
+        self._queue: 'queue.Queue' = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name='run-ledger', daemon=True)
+        self._writer.start()
+
+    # ------------------------------
+    # Run lifecycle
+    # ------------------------------
+    def start_run(self, bot: str, params: Dict, resume: bool = False) -> int:
+        """Open a new run, or reopen the last unfinished run of `bot` when resume is set"""
+        self.flush()
+        with _connect(self.path) as conn:
+            row = None
+            if resume:
+                row = conn.execute(
+                    'SELECT run_id, params FROM runs WHERE bot = ? AND run_id NOT IN '
+                    '(SELECT run_id FROM events WHERE phase = ?) ORDER BY run_id DESC LIMIT 1',
+                    (bot, RUN_FINISHED),
+                ).fetchone()
+            if row:
+                self.run_id, self.params, self.resumed = row[0], json.loads(row[1]), True
+                self._progress = self._load_progress(conn, self.run_id)
+            else:
+                cursor = conn.execute(
+                    'INSERT INTO runs (bot, params, started_at) VALUES (?, ?, ?)',
+                    (bot, json.dumps(params), time.time()),
+                )
+                self.run_id, self.params, self.resumed = cursor.lastrowid, params, False
+                self._progress = {}
+        return self.run_id
+
+    def attach_run(self, run_id: int) -> int:
+        """Write into a run opened by another process (a shard worker joining its supervisor's run)"""
+        with _connect(self.path) as conn:
+            row = conn.execute('SELECT params FROM runs WHERE run_id = ?', (run_id,)).fetchone()
+            if row is None:
+                raise ValueError(f'No run {run_id} in {self.path}')
+            self.run_id, self.params, self.resumed = run_id, json.loads(row[0]), True
+            self._progress = self._load_progress(conn, run_id)
+        return self.run_id
+
+    def finish_run(self):
+        if self.run_id is not None:
+            self._put('events', (self.run_id, None, RUN_FINISHED, None, None, None, time.time()))
+            self.flush()
+
+    @staticmethod
+    def _load_progress(conn: 'sqlite3.Connection', run_id: int) -> Dict[str, WalletProgress]:
+        progress: Dict[str, WalletProgress] = {}
+        rows = conn.execute(
+            'SELECT wallet, phase, tx_index FROM events WHERE run_id = ? AND wallet IS NOT NULL ORDER BY id',
+            (run_id,),
+        )
+        for wallet, phase, tx_index in rows:
+            entry = progress.setdefault(wallet, WalletProgress(wallet))
+            entry.last_phase = phase
+            if phase == PHASE_DONE:
+                entry.done = True
+            elif phase == PHASE_TX and tx_index:
+                entry.tx_done = max(entry.tx_done, tx_index)
+        return progress
+
+    def progress(self, wallet: str) -> WalletProgress:
+        """Progress recorded for wallet before this process started (empty for a new run)"""
+        return self._progress.get(wallet) or WalletProgress(wallet)
+
+    # ------------------------------
+    # Recording (non-blocking)
+    # ------------------------------
+    def phase(self, wallet: str, phase: str, note: Optional[str] = None):
+        self._put('events', (self.run_id, wallet, phase, None, None, note, time.time()))
+
+    def tx(self, wallet: str, tx_index: int, tx_total: int, endpoint: str,
+           request=None, ok: bool = True, response=None):
+        """Record transaction tx_index (1-based) of tx_total as attempted"""
+        now = time.time()
+        self._put('transactions', (self.run_id, wallet, tx_index, endpoint, _summarize(request),
+                                   int(ok), _summarize(response), now))
+        self._put('events', (self.run_id, wallet, PHASE_TX, tx_index, tx_total, None, now))
+
+    def _put(self, table: str, row: tuple):
+        self._queue.put((table, row))
+
+    def _write_loop(self):
+        conn = _connect(self.path)
+        inserts = {
+            'events': 'INSERT INTO events (run_id, wallet, phase, tx_index, tx_total, note, ts) '
+                      'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            'transactions': 'INSERT INTO transactions (run_id, wallet, tx_index, endpoint, request, ok, response, ts) '
+                            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+        }
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            deadline = time.monotonic() + self.FLUSH_INTERVAL
+            # A flush request or shutdown commits right away instead of waiting out the interval
+            while len(batch) < self.BATCH_SIZE and item is not None and item[0] != 'flush':
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                batch.append(item)
+
+            rows = [entry for entry in batch if entry is not None and entry[0] != 'flush']
+            if rows:
+                with conn:
+                    for table, row in rows:
+                        conn.execute(inserts[table], row)
+            for entry in batch:
+                if entry is not None and entry[0] == 'flush':
+                    entry[1].set()
+                self._queue.task_done()
+            if batch[-1] is None:
+                conn.close()
+                return
+
+    def flush(self):
+        """Block until everything queued so far is committed"""
+        done = threading.Event()
+        self._queue.put(('flush', done))
+        done.wait()
+
+    def close(self):
+        self.flush()
+        self._queue.put(None)
+        self._writer.join()
+
+    # ------------------------------
+    # Reporting
+    # ------------------------------
+    def summary(self, run_id: Optional[int] = None) -> List[Dict]:
+        """Per-wallet outcome of a run (default: the current or last run)"""
+        self.flush()
+        return run_summary(self.path, run_id or self.run_id)
+
+
+def run_summary(path: str, run_id: Optional[int] = None) -> List[Dict]:
+    with _connect(path) as conn:
+        if run_id is None:
+            row = conn.execute('SELECT MAX(run_id) FROM runs').fetchone()
+            run_id = row[0] if row else None
+        if run_id is None:
+            return []
+        rows = conn.execute(
+            """
+            SELECT e.wallet,
+                   (SELECT phase FROM events WHERE run_id = e.run_id AND wallet = e.wallet ORDER BY id DESC LIMIT 1),
+                   MAX(e.tx_total),
+                   (SELECT COUNT(*) FROM transactions t WHERE t.run_id = e.run_id AND t.wallet = e.wallet AND t.ok = 1),
+                   (SELECT COUNT(*) FROM transactions t WHERE t.run_id = e.run_id AND t.wallet = e.wallet AND t.ok = 0),
+                   MIN(e.ts), MAX(e.ts)
+            FROM events e
+            WHERE e.run_id = ? AND e.wallet IS NOT NULL
+            GROUP BY e.wallet
+            ORDER BY MIN(e.id)
+            """,
+            (run_id,),
+        ).fetchall()
+    return [
+        {'run_id': run_id, 'wallet': wallet, 'last_phase': last_phase, 'tx_total': tx_total,
+         'tx_ok': tx_ok, 'tx_failed': tx_failed, 'elapsed': (last_ts or 0) - (first_ts or 0)}
+        for wallet, last_phase, tx_total, tx_ok, tx_failed, first_ts, last_ts in rows
+    ]
+
+
+def list_runs(path: str, limit: int = 20) -> List[Dict]:
+    with _connect(path) as conn:
+        rows = conn.execute(
+            'SELECT r.run_id, r.bot, r.params, r.started_at, '
+            '(SELECT MAX(ts) FROM events WHERE run_id = r.run_id AND phase = ?) '
+            'FROM runs r ORDER BY r.run_id DESC LIMIT ?',
+            (RUN_FINISHED, limit),
+        ).fetchall()
+    return [
+        {'run_id': run_id, 'bot': bot, 'params': json.loads(params), 'started_at': started_at,
+         'finished_at': finished_at}
+        for run_id, bot, params, started_at, finished_at in rows
+    ]
+
+
+def format_summary(rows: List[Dict]) -> str:
+    if not rows:
+        return 'No wallets recorded for this run'
+    lines = [f"Run {rows[0]['run_id']}",
+             f"{'wallet':<44}{'phase':<12}{'ok':>5}{'fail':>6}{'of':>5}{'secs':>9}"]
+    for row in rows:
+        lines.append(f"{row['wallet']:<44}{row['last_phase'] or '-':<12}{row['tx_ok']:>5}"
+                     f"{row['tx_failed']:>6}{row['tx_total'] or '-':>5}{row['elapsed']:>9.1f}")
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect the BlockStreet run ledger')
+    parser.add_argument('--ledger', default=DEFAULT_LEDGER)
+    sub = parser.add_subparsers(dest='command', required=True)
+    summary_cmd = sub.add_parser('summary', help='per-wallet outcome of a run')
+    summary_cmd.add_argument('--run', type=int, help='run id (default: last run)')
+    sub.add_parser('runs', help='list recent runs')
+    args = parser.parse_args()
+
+    if args.command == 'summary':
+        print(format_summary(run_summary(args.ledger, args.run)))
+    else:
+        for run in list_runs(args.ledger):
+            state = 'finished' if run['finished_at'] else 'unfinished'
+            started = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(run['started_at']))
+            print(f"{run['run_id']:>5}  {run['bot']:<10} {started}  {state:<10} {json.dumps(run['params'])}")
+
+
+if __name__ == '__main__':
+    main()
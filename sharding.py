@@ -0,0 +1,150 @@
+"""Multi-process wallet sharding for bot_no2captcha.py (`--workers N`).
+
+The wallet list is striped over N shards, each run by a spawned worker
+process with its own event loop, so signing and JSON work use N cores.
+The supervisor is the only process that talks to the terminal: workers
+forward their log records, per-wallet results and request metrics over
+one queue. Transaction limits need no forwarding: every worker opens the
+same rate-limit store (rate_limit.py).
+
+A worker that dies before reporting all of its wallets is restarted
+with only the unreported ones (up to SHARD_RESTARTS times); the other
+shards keep running. With a run ledger the restarted worker resumes
+each wallet after its last recorded transaction.
+
+Worker target signature: target(shard_id, items, config, events), where
+events accepts:
+
+    ('logs', records)            Logger records to replay
+    ('result', shard_id, result) one finished wallet (dict with 'address')
+    ('metrics', snapshot)        RequestMetrics snapshot at exit
+    ('done', shard_id)           the shard finished cleanly
+"""
+import os
+import queue
+from typing import Callable, Dict, List
+
+from logger import Logger
+from metrics import metrics
+
+SHARD_RESTARTS = int(os.getenv('SHARD_RESTARTS', '2'))
+WORKERS = int(os.getenv('WORKERS', '1'))
+
+
+def split_shards(items: List, count: int) -> List[List]:
+    """Stripe items over count shards so each gets a similar share"""
+    count = max(1, min(count, len(items)))
+    return [items[i::count] for i in range(count)]
+
+
+class ShardSupervisor:
+    """Starts, watches and restarts shard workers and merges what they report"""
+
+    POLL_INTERVAL = 0.2
+
+    def __init__(self, target: Callable, workers: int, max_restarts: int = SHARD_RESTARTS):
+        self.target = target
+        self.workers = max(1, workers)
+        self.max_restarts = max_restarts
+        self.restarts: Dict[int, int] = {}
+        self.results: Dict[str, Dict] = {}
+        self.total = 0
+
+    def run(self, items: List[Dict], config: Dict) -> List[Dict]:
+        """Run every item (dict with 'address') to completion; results in item order"""
+        import multiprocessing  # only --workers runs get here
+        ctx = multiprocessing.get_context('spawn')
+        events = ctx.Queue()
+        shards = dict(enumerate(split_shards(items, self.workers)))
+        procs: Dict[int, multiprocessing.Process] = {}
+        finished = set()
+        self.total = len(items)
+
+        def start(shard_id: int, shard_items: List[Dict]):
+            proc = ctx.Process(target=self.target, args=(shard_id, shard_items, config, events),
+                               name=f'shard-{shard_id}', daemon=True)
+            proc.start()
+            procs[shard_id] = proc
+
+        Logger.info(None, f'Starting {len(shards)} worker process(es) for {len(items)} wallet(s)')
+        for shard_id, shard_items in shards.items():
+            start(shard_id, shard_items)
+
+        try:
+            while procs:
+                self._drain(events, finished, timeout=self.POLL_INTERVAL)
+                for shard_id, proc in list(procs.items()):
+                    if proc.is_alive():
+                        continue
+                    proc.join()
+                    # Whatever the worker queued before exiting is still in the pipe
+                    self._drain(events, finished, timeout=0.05)
+                    del procs[shard_id]
+                    if shard_id in finished and proc.exitcode == 0:
+                        continue
+                    remaining = [item for item in shards[shard_id] if item['address'] not in self.results]
+                    if not remaining:
+                        continue
+                    restarts = self.restarts.get(shard_id, 0)
+                    if restarts < self.max_restarts:
+                        self.restarts[shard_id] = restarts + 1
+                        Logger.warning(None, f'Worker {shard_id} exited with code {proc.exitcode}, restarting it '
+                                             f'for {len(remaining)} wallet(s) ({restarts + 1}/{self.max_restarts})')
+                        shards[shard_id] = remaining
+                        start(shard_id, remaining)
+                    else:
+                        Logger.error(None, f'Worker {shard_id} exited with code {proc.exitcode}, '
+                                           f'giving up on {len(remaining)} wallet(s)')
+                        for item in remaining:
+                            self.results[item['address']] = {
+                                'wallet': item.get('name'), 'address': item['address'], 'ok': 0, 'failed': 0,
+                                'status': 'crashed', 'shard': shard_id,
+                            }
+        finally:
+            for proc in procs.values():
+                proc.terminate()
+            Logger.flush()
+
+        return [self.results[item['address']] for item in items if item['address'] in self.results]
+
+    def _drain(self, events, finished: set, timeout: float):
+        try:
+            message = events.get(timeout=timeout)
+        except queue.Empty:
+            return
+        while True:
+            self._handle(message, finished)
+            try:
+                message = events.get_nowait()
+            except queue.Empty:
+                return
+
+    def _handle(self, message: tuple, finished: set):
+        kind = message[0]
+        if kind == 'logs':
+            Logger.replay(message[1])
+        elif kind == 'result':
+            _, shard_id, result = message
+            result['shard'] = shard_id
+            self.results[result['address']] = result
+            Logger.info(None, f"Progress: {len(self.results)}/{self.total} wallet(s) finished "
+                              f"({result['wallet']}: {result['status']}, worker {shard_id})")
+        elif kind == 'metrics':
+            metrics.merge(message[1])
+        elif kind == 'done':
+            finished.add(message[1])
+
+
+def format_report(results: List[Dict]) -> str:
+    """Per-wallet outcome of a run, one line per wallet"""
+    if not results:
+        return 'No wallet results'
+    lines = [f"{'wallet':<16}{'address':<44}{'worker':>7}{'ok':>5}{'fail':>6}  status"]
+    for result in results:
+        shard = result.get('shard')
+        lines.append(f"{str(result['wallet']):<16}{result['address']:<44}{'-' if shard is None else shard:>7}"
+                     f"{result['ok']:>5}{result['failed']:>6}  {result['status']}")
+    ok = sum(result['ok'] for result in results)
+    failed = sum(result['failed'] for result in results)
+    lines.append(f'{len(results)} wallet(s), {ok} transaction(s) ok, {failed} failed')
+    return '\n'.join(lines)
@@ -0,0 +1,143 @@
+"""Sign-in message parsing and signature cache for bot_no2captcha.py's login.
+
+The sign-in text is a fixed template, so it is parsed once (nonce,
+issued-at and expiration time, with precompiled patterns) and every
+wallet signs the same message. Signatures are deterministic (RFC 6979),
+so each wallet's signature is cached per message: a wallet logging in
+again reuses it, and changing the template, including only its
+expiration time, is a different message and invalidates the cached
+signatures.
+
+presign() signs a batch of wallets up front so logins only send a
+request. With workers > 1 it signs in a process pool (secp256k1 signing
+is CPU-bound and holds the GIL); each pool process imports eth_account
+once, so the pool only pays off with many wallets.
+
+Signatures live in memory only and private keys never leave the process
+except to the pool workers that sign with them.
+"""
+import os
+import re
+import functools
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from profiling import profiler
+
+# Processes signing sign-in messages up front; 0 signs at each wallet's first login instead
+SIGN_WORKERS = int(os.getenv('SIGN_WORKERS', '1'))
+
+_NONCE = re.compile(r'Nonce:\s*([^\n\r]+)')
+_ISSUED_AT = re.compile(r'Issued At:\s*([^\n\r]+)')
+_EXPIRATION_TIME = re.compile(r'Expiration Time:\s*([^\n\r]+)')
+
+# Used when the template has no nonce
+DEFAULT_NONCE = 'Z9YFj5VY80yTwN3n'
+
+
+def _field(pattern: re.Pattern, text: str) -> Optional[str]:
+    match = pattern.search(text)
+    return match.group(1).strip() if match else None
+
+
+class SignInMessage:
+    """A parsed sign-in template"""
+
+    __slots__ = ('text', 'nonce', 'issued_at', 'expiration_time')
+
+    def __init__(self, text: str):
+        self.text = text
+        self.nonce = _field(_NONCE, text) or DEFAULT_NONCE
+        # Missing timestamps are filled in per login, like the server expects
+        self.issued_at = _field(_ISSUED_AT, text)
+        self.expiration_time = _field(_EXPIRATION_TIME, text)
+
+    def fields(self) -> Dict[str, str]:
+        """nonce, issuedAt and expirationTime for the signverify request"""
+        now = datetime.now().isoformat()
+        return {
+            'nonce': self.nonce,
+            'issuedAt': self.issued_at or now,
+            'expirationTime': self.expiration_time or now,
+        }
+
+
+@functools.lru_cache(maxsize=8)
+def parse_message(text: str) -> SignInMessage:
+    return SignInMessage(text)
+
+
+@functools.lru_cache(maxsize=8)
+def _signable(text: str):
+    # eth_account is slow to import; only processes that actually sign pay for it
+    from eth_account.messages import encode_defunct
+    return encode_defunct(text=text)
+
+
+def sign_text(account, text: str) -> str:
+    with profiler.phase('sign'):
+        return account.sign_message(_signable(text)).signature.hex()
+
+
+def _sign_key(private_key: str, text: str) -> str:
+    """Pool worker body: the key crosses the process boundary, the Account is built there"""
+    from eth_account import Account
+    return Account.sign_message(_signable(text), private_key).signature.hex()
+
+
+class SignatureCache:
+    """Login signatures per (wallet, message), in memory"""
+
+    def __init__(self):
+        # address -> (message text, signature); a new text replaces the wallet's entry
+        self._signatures: Dict[str, Tuple[str, str]] = {}
+        self.hits = 0
+        self.signed = 0
+
+    def get(self, address: str, message: SignInMessage) -> Optional[str]:
+        entry = self._signatures.get(address.lower())
+        if entry and entry[0] == message.text:
+            return entry[1]
+        return None
+
+    def put(self, address: str, message: SignInMessage, signature: str):
+        self._signatures[address.lower()] = (message.text, signature)
+
+    def sign(self, wallet, message: SignInMessage) -> str:
+        """Cached signature of message by wallet, signing on a miss"""
+        signature = self.get(wallet.address, message)
+        if signature is not None:
+            self.hits += 1
+            return signature
+        signature = sign_text(wallet.account, message.text)
+        self.signed += 1
+        self.put(wallet.address, message, signature)
+        return signature
+
+    def presign(self, wallets: Sequence, message: SignInMessage, workers: int = SIGN_WORKERS) -> int:
+        """Sign message for every wallet that has no cached signature yet; returns how many were signed"""
+        missing = [wallet for wallet in wallets if self.get(wallet.address, message) is None]
+        if not missing or workers < 1:
+            return 0
+        if workers == 1 or len(missing) == 1:
+            for wallet in missing:
+                self.sign(wallet, message)
+            return len(missing)
+
+        workers = min(workers, len(missing))
+        chunksize = max(1, len(missing) // (workers * 4))
+        # Process pools only for several workers; a plain start never loads multiprocessing
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        with profiler.phase('sign'):
+            with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+                signatures: List[str] = list(pool.map(
+                    _sign_key, [wallet.key for wallet in missing], [message.text] * len(missing), chunksize=chunksize
+                ))
+        for wallet, signature in zip(missing, signatures):
+            self.put(wallet.address, message, signature)
+        self.signed += len(missing)
+        return len(missing)
+
+    def stats(self) -> Dict[str, int]:
+        return {'cached': len(self._signatures), 'signed': self.signed, 'hits': self.hits}
@@ -0,0 +1,270 @@
+"""Traffic capture, replay and diff for performance regression testing.
+
+Capture: both bots take `--capture FILE`. Every HTTP request they make is
+recorded with its start offset in the run, method, path, status,
+outcome, latency, wallet and request body with its encoding ('json', or
+'form' for signverify's form post). The file never holds
+secrets: headers (cookies, bot.py's Authorization key) are not
+recorded, and signature / address / invite_code fields of bodies are
+redacted. `--seed N` seeds every random choice the bots make
+(amounts, assets, delays, retry jitter), so a run with the same seed,
+wallets and `--concurrency 1` issues the same workload again.
+
+Replay sends a capture's requests again at their recorded offsets,
+`--speed` times faster, against a local mock_server.py (started
+in-process unless `--base-url` is given), and writes what it measured
+as a new capture. Diff compares two captures per endpoint.
+
+    python bot_no2captcha.py --seed 7 --concurrency 1 --capture base.json
+    python traffic.py replay base.json --speed 10 --out replay-a.json
+    python traffic.py diff replay-a.json replay-b.json
+    python traffic.py summary base.json
+"""
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import threading
+from urllib.parse import urlsplit
+from typing import Any, Dict, List, Optional
+
+from metrics import percentile
+
+CAPTURE_VERSION = 1
+REDACTED = '<redacted>'
+# Body fields that identify a wallet or prove ownership of it
+SECRET_FIELDS = {'signature', 'address', 'invite_code', 'authorization', 'cookie', 'private_key', 'key'}
+
+
+def seed_random(seed: Optional[int]):
+    """Seed the random module every selection, delay and jitter helper draws from"""
+    if seed is not None:
+        random.seed(seed)
+
+
+def redact(body: Any) -> Any:
+    if isinstance(body, dict):
+        return {k: REDACTED if k.lower() in SECRET_FIELDS else redact(v) for k, v in body.items()}
+    if isinstance(body, list):
+        return [redact(v) for v in body]
+    return body
+
+
+class TrafficRecorder:
+    """Collects request records for one run and writes them as a capture file"""
+
+    def __init__(self):
+        self.path: Optional[str] = None
+        self.meta: Dict[str, Any] = {}
+        self.entries: List[Dict] = []
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    def configure(self, path: Optional[str], **meta):
+        """Start capturing into path (None: off, '': in memory only); meta (bot, seed, ...) is stored in the file"""
+        self.path = path
+        self.meta = {'started_at': time.time(), **meta}
+        self.entries = []
+        self._started = time.perf_counter()
+
+    def record(self, method: str, url: str, started: float, latency: float, status: Optional[int], outcome: str,
+               wallet: Optional[str] = None, body: Any = None, encoding: str = 'json'):
+        """One request; started is its time.perf_counter() at send, encoding how body was sent ('json' or 'form')"""
+        if self.path is None:
+            return
+        parts = urlsplit(url)
+        entry = {
+            'offset': round(started - self._started, 6),
+            'method': method,
+            'path': parts.path + (f'?{parts.query}' if parts.query else ''),
+            'status': status,
+            'outcome': outcome,
+            'latency': round(latency, 6),
+            'wallet': wallet,
+            'body': redact(body),
+        }
+        if body is not None:
+            entry['encoding'] = encoding
+        with self._lock:
+            self.entries.append(entry)
+
+    def capture(self) -> Dict:
+        with self._lock:
+            entries = sorted(self.entries, key=lambda entry: entry['offset'])
+        return {
+            'version': CAPTURE_VERSION,
+            'meta': self.meta,
+            'duration': round(time.perf_counter() - self._started, 6),
+            'requests': entries,
+        }
+
+    def save(self):
+        if not self.path:
+            return
+        with open(self.path, 'w') as f:
+            json.dump(self.capture(), f, indent=1)
+
+
+recorder = TrafficRecorder()
+
+
+def load_capture(path: str) -> Dict:
+    with open(path) as f:
+        capture = json.load(f)
+    if capture.get('version') != CAPTURE_VERSION:
+        raise ValueError(f'{path}: unsupported capture version {capture.get("version")}')
+    return capture
+
+
+# ------------------------------
+# Replay
+# ------------------------------
+async def replay(capture: Dict, base_url: str, speed: float = 1.0, transport_name: str = 'http1') -> Dict:
+    """Send the capture's requests to base_url at offset / speed; returns the measured traffic as a capture"""
+    from transport import create_transport
+
+    # Plain-http mock: HTTP/2 has to be h2c with prior knowledge
+    options = {'prior_knowledge': True} if transport_name == 'http2' else {}
+    transport = create_transport(transport_name, **options)
+    measured = TrafficRecorder()
+    measured.configure('', replay_of=capture.get('meta', {}), speed=speed, transport=transport.name)
+    replay_started = time.perf_counter()
+    base_url = base_url.rstrip('/')
+
+    async def send(entry: Dict):
+        delay = entry['offset'] / speed - (time.perf_counter() - replay_started)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        # Captures without an encoding predate form bodies: everything was JSON
+        encoding = entry.get('encoding', 'json')
+        kwargs = {}
+        if entry.get('body') is not None:
+            kwargs['data' if encoding == 'form' else 'json'] = entry['body']
+        url = base_url + entry['path']
+        started = time.perf_counter()
+        status, outcome = None, 'error'
+        try:
+            response = await transport.request(entry['method'], url, headers={'accept': 'application/json'},
+                                               timeout=30, **kwargs)
+            status = response.status_code
+            outcome = 'ok' if 200 <= status < 300 else f'http_{status}'
+        except Exception:
+            pass
+        finally:
+            measured.record(entry['method'], url, started, time.perf_counter() - started, status, outcome,
+                            entry.get('wallet'), entry.get('body'), encoding)
+
+    try:
+        await asyncio.gather(*(send(entry) for entry in capture['requests']))
+    finally:
+        await transport.aclose()
+    return measured.capture()
+
+
+# ------------------------------
+# Summary and diff
+# ------------------------------
+def summarize(capture: Dict) -> Dict[str, Dict]:
+    """Per 'METHOD path' (and 'total'): count, errors, p50/p99 latency in ms, requests/sec"""
+    groups: Dict[str, List[Dict]] = {}
+    for entry in capture['requests']:
+        groups.setdefault(f"{entry['method']} {entry['path']}", []).append(entry)
+    groups['total'] = capture['requests']
+    duration = capture.get('duration') or 0
+    summary = {}
+    for name, entries in groups.items():
+        latencies = [entry['latency'] for entry in entries]
+        summary[name] = {
+            'count': len(entries),
+            'errors': sum(entry['outcome'] != 'ok' for entry in entries),
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'req_per_sec': len(entries) / duration if duration else 0.0,
+        }
+    return summary
+
+
+def format_summary(capture: Dict) -> str:
+    lines = [f"{'endpoint':<32}{'count':>7}{'errors':>8}{'p50 ms':>9}{'p99 ms':>9}{'req/s':>9}"]
+    for name, row in summarize(capture).items():
+        lines.append(f"{name:<32}{row['count']:>7}{row['errors']:>8}{row['p50_ms']:>9.1f}{row['p99_ms']:>9.1f}"
+                     f"{row['req_per_sec']:>9.1f}")
+    lines.append(f"duration {capture.get('duration', 0):.2f}s")
+    return '\n'.join(lines)
+
+
+def _change(base: float, new: float) -> str:
+    return f'{100 * (new - base) / base:+.0f}%' if base else '-'
+
+
+def format_diff(base: Dict, new: Dict) -> str:
+    """Per-endpoint latency and throughput of new against base"""
+    base_rows, new_rows = summarize(base), summarize(new)
+    lines = [f"{'endpoint':<32}{'count':>11}{'p50 ms':>17}{'':>6}{'p99 ms':>17}{'':>6}{'req/s':>15}{'':>6}"]
+    names = [name for name in base_rows if name != 'total'] + \
+            [name for name in new_rows if name not in base_rows] + ['total']
+    empty = {'count': 0, 'p50_ms': 0.0, 'p99_ms': 0.0, 'req_per_sec': 0.0}
+    for name in names:
+        b, n = base_rows.get(name, empty), new_rows.get(name, empty)
+        lines.append(
+            f"{name:<32}{b['count']:>5} {n['count']:>5}"
+            f"{b['p50_ms']:>8.1f} {n['p50_ms']:>8.1f}{_change(b['p50_ms'], n['p50_ms']):>6}"
+            f"{b['p99_ms']:>8.1f} {n['p99_ms']:>8.1f}{_change(b['p99_ms'], n['p99_ms']):>6}"
+            f"{b['req_per_sec']:>7.1f} {n['req_per_sec']:>7.1f}{_change(b['req_per_sec'], n['req_per_sec']):>6}"
+        )
+    lines.append(f"duration {base.get('duration', 0):.2f}s -> {new.get('duration', 0):.2f}s "
+                 f"({_change(base.get('duration', 0), new.get('duration', 0))})")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay and compare captured BlockStreet traffic')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_replay = sub.add_parser('replay', help='send a capture again and record what it measured')
+    p_replay.add_argument('capture')
+    p_replay.add_argument('--speed', type=float, default=1.0, help='replay this many times faster than captured')
+    p_replay.add_argument('--base-url', help='server to replay against (default: an in-process mock_server)')
+    p_replay.add_argument('--transport', choices=['http1', 'http2'], default='http1')
+    p_replay.add_argument('--latency-ms', type=float, default=20, help='in-process mock latency')
+    p_replay.add_argument('--jitter-ms', type=float, default=5, help='in-process mock latency jitter')
+    p_replay.add_argument('--seed', type=int, default=0, help='seed for the in-process mock\'s jitter')
+    p_replay.add_argument('--out', help='write the measured traffic to this capture file')
+    p_diff = sub.add_parser('diff', help='compare two captures per endpoint')
+    p_diff.add_argument('base')
+    p_diff.add_argument('new')
+    p_summary = sub.add_parser('summary', help='per-endpoint numbers of one capture')
+    p_summary.add_argument('capture')
+    args = parser.parse_args(argv)
+
+    if args.command == 'summary':
+        print(format_summary(load_capture(args.capture)))
+    elif args.command == 'diff':
+        print(format_diff(load_capture(args.base), load_capture(args.new)))
+    else:
+        capture = load_capture(args.capture)
+        seed_random(args.seed)
+        server = None
+        base_url = args.base_url
+        if not base_url:
+            from mock_server import MockConfig, MockServer
+            server = MockServer(config=MockConfig(args.latency_ms, args.jitter_ms, set_cookie='never')).start()
+            base_url = server.base_url
+        try:
+            measured = asyncio.run(replay(capture, base_url, args.speed, args.transport))
+        finally:
+            if server:
+                server.stop()
+        print(format_summary(measured))
+        if args.out:
+            with open(args.out, 'w') as f:
+                json.dump(measured, f, indent=1)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
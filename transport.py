@@ -0,0 +1,177 @@
+"""Shared HTTP transports for bot.py and bot_no2captcha.py.
+
+Transports: the async interface behind BlockStreetAPI._send_request.
+`http1` runs requests on a worker thread over the pooled per-route
+sessions of pools.py (imported on the first request, so a start that
+sends nothing never loads requests); `http2` multiplexes every in-flight
+request for a route over one connection with httpx (optional
+dependency: pip install 'httpx[http2]').
+
+Every response carries `connection_reused`: True when the request went out
+on an already-open connection, False when one was opened for it.
+"""
+import os
+import sys
+import asyncio
+import functools
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '32'))
+HTTP_TRANSPORT = os.getenv('HTTP_TRANSPORT', 'http1')
+# Speak HTTP/2 to plain-http URLs without an upgrade (h2c); https negotiates via ALPN
+HTTP2_PRIOR_KNOWLEDGE = os.getenv('HTTP2_PRIOR_KNOWLEDGE', '0') not in ('0', 'false', 'no')
+
+DIRECT_ROUTE = 'direct'
+
+
+class Transport:
+    """Async request interface; responses expose status_code, headers, text and json()"""
+
+    name = 'base'
+
+    async def request(self, method: str, url: str, proxy: Optional[str] = None, **kwargs):
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {}
+
+    async def aclose(self):
+        pass
+
+
+class HTTP1Transport(Transport):
+    """requests over the shared per-route pools, run off the event loop"""
+
+    name = 'http1'
+
+    def __init__(self, transport_registry=None, max_workers: int = HTTP_POOL_SIZE):
+        self._registry = transport_registry
+        # Own executor: the loop's default one has only cpu_count + 4 threads and would cap concurrency
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='http1')
+
+    @property
+    def registry(self):
+        """pools.TransportRegistry, imported (with requests) on first use"""
+        if self._registry is None:
+            from pools import registry
+            self._registry = registry
+        return self._registry
+
+    async def request(self, method: str, url: str, proxy: Optional[str] = None, **kwargs):
+        session = self.registry.session(proxy)
+        # requests is blocking; run it off the event loop so other wallets keep going
+        call = functools.partial(session.request, method, url, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, call)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return self._registry.stats() if self._registry is not None else {}
+
+
+class HTTP2Transport(Transport):
+    """httpx AsyncClient per route with HTTP/2 enabled; falls back to HTTP/1.1 when the server does"""
+
+    name = 'http2'
+
+    def __init__(self, prior_knowledge: bool = HTTP2_PRIOR_KNOWLEDGE, max_connections: int = HTTP_POOL_SIZE):
+        import httpx  # optional dependency, only needed when HTTP/2 is selected
+        import h2  # noqa: F401  httpx needs it for http2=True
+        import httpcore  # noqa: F401  httpx imports it on the first client; ~0.2s that would land on a request
+
+        self._httpx = httpx
+        # Loading the CA bundle costs ~40ms per client; every route's client shares one context
+        self._ssl_context = httpx.create_ssl_context()
+        self.prior_knowledge = prior_knowledge
+        self.max_connections = max_connections
+        # AsyncClient is bound to the loop it first ran on
+        self._clients: Dict[tuple, 'httpx.AsyncClient'] = {}
+        self._connected: Dict[tuple, asyncio.Event] = {}
+        self._versions: Dict[str, Dict[str, int]] = {}
+        self._streams: Dict[str, weakref.WeakSet] = {}
+
+    async def _client(self, proxy: Optional[str]):
+        """Client for the route, plus an event to set once the caller's request has connected
+
+        Requests racing a cold client would each open their own connection, so
+        only the first goes ahead; the rest wait and then share its connection.
+        """
+        key = (proxy or DIRECT_ROUTE, id(asyncio.get_running_loop()))
+        client = self._clients.get(key)
+        if client is not None:
+            connected = self._connected[key]
+            if not connected.is_set():
+                await connected.wait()
+            return client, None
+
+        httpx = self._httpx
+        client = httpx.AsyncClient(
+            http2=True,
+            http1=not self.prior_knowledge,
+            proxy=proxy,
+            verify=self._ssl_context,
+            limits=httpx.Limits(max_connections=self.max_connections),
+        )
+        self._clients[key] = client
+        self._connected[key] = asyncio.Event()
+        return client, self._connected[key]
+
+    async def request(self, method: str, url: str, proxy: Optional[str] = None, **kwargs):
+        timeout = kwargs.pop('timeout', None)
+        client, connecting = await self._client(proxy)
+        try:
+            response = await client.request(method, url, timeout=timeout, **kwargs)
+        finally:
+            if connecting is not None:
+                connecting.set()
+        route_name = proxy or DIRECT_ROUTE
+        route = self._versions.setdefault(route_name, {})
+        route[response.http_version] = route.get(response.http_version, 0) + 1
+        # Pooled connections keep their network stream object, so a known one means reuse. Held weakly:
+        # an id() could be handed to a new stream once a closed one is freed
+        stream = response.extensions.get('network_stream')
+        seen = self._streams.setdefault(route_name, weakref.WeakSet())
+        response.connection_reused = stream is not None and stream in seen
+        if stream is not None:
+            seen.add(stream)
+        return response
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Requests per negotiated protocol version, per route"""
+        return {route: dict(versions) for route, versions in self._versions.items()}
+
+    async def aclose(self):
+        clients = list(self._clients.values())
+        self._clients.clear()
+        self._connected.clear()
+        self._streams.clear()
+        for client in clients:
+            await client.aclose()
+
+
+TRANSPORTS = {'http1': HTTP1Transport, 'http2': HTTP2Transport}
+
+
+def is_connect_error(exc: BaseException) -> bool:
+    """True when the request failed before a connection existed, so the server never saw it"""
+    # Only a library that is loaded can have raised; look them up instead of importing them
+    requests = sys.modules.get('requests')
+    if requests is not None:
+        from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+        if isinstance(exc, requests.exceptions.ConnectTimeout):
+            return True
+        if isinstance(exc, requests.exceptions.ConnectionError):
+            reason = getattr(exc.args[0], 'reason', None) if exc.args else None
+            return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+    httpx = sys.modules.get('httpx')
+    return httpx is not None and isinstance(exc, (httpx.ConnectError, httpx.ConnectTimeout))
+
+
+def create_transport(name: str = HTTP_TRANSPORT, **options) -> Transport:
+    """Build the named transport, falling back to HTTP/1.1 when HTTP/2 support is not installed"""
+    if name not in TRANSPORTS:
+        raise ValueError(f'Unknown transport {name!r}, expected one of {sorted(TRANSPORTS)}')
+    try:
+        return TRANSPORTS[name](**options)
+    except ImportError:
+        return HTTP1Transport()
@@ -0,0 +1,137 @@
+"""Wallet records and the cached wallet index for bot_no2captcha.py.
+
+Deriving an address from a private key (secp256k1) and importing
+eth_account to do it are the slowest part of start-up. The index file
+remembers each wallet's address by key-file line, together with a hash
+of the key file; as long as the key file is unchanged,
+loading reads the keys and takes the addresses from the index without
+importing eth_account at all. An Account object is only built when a
+wallet actually signs (Wallet.account).
+
+The index holds line numbers and addresses, never private keys.
+"""
+import os
+import json
+import hashlib
+from typing import Dict, List, Optional, Tuple
+
+WALLET_INDEX = os.getenv('WALLET_INDEX', 'wallet_index.json')
+INDEX_VERSION = 1
+
+
+def account_from_key(private_key: str):
+    """eth_account Account for private_key; eth_account is imported on first use"""
+    from eth_account import Account
+    return Account.from_key(private_key)
+
+
+class Wallet:
+    """One configured wallet; the Account is derived on first use"""
+
+    __slots__ = ('name', 'address', 'key', '_account')
+
+    def __init__(self, name: str, address: str, key: str, account=None):
+        self.name = name
+        self.address = address
+        self.key = key
+        self._account = account
+
+    @property
+    def account(self):
+        if self._account is None:
+            self._account = account_from_key(self.key)
+        return self._account
+
+    @classmethod
+    def from_key(cls, private_key: str, name: str) -> 'Wallet':
+        account = account_from_key(private_key)
+        return cls(name, account.address, private_key, account)
+
+    def __repr__(self):
+        # Never the key
+        return f'Wallet({self.name!r}, {self.address})'
+
+
+def parse_key_file(text: str) -> List[Tuple[int, str, str]]:
+    """(line number, private key, name) for every non-comment line of privatekey[:name] rows"""
+    entries = []
+    for idx, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        parts = line.split(':')
+        private_key = parts[0].strip()
+        name = parts[1].strip() if len(parts) > 1 else f'W{idx}'
+        if not private_key.startswith('0x'):
+            private_key = '0x' + private_key
+        entries.append((idx, private_key, name))
+    return entries
+
+
+class WalletIndex:
+    """Address cache for one key file, valid while the file's hash matches; no filename disables it"""
+
+    def __init__(self, filename: Optional[str] = WALLET_INDEX):
+        self.filename = filename
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def file_hash(content: bytes) -> str:
+        return hashlib.sha256(content).hexdigest()
+
+    def lookup(self, content_hash: str) -> Optional[Dict[int, str]]:
+        """line number -> address when the index was built from this exact key file"""
+        if not self.filename:
+            return None
+        try:
+            with open(self.filename) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if index.get('version') != INDEX_VERSION or index.get('file_hash') != content_hash:
+            return None
+        return {int(line): address for line, address in index.get('addresses', {}).items()}
+
+    def store(self, content_hash: str, wallets: List[Tuple[int, Wallet]]):
+        if not self.filename:
+            return
+        index = {
+            'version': INDEX_VERSION,
+            'file_hash': content_hash,
+            'addresses': {str(line): wallet.address for line, wallet in wallets},
+        }
+        tmp_name = f'{self.filename}.tmp'
+        try:
+            with open(tmp_name, 'w') as f:
+                json.dump(index, f)
+            os.replace(tmp_name, self.filename)
+        except OSError:
+            # Only a cache: the next start derives again
+            pass
+
+    def load(self, content: bytes, on_invalid=None) -> List[Wallet]:
+        """Wallets of a key file; on_invalid(line) is called for every line whose key does not parse"""
+        content_hash = self.file_hash(content)
+        cached = self.lookup(content_hash)
+        wallets: List[Tuple[int, Wallet]] = []
+        for line, private_key, name in parse_key_file(content.decode()):
+            if cached is not None:
+                address = cached.get(line)
+                if address:
+                    wallets.append((line, Wallet(name, address, private_key)))
+                elif on_invalid:
+                    on_invalid(line)
+                continue
+            try:
+                wallets.append((line, Wallet.from_key(private_key, name)))
+            except Exception:
+                if on_invalid:
+                    on_invalid(line)
+
+        if cached is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self.store(content_hash, wallets)
+        return [wallet for _, wallet in wallets]